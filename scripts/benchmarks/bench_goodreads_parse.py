@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""Per-item cost of parsing and cleaning a Goodreads RSS page.
+
+Builds a deterministic 1,000-book feed whose reviews are wrapped in <br/>
+runs and whose image URLs carry thumbnail size markers, then times the
+fetcher's parse + ``clean_page`` path against the per-item ``re.sub``
+cleaning it replaced. Runs offline.
+
+    python scripts/benchmarks/bench_goodreads_parse.py [--books 1000] [--repeat 20]
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import re
+import sys
+import time
+from xml.sax.saxutils import escape
+
+SCRIPTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(SCRIPTS_DIR, 'goodreads-fetcher'))
+sys.path.insert(0, os.path.join(SCRIPTS_DIR, 'shared'))
+
+import fetch_books
+from rss_stream import iter_rss_items
+from text_clean import clean_page
+
+
+def build_feed(count: int) -> bytes:
+    """An RSS page of ``count`` books, every third one without a review."""
+    items = []
+    for i in range(count):
+        review = '' if i % 3 == 0 else f'<br/><br/>Book {i} was {"very " * (i % 7)}good.<br/>Would reread.<br/><br/>'
+        items.append(
+            '<item>'
+            f'<guid>https://www.goodreads.com/review/show/{i}</guid>'
+            f'<title>Book {i} by Author {i % 50}</title>'
+            f'<book_id>{100000 + i}</book_id>'
+            f'<book_image_url>https://i.gr-assets.com/images/books/{i}._SX50_.jpg</book_image_url>'
+            f'<book_large_image_url>https://i.gr-assets.com/images/books/{i}._SY475_.jpg</book_large_image_url>'
+            f'<author_name>Author {i % 50}</author_name>'
+            f'<user_rating>{i % 6}</user_rating>'
+            f'<user_read_at>Tue, {1 + i % 28:02d} May 2026 00:00:00 -0700</user_read_at>'
+            f'<user_date_added>Mon, {1 + i % 28:02d} Apr 2026 00:00:00 -0700</user_date_added>'
+            '<user_shelves>read</user_shelves>'
+            f'<description>{escape(f"author: Author {i % 50}<br/>review: {review}")}</description>'
+            '</item>'
+        )
+    return f'<rss><channel>{"".join(items)}</channel></rss>'.encode()
+
+
+def baseline_clean(book: dict) -> dict:
+    # The cleaning _parse_item did per item before text_clean
+    book['book_image_url'] = re.sub(r'\.?_S[XY]\d+_', '', book['book_image_url'])
+    book['book_large_image_url'] = re.sub(r'\.?_S[XY]\d+_', '', book['book_large_image_url'])
+    review = book['user_review']
+    review = re.sub(r'^(<br\s*/?>)+', '', review)
+    book['user_review'] = re.sub(r'(<br\s*/?>)+$', '', review).strip()
+    return book
+
+
+def best_time(run, books: list[dict], repeat: int) -> tuple[float, list[dict]]:
+    """Best wall time of ``run`` over ``repeat`` fresh copies of ``books``."""
+    best = float('inf')
+    result: list[dict] = []
+    for _ in range(repeat):
+        batch = [dict(book) for book in books]
+        start = time.perf_counter()
+        result = run(batch)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--books', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args(argv)
+
+    feed = build_feed(args.books)
+    parse_item = fetch_books.GoodreadsDataCollector()._parse_item
+
+    parse_seconds = float('inf')
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        raw_books = list(iter_rss_items([feed], parse_item))
+        parse_seconds = min(parse_seconds, time.perf_counter() - start)
+
+    baseline_seconds, baseline = best_time(
+        lambda batch: [baseline_clean(book) for book in batch], raw_books, args.repeat,
+    )
+    clean_seconds, cleaned = best_time(
+        lambda batch: clean_page(
+            batch, html_fields=fetch_books.REVIEW_FIELDS, image_fields=fetch_books.IMAGE_FIELDS,
+        ),
+        raw_books,
+        args.repeat,
+    )
+    if cleaned != baseline:
+        sys.exit('clean_page output differs from the re.sub baseline')
+
+    def per_item(seconds: float) -> float:
+        return seconds / args.books * 1e6
+
+    print(f"{args.books} books, best of {args.repeat}")
+    print(f"  parse             {per_item(parse_seconds):7.2f} us/item")
+    print(f"  re.sub per item   {per_item(baseline_seconds):7.2f} us/item cleaning")
+    print(f"  clean_page        {per_item(clean_seconds):7.2f} us/item cleaning")
+    print(f"  parse + clean     {per_item(parse_seconds + clean_seconds):7.2f} us/item")
+
+
+if __name__ == '__main__':
+    main()
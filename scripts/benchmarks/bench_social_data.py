@@ -0,0 +1,367 @@
+#!/usr/bin/env python3
+"""Scaling benchmark for the social data processors and orchestrator.
+
+Writes deterministic synthetic Strava, Goodreads and Letterboxd stores of
+each requested size, then times every case against them. Each case runs in
+a fresh interpreter so its peak RSS is its own. Results are saved as JSON,
+and ``--compare`` prints the change against an earlier results file.
+Runs offline, without API credentials.
+
+    python scripts/benchmarks/bench_social_data.py
+    python scripts/benchmarks/bench_social_data.py --sizes 1000 10000 --compare OLD.json
+
+Cases:
+    letterboxd         LetterboxdProcessor.get_data
+    goodreads          get_goodreads_data
+    strava             StravaProcessor.get_recent_activities_data, no checkpoint
+    strava_checkpoint  the same with an up-to-date checkpoint
+    orchestrate        orchestrate.main into an empty output directory
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SCRIPTS_DIR = os.path.join(BENCH_DIR, '..')
+sys.path.insert(0, os.path.join(SCRIPTS_DIR, 'social-data'))
+sys.path.insert(0, os.path.join(SCRIPTS_DIR, 'shared'))
+
+from dates import add_date_fields, iso_to_epoch, rfc2822_to_epoch
+from jsonl_store import JsonlStore
+
+RESULTS_DIR = os.path.join(BENCH_DIR, 'results')
+
+SIZES = (1_000, 10_000, 100_000)
+CASES = ('letterboxd', 'goodreads', 'strava', 'strava_checkpoint', 'orchestrate')
+
+# Synthetic histories span this many days back from the end date
+HISTORY_DAYS = 10 * 365
+
+# (type, weight, typical distance in meters, meters climbed per km)
+ACTIVITY_TYPES = (
+    ('Run', 45, 8_000, 12),
+    ('Ride', 30, 35_000, 10),
+    ('Hike', 10, 12_000, 60),
+    ('Swim', 5, 2_000, 0),
+    ('Walk', 5, 4_000, 5),
+    ('WeightTraining', 5, 0, 0),
+)
+
+STORE_FILES = {
+    'activities': ('activities.jsonl', 'id'),
+    'books': ('books.jsonl', 'book_id'),
+    'films': ('films.jsonl', 'guid'),
+}
+
+
+def _timestamp(rng: random.Random, end: date) -> datetime:
+    midnight = datetime(end.year, end.month, end.day, tzinfo=timezone.utc)
+    return midnight - timedelta(seconds=rng.randrange(HISTORY_DAYS * 86400))
+
+
+def _rfc2822(moment: datetime) -> str:
+    return moment.strftime('%a, %d %b %Y %H:%M:%S +0000')
+
+
+def generate_activities(count: int, seed: int, end: date) -> list[dict]:
+    """Strava activities as the fetcher stores them."""
+    rng = random.Random(seed)
+    weights = [weight for _, weight, _, _ in ACTIVITY_TYPES]
+    activities = []
+    for i in range(count):
+        activity_type, _, typical, climb = rng.choices(ACTIVITY_TYPES, weights)[0]
+        distance = round(typical * rng.uniform(0.3, 2.5), 1)
+        moving_time = int(distance / rng.uniform(1.2, 8.0)) if distance else rng.randrange(1800, 5400)
+        activities.append(add_date_fields({
+            'id': 1_000_000 + i,
+            'name': f'{activity_type} {i}',
+            'type': activity_type,
+            'sport_type': activity_type,
+            'distance': distance,
+            'moving_time': moving_time,
+            'elapsed_time': moving_time + rng.randrange(0, 1800),
+            'total_elevation_gain': round(distance / 1000 * climb * rng.uniform(0.2, 3.0), 1),
+            'start_date': _timestamp(rng, end).strftime('%Y-%m-%dT%H:%M:%SZ'),
+            'average_speed': round(distance / moving_time, 3) if moving_time else 0,
+            'commute': activity_type == 'Ride' and rng.random() < 0.3,
+            'map': {},
+        }, ('start_date',), iso_to_epoch))
+    return activities
+
+
+def generate_books(count: int, seed: int, end: date) -> list[dict]:
+    """Goodreads books as the fetcher stores them, with some duplicate editions."""
+    rng = random.Random(seed)
+    books = []
+    for i in range(count):
+        read_at = _rfc2822(_timestamp(rng, end)) if rng.random() < 0.8 else None
+        if books and rng.random() < 0.05:
+            # Another edition of the previous book, read at the same time
+            title, author, read_at = books[-1]['title'], books[-1]['author_name'], books[-1]['user_read_at']
+        else:
+            title, author = f'Book {i}', f'Author {rng.randrange(count // 4 + 1)}'
+        review = f'Thoughts on {title}. ' * rng.randrange(1, 20) if rng.random() < 0.25 else ''
+        books.append(add_date_fields({
+            'book_id': str(10_000_000 + i),
+            'title': title,
+            'author_name': author,
+            'user_rating': rng.choice((0, 1, 2, 3, 3, 4, 4, 4, 5, 5)) if read_at else 0,
+            'user_read_at': read_at,
+            'user_date_added': _rfc2822(_timestamp(rng, end)),
+            'user_shelves': None if read_at else 'to-read',
+            'user_review': review.strip(),
+            'isbn': f'{rng.randrange(10**9, 10**10)}',
+            'num_pages': str(rng.randrange(80, 900)),
+            'book_published': str(rng.randrange(1850, end.year + 1)),
+            'average_rating': f'{rng.uniform(3, 4.8):.2f}',
+            'book_image_url': f'https://images.example.com/books/{i}.jpg',
+            'book_large_image_url': f'https://images.example.com/books/{i}.jpg',
+            'guid': f'https://www.goodreads.com/review/show/{i}',
+        }, ('user_read_at', 'user_date_added'), rfc2822_to_epoch, iso=True))
+    return books
+
+
+def generate_films(count: int, seed: int, end: date) -> list[dict]:
+    """Letterboxd diary entries as the fetcher stores them."""
+    rng = random.Random(seed)
+    films = []
+    for i in range(count):
+        watched = _timestamp(rng, end)
+        film = {
+            'guid': f'letterboxd-watch-{i}',
+            'title': f'Film {i}',
+            'year': rng.randrange(1920, end.year + 1),
+            'rating': rng.choice((None, 2.0, 2.5, 3.0, 3.5, 4.0, 4.5, 5.0)),
+            'watched_date': watched.strftime('%Y-%m-%d'),
+            'is_rewatch': rng.random() < 0.15,
+            'image_url': f'https://images.example.com/films/{i}.jpg',
+            'review': f'<p>Notes on film {i}.</p>' if rng.random() < 0.3 else '',
+            'link': f'https://letterboxd.com/user/film/film-{i}/',
+            'pub_date': _rfc2822(watched + timedelta(hours=rng.randrange(1, 72))),
+        }
+        add_date_fields(film, ('pub_date',), rfc2822_to_epoch, iso=True)
+        films.append(add_date_fields(film, ('watched_date',), iso_to_epoch))
+    return films
+
+
+GENERATORS = {
+    'activities': generate_activities,
+    'books': generate_books,
+    'films': generate_films,
+}
+
+
+def write_stores(directory: str, count: int, seed: int, end: date) -> None:
+    """Write ``count`` records of every kind to JSONL stores in ``directory``."""
+    for name, (file_name, key) in STORE_FILES.items():
+        JsonlStore(os.path.join(directory, file_name), key).upsert(GENERATORS[name](count, seed, end))
+
+
+def point_processors_at(directory: str) -> None:
+    """Make the processors and orchestrator read from and write under ``directory``."""
+    import goodreads_processor
+    import letterboxd_processor
+    import orchestrate
+    import strava_processor
+
+    paths = {name: os.path.join(directory, file_name) for name, (file_name, _) in STORE_FILES.items()}
+    goodreads_processor.BOOKS_DATA_FILE = paths['books']
+    letterboxd_processor.FILMS_DATA_FILE = paths['films']
+    strava_processor.ACTIVITIES_DATA_FILE = paths['activities']
+    orchestrate.SOURCE_FILES = {
+        'letterboxd': (Path(paths['films']), orchestrate.SOURCE_FILES['letterboxd'][1]),
+        'goodreads': (Path(paths['books']), orchestrate.SOURCE_FILES['goodreads'][1]),
+        'strava': (Path(paths['activities']), orchestrate.SOURCE_FILES['strava'][1]),
+    }
+    orchestrate.OUTPUT_DIR = Path(directory) / 'social'
+    orchestrate.MANIFEST_FILE = orchestrate.OUTPUT_DIR / 'manifest.json'
+
+
+def prepare_case(case: str) -> None:
+    """Reset the state a case starts from before each timed run."""
+    import orchestrate
+    from strava_processor import StravaProcessor
+
+    checkpoint = StravaProcessor().checkpoint_file
+    if case in ('strava', 'orchestrate') and os.path.exists(checkpoint):
+        os.remove(checkpoint)
+    elif case == 'strava_checkpoint' and not os.path.exists(checkpoint):
+        StravaProcessor().get_recent_activities_data()
+    if case == 'orchestrate':
+        shutil.rmtree(orchestrate.OUTPUT_DIR, ignore_errors=True)
+
+
+def run_case(case: str) -> None:
+    import goodreads_processor
+    import letterboxd_processor
+    import orchestrate
+    import strava_processor
+
+    if case == 'letterboxd':
+        letterboxd_processor.create_letterboxd_processor().get_data()
+    elif case == 'goodreads':
+        goodreads_processor.get_goodreads_data()
+    elif case in ('strava', 'strava_checkpoint'):
+        strava_processor.StravaProcessor().get_recent_activities_data()
+    elif case == 'orchestrate':
+        orchestrate.main([])
+
+
+def peak_rss_bytes() -> int | None:
+    """Largest resident set of this process or any finished child, or None where unsupported."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = max(
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+    )
+    # Reported in bytes on macOS and kilobytes elsewhere
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def measure_case(case: str, directory: str, repeat: int) -> dict:
+    """Time ``case`` ``repeat`` times, then once more under tracemalloc for its Python heap peak."""
+    logging.disable(logging.INFO)
+    # orchestrate's worker processes inherit the redirected paths
+    multiprocessing.set_start_method('fork')
+    point_processors_at(directory)
+
+    seconds = []
+    for _ in range(repeat):
+        prepare_case(case)
+        started = time.perf_counter()
+        run_case(case)
+        seconds.append(time.perf_counter() - started)
+    rss = peak_rss_bytes()
+
+    prepare_case(case)
+    tracemalloc.start()
+    run_case(case)
+    _, traced_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'seconds': round(min(seconds), 4),
+        'mean_seconds': round(sum(seconds) / len(seconds), 4),
+        # Only this process: orchestrate's workers are covered by peak_rss_bytes
+        'peak_traced_bytes': traced_peak,
+        'peak_rss_bytes': rss,
+    }
+
+
+def git_revision() -> str | None:
+    try:
+        result = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=BENCH_DIR, capture_output=True, text=True, check=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return result.stdout.strip()
+
+
+def run_benchmarks(sizes: list[int], cases: list[str], repeat: int, seed: int, end: date) -> list[dict]:
+    rows = []
+    for size in sizes:
+        with tempfile.TemporaryDirectory(prefix='bench-social-') as directory:
+            # Generated in a worker: on Linux a child starts with its
+            # parent's peak RSS, so the parent has to stay small
+            with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as pool:
+                pool.submit(write_stores, directory, size, seed, end).result()
+            for case in cases:
+                result = subprocess.run(
+                    [sys.executable, __file__, '--run-case', case, '--data', directory, '--repeat', str(repeat)],
+                    capture_output=True, text=True,
+                )
+                if result.returncode:
+                    sys.exit(f"{case} at {size} records failed:\n{result.stderr}")
+                row = {'case': case, 'records': size, **json.loads(result.stdout.splitlines()[-1])}
+                rows.append(row)
+                print(format_row(row), flush=True)
+    return rows
+
+
+def _megabytes(value: int | None) -> str:
+    return f"{value / 2**20:9.1f}" if value is not None else f"{'-':>9}"
+
+
+def format_row(row: dict, previous: dict | None = None) -> str:
+    line = (
+        f"{row['case']:<18} {row['records']:>8} {row['seconds']:>9.3f}s"
+        f" {_megabytes(row['peak_traced_bytes'])} MB heap {_megabytes(row['peak_rss_bytes'])} MB rss"
+    )
+    if previous:
+        line += f"  ({row['seconds'] / previous['seconds']:.2f}x time"
+        line += f", {row['peak_traced_bytes'] / previous['peak_traced_bytes']:.2f}x heap)"
+    return line
+
+
+def compare(rows: list[dict], path: str) -> None:
+    """Print each row beside its counterpart in an earlier results file."""
+    with open(path) as f:
+        old = json.load(f)
+    previous = {(row['case'], row['records']): row for row in old['results']}
+    print(f"\nCompared with {old.get('revision') or path}:")
+    for row in rows:
+        print(format_row(row, previous.get((row['case'], row['records']))))
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the social data pipeline on synthetic histories.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(SIZES), help="Records per store.")
+    parser.add_argument('--cases', nargs='+', choices=CASES, default=list(CASES))
+    parser.add_argument('--repeat', type=int, default=3, help="Timed runs per case; the fastest is reported.")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument(
+        '--end', type=date.fromisoformat, default=datetime.now(timezone.utc).date(),
+        help="Newest date in the synthetic histories (YYYY-MM-DD). Defaults to today.",
+    )
+    parser.add_argument('--output', help="Results file. Defaults to results/social_data-<revision>.json.")
+    parser.add_argument('--compare', metavar='RESULTS', help="Earlier results file to compare against.")
+    parser.add_argument('--run-case', choices=CASES, help=argparse.SUPPRESS)
+    parser.add_argument('--data', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.run_case:
+        print(json.dumps(measure_case(args.run_case, args.data, args.repeat)))
+        return
+
+    revision = git_revision()
+    rows = run_benchmarks(args.sizes, args.cases, args.repeat, args.seed, args.end)
+    output = args.output or os.path.join(RESULTS_DIR, f"social_data-{revision or 'local'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump({
+            'revision': revision,
+            'created': datetime.now(timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'seed': args.seed,
+            'end': args.end.isoformat(),
+            'repeat': args.repeat,
+            'results': rows,
+        }, f, indent=2)
+    print(f"Saved results to {output}")
+    if args.compare:
+        compare(rows, args.compare)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,32 @@
+"""Tests for the synthetic data behind the social data benchmark."""
+
+from __future__ import annotations
+
+import os
+from datetime import date
+
+from bench_social_data import STORE_FILES, generate_activities, generate_books, generate_films, write_stores
+from jsonl_store import read_records
+
+END = date(2026, 5, 12)
+
+
+class TestGenerators:
+    def test_same_seed_same_records(self):
+        for generate in (generate_activities, generate_books, generate_films):
+            assert generate(50, 7, END) == generate(50, 7, END)
+            assert generate(50, 7, END) != generate(50, 8, END)
+
+    def test_records_carry_ingest_date_fields(self):
+        assert all('start_date_epoch' in a for a in generate_activities(20, 0, END))
+        assert all('user_read_at_iso' in b for b in generate_books(20, 0, END))
+        assert all('pub_date_iso' in f and 'watched_date_epoch' in f for f in generate_films(20, 0, END))
+
+    def test_dates_end_on_the_end_date(self):
+        watched = [film['watched_date'] for film in generate_films(200, 0, END)]
+        assert max(watched) <= END.isoformat()
+
+    def test_write_stores(self, tmp_path):
+        write_stores(str(tmp_path), 30, 0, END)
+        for file_name, key in STORE_FILES.values():
+            assert len(read_records(os.path.join(tmp_path, file_name), key)) == 30
@@ -2,25 +2,46 @@
 
 from __future__ import annotations
 
+import argparse
 import json
 import logging
 import os
 import re
+import sys
+from concurrent.futures import ThreadPoolExecutor
 
 import requests
-from bs4 import BeautifulSoup
+
+from page_metadata import CHUNK_SIZE, PageMetadataParser, extract_page_metadata
 
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+sys.path.insert(0, os.path.join(SCRIPT_DIR, '..', 'shared'))
+from http_scheduler import RequestScheduler
+from response_cache import ResponseCache
+
 INPUT_FILE = os.path.join(SCRIPT_DIR, 'favorites.json')
 OUTPUT_FILE = os.path.join(SCRIPT_DIR, 'data', 'metadata.json')
+CACHE_DIR = os.path.join(SCRIPT_DIR, 'data', 'page_cache')
 
 HEADERS = {
     'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36'
 }
 
+# Letterboxd poster thumbnails, upscaled to the 600x900 crop for covers
+POSTER_PATTERN = re.compile(r'((?:film-poster|sm/upload)/[^\s"\'<>]+-0-230-0-345-crop\.jpg[^\s"\'<>]*)')
+
+# Pages scraped at once; HOST_POLICIES further caps the requests per host
+DEFAULT_WORKERS = 8
+
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# One pooled keep-alive session shared by every scraping thread
+session = requests.Session()
+session.headers.update(HEADERS)
+scheduler = RequestScheduler(session=session)
+
 
 def normalize_favorite(item: str | dict[str, str]) -> dict[str, str]:
     if isinstance(item, str):
@@ -38,19 +59,42 @@ def extract_year(value: object) -> str:
     return match.group(0) if match else ''
 
 
-def scrape_film(url: str) -> dict[str, str]:
+def fetch_page_metadata(
+    url: str,
+    cache: ResponseCache | None = None,
+    refresh: bool = False,
+    pattern: re.Pattern[str] | None = None,
+) -> PageMetadataParser:
+    """Extract a page's metadata, from the response cache unless missing, expired or refreshed.
+
+    The page is streamed and only read up to where the metadata ends; that
+    prefix is what gets cached.
+    """
+    body = cache.get(url) if cache is not None and not refresh else None
+    if body is not None:
+        logger.info(f'Using cached page for {url}')
+        return extract_page_metadata([body], pattern)
+
+    resp = scheduler.get(url, headers=HEADERS, timeout=15, stream=True)
+    try:
+        resp.raise_for_status()
+        read: list[bytes] = []
+        page = extract_page_metadata(resp.iter_content(chunk_size=CHUNK_SIZE), pattern, read)
+    finally:
+        resp.close()
+    if cache is not None:
+        cache.put(url, b''.join(read))
+    return page
+
+
+def scrape_film(url: str, cache: ResponseCache | None = None, refresh: bool = False) -> dict[str, str]:
     """Scrape title, director, year, and poster from a Letterboxd film page."""
-    resp = requests.get(url, headers=HEADERS, timeout=15)
-    resp.raise_for_status()
-    html = resp.text
+    page = fetch_page_metadata(url, cache, refresh, POSTER_PATTERN)
 
     # Extract JSON-LD structured data (Letterboxd wraps it in CDATA comments)
-    soup = BeautifulSoup(html, 'html.parser')
-    ld_tag = soup.find('script', type='application/ld+json')
     ld = {}
-    if ld_tag:
-        raw = ld_tag.string or ld_tag.get_text()
-        raw = re.sub(r'/\*.*?\*/', '', raw, flags=re.DOTALL).strip()
+    if page.json_ld is not None:
+        raw = re.sub(r'/\*.*?\*/', '', page.json_ld, flags=re.DOTALL).strip()
         ld = json.loads(raw)
 
     title = ld.get('name', '')
@@ -62,30 +106,21 @@ def scrape_film(url: str) -> dict[str, str]:
     subtitle = f'{director}, {year}' if director and year else director or year
 
     # Extract poster image (existing proven regex + upscale)
-    matches = re.findall(
-        r'((?:film-poster|sm/upload)/[^\s"\'<>]+-0-230-0-345-crop\.jpg[^\s"\'<>]*)',
-        html,
-    )
     cover = ''
-    if matches:
-        path = matches[0].replace('-0-230-0-345-crop', '-0-600-0-900-crop')
+    if page.match:
+        path = page.match.replace('-0-230-0-345-crop', '-0-600-0-900-crop')
         cover = f'https://a.ltrbxd.com/resized/{path}'
 
     logger.info(f'Film: {title} ({subtitle}) — cover {"found" if cover else "MISSING"}')
     return {'title': title, 'subtitle': subtitle, 'cover': cover}
 
 
-def scrape_book(url: str) -> dict[str, str]:
+def scrape_book(url: str, cache: ResponseCache | None = None, refresh: bool = False) -> dict[str, str]:
     """Scrape title, author, and cover from a Goodreads book page."""
-    resp = requests.get(url, headers=HEADERS, timeout=15)
-    resp.raise_for_status()
-    html = resp.text
-
-    soup = BeautifulSoup(html, 'html.parser')
+    page = fetch_page_metadata(url, cache, refresh)
 
     # Extract JSON-LD structured data
-    ld_tag = soup.find('script', type='application/ld+json')
-    ld = json.loads(ld_tag.string) if ld_tag else {}
+    ld = json.loads(page.json_ld) if page.json_ld is not None else {}
 
     title = ld.get('name', '')
     authors = ld.get('author', [])
@@ -93,8 +128,7 @@ def scrape_book(url: str) -> dict[str, str]:
     year = extract_year(ld.get('datePublished', ''))
 
     # Cover image: try og:image first, then JSON-LD
-    og_img = soup.find('meta', property='og:image')
-    cover = og_img['content'] if og_img else ld.get('image', '')
+    cover = page.meta['og:image'] if 'og:image' in page.meta else ld.get('image', '')
 
     subtitle = f'{author}, {year}' if author and year else author or year
 
@@ -102,25 +136,122 @@ def scrape_book(url: str) -> dict[str, str]:
     return {'title': title, 'subtitle': subtitle, 'cover': cover}
 
 
+SCRAPERS = {
+    'films': scrape_film,
+    'books': scrape_book,
+}
+
+
+def apply_overrides(favorite: dict[str, str], metadata: dict[str, str]) -> dict[str, str]:
+    """Return ``metadata`` as a metadata.json entry, keeping a cover set in favorites.json."""
+    entry = {'url': favorite['url'], **{key: value for key, value in metadata.items() if key != 'url'}}
+    if favorite.get('cover'):
+        entry['cover'] = favorite['cover']
+    return entry
+
+
+def scrape_favorite(
+    kind: str,
+    item: str | dict[str, str],
+    cache: ResponseCache | None = None,
+    refresh: bool = False,
+) -> dict[str, str]:
+    """Scrape one favorite's metadata, keeping a cover set in favorites.json."""
+    favorite = normalize_favorite(item)
+    return apply_overrides(favorite, SCRAPERS[kind](favorite['url'], cache, refresh))
+
+
+def load_previous_metadata() -> dict[str, dict[str, str]]:
+    """URL -> entry from the last metadata.json, or {} if there is none."""
+    try:
+        with open(OUTPUT_FILE) as f:
+            previous = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {}
+    return {entry['url']: entry for kind in SCRAPERS for entry in previous.get(kind, [])}
+
+
+def scrape_all(
+    recs: dict,
+    workers: int = DEFAULT_WORKERS,
+    cache: ResponseCache | None = None,
+    force: bool = False,
+    refresh: bool | set[str] = False,
+) -> tuple[dict[str, list], list[tuple[str, str]]]:
+    """Scrape favorites concurrently, returning metadata in input order and the failures.
+
+    A favorite already resolved in the previous metadata.json is reused without
+    scraping unless ``force`` is set or it is refreshed. ``refresh`` is True for
+    every URL or a set of URLs; refreshed pages are also re-downloaded instead
+    of read from ``cache``. A favorite that fails is reported as ``(url, error)``
+    and keeps its previous entry, if it had one, rather than failing the run.
+    """
+    def refreshing(url: str) -> bool:
+        return refresh is True or (isinstance(refresh, set) and url in refresh)
+
+    previous = load_previous_metadata()
+    favorites = [(kind, normalize_favorite(item)) for kind in SCRAPERS for item in recs.get(kind, [])]
+    with ThreadPoolExecutor(max_workers=max(workers, 1)) as executor:
+        jobs = []
+        for kind, favorite in favorites:
+            url = favorite['url']
+            if not force and not refreshing(url) and previous.get(url, {}).get('title'):
+                jobs.append((kind, url, apply_overrides(favorite, previous[url])))
+            else:
+                jobs.append((kind, url, executor.submit(scrape_favorite, kind, favorite, cache, refreshing(url))))
+
+    output: dict[str, list] = {kind: [] for kind in SCRAPERS}
+    failures: list[tuple[str, str]] = []
+    scraped = 0
+    for (kind, url, job), (_, favorite) in zip(jobs, favorites):
+        if isinstance(job, dict):
+            output[kind].append(job)
+            continue
+        scraped += 1
+        try:
+            output[kind].append(job.result())
+        except Exception as e:
+            failures.append((url, str(e)))
+            if url in previous:
+                output[kind].append(apply_overrides(favorite, previous[url]))
+    logger.info(f'Scraped {scraped} favorites, reused {len(jobs) - scraped} from {OUTPUT_FILE}')
+    return output, failures
+
+
 def main() -> None:
+    parser = argparse.ArgumentParser(description="Scrape titles, subtitles and covers for favorites.json.")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=DEFAULT_WORKERS,
+        help="Number of pages to scrape at once. Each host is further limited by HOST_POLICIES.",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Re-scrape favorites already in metadata.json. Cached pages are still used while fresh.",
+    )
+    parser.add_argument(
+        "--refresh",
+        nargs="*",
+        metavar="URL",
+        help="Re-download and re-scrape these favorite URLs, or every favorite if none are given.",
+    )
+    args = parser.parse_args()
+
     with open(INPUT_FILE) as f:
         recs = json.load(f)
 
-    output: dict[str, list] = {'films': [], 'books': []}
+    refresh: bool | set[str] = False
+    if args.refresh is not None:
+        known = {normalize_favorite(item)['url'] for kind in SCRAPERS for item in recs.get(kind, [])}
+        for url in sorted(set(args.refresh) - known):
+            logger.warning(f'--refresh URL is not in {INPUT_FILE}: {url}')
+        refresh = set(args.refresh) or True
 
-    for item in recs['films']:
-        favorite = normalize_favorite(item)
-        metadata = scrape_film(favorite['url'])
-        if favorite.get('cover'):
-            metadata['cover'] = favorite['cover']
-        output['films'].append({'url': favorite['url'], **metadata})
-
-    for item in recs['books']:
-        favorite = normalize_favorite(item)
-        metadata = scrape_book(favorite['url'])
-        if favorite.get('cover'):
-            metadata['cover'] = favorite['cover']
-        output['books'].append({'url': favorite['url'], **metadata})
+    cache = ResponseCache(CACHE_DIR)
+    output, failures = scrape_all(recs, workers=args.workers, cache=cache, force=args.force, refresh=refresh)
+    cache.save()
 
     os.makedirs(os.path.dirname(OUTPUT_FILE), exist_ok=True)
     with open(OUTPUT_FILE, 'w') as f:
@@ -129,6 +260,12 @@ def main() -> None:
     total = len(output['films']) + len(output['books'])
     logger.info(f'Saved {total} favorites to {OUTPUT_FILE}')
 
+    if failures:
+        for url, error in failures:
+            logger.error(f'Failed to scrape {url}: {error}')
+        logger.error(f'{len(failures)} favorites failed; previous metadata kept where available')
+        sys.exit(1)
+
 
 if __name__ == '__main__':
     main()
@@ -2,25 +2,49 @@
 
 from __future__ import annotations
 
+import argparse
+import hashlib
 import json
 import logging
 import os
 import re
+import sys
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
 from io import BytesIO
 from pathlib import Path
 from typing import Any
 
-import requests
 from PIL import Image, ImageFilter, ImageOps
 
 SCRIPT_DIR = Path(__file__).resolve().parent
+
+sys.path.insert(0, str(SCRIPT_DIR.parent / 'shared'))
+from http_scheduler import RequestScheduler
+
 REPO_ROOT = SCRIPT_DIR.parents[1]
 METADATA_FILE = SCRIPT_DIR / 'data' / 'metadata.json'
 FAVORITES_FILE = SCRIPT_DIR / 'favorites.json'
+MANIFEST_FILE = SCRIPT_DIR / 'data' / 'asset_manifest.json'
 PUBLIC_DIR = REPO_ROOT / 'public'
 OUTPUT_DIR = PUBLIC_DIR / 'images' / 'favorites'
 
 TARGET_SIZE = (600, 900)
+UNSHARP_MASK = {'radius': 1.2, 'percent': 120, 'threshold': 3}
+JPEG_QUALITY = 90
+
+# Everything that shapes an output file; a change rebuilds every asset
+PIPELINE_PARAMS = {
+    'target_size': list(TARGET_SIZE),
+    'resample': 'lanczos',
+    'unsharp_mask': UNSHARP_MASK,
+    'jpeg_quality': JPEG_QUALITY,
+    'progressive': True,
+}
+
+# Covers downloaded at once; HOST_POLICIES further caps the requests per host
+DEFAULT_DOWNLOAD_WORKERS = 8
+# Processes decoding, resizing and encoding covers
+DEFAULT_WORKERS = os.cpu_count() or 1
 HEADERS = {
     'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36'
 }
@@ -28,6 +52,8 @@ HEADERS = {
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+scheduler = RequestScheduler()
+
 
 def slugify(value: str) -> str:
     slug = re.sub(r'[^a-z0-9]+', '-', value.lower()).strip('-')
@@ -38,16 +64,39 @@ def is_local_path(url: str) -> bool:
     return url.startswith('/')
 
 
-def download_image(url: str) -> Image.Image:
-    resp = requests.get(url, headers=HEADERS, timeout=30)
+def sha256_file(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open('rb') as f:
+        while chunk := f.read(1 << 16):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def download_image(url: str, conditional_headers: dict[str, str] | None = None) -> tuple[bytes | None, dict[str, str]]:
+    """Return the cover's bytes, or None if a conditional request found it unchanged, and its validators."""
+    resp = scheduler.get(url, headers={**HEADERS, **(conditional_headers or {})}, timeout=30)
     resp.raise_for_status()
-    return Image.open(BytesIO(resp.content))
+    validators = {
+        'etag': resp.headers.get('ETag'),
+        'last_modified': resp.headers.get('Last-Modified'),
+    }
+    return (None if resp.status_code == 304 else resp.content), validators
 
 
 def optimize_image(image: Image.Image) -> Image.Image:
     image = ImageOps.exif_transpose(image).convert('RGB')
     image = ImageOps.fit(image, TARGET_SIZE, method=Image.Resampling.LANCZOS, centering=(0.5, 0.5))
-    return image.filter(ImageFilter.UnsharpMask(radius=1.2, percent=120, threshold=3))
+    return image.filter(ImageFilter.UnsharpMask(**UNSHARP_MASK))
+
+
+def encode_cover(data: bytes, output_path: str) -> str:
+    """Decode a downloaded cover, optimize it, write it as a progressive JPEG, and return its hash.
+
+    Runs in a worker process, so it takes and returns only picklable values.
+    """
+    optimized = optimize_image(Image.open(BytesIO(data)))
+    optimized.save(output_path, format='JPEG', quality=JPEG_QUALITY, optimize=True, progressive=True)
+    return sha256_file(Path(output_path))
 
 
 def local_cover_path(kind: str, title: str) -> Path:
@@ -58,6 +107,42 @@ def public_path(path: Path) -> str:
     return '/' + path.relative_to(PUBLIC_DIR).as_posix()
 
 
+def load_manifest() -> dict[str, dict[str, Any]]:
+    """Public asset path -> how it was built, or {} before the first run."""
+    try:
+        with MANIFEST_FILE.open() as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def save_manifest(manifest: dict[str, dict[str, Any]]) -> None:
+    with MANIFEST_FILE.open('w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+        f.write('\n')
+
+
+def is_current(record: dict[str, Any] | None, source_url: str, output_path: Path) -> bool:
+    """True if ``output_path`` is still what ``record`` says this source and PIPELINE_PARAMS built."""
+    return (
+        record is not None
+        and record.get('source_url') == source_url
+        and record.get('params') == PIPELINE_PARAMS
+        and output_path.exists()
+        and sha256_file(output_path) == record.get('output_sha256')
+    )
+
+
+def conditional_headers(record: dict[str, Any]) -> dict[str, str]:
+    """Return the If-None-Match/If-Modified-Since headers for a recorded source."""
+    headers = {}
+    if record.get('etag'):
+        headers['If-None-Match'] = record['etag']
+    if record.get('last_modified'):
+        headers['If-Modified-Since'] = record['last_modified']
+    return headers
+
+
 def favorite_cover_sources(items: list[Any]) -> dict[str, str]:
     sources = {}
     for item in items:
@@ -74,14 +159,19 @@ def update_favorite_cover(items: list[Any], url: str, cover: str) -> None:
             return
 
 
-def optimize_entries(
+def plan_entries(
     entries: list[dict[str, Any]],
     kind: str,
     favorite_sources: dict[str, str],
-    favorite_items: list[Any],
-) -> int:
-    saved = 0
-
+    manifest: dict[str, dict[str, Any]],
+) -> list[tuple[dict[str, Any], str, Path]]:
+    """Return ``(entry, source_url, output_path)`` for each entry whose asset may need building.
+
+    A remote cover is built into ``local_cover_path``. A local cover listed in
+    the manifest is checked against the source it was built from. Any other
+    local cover was placed by hand, so the entry is just pointed at it.
+    """
+    jobs = []
     for entry in entries:
         cover = entry.get('cover', '')
         source_cover = favorite_sources.get(entry.get('url', ''), cover)
@@ -90,47 +180,195 @@ def optimize_entries(
             logger.warning('Skipping %s entry with missing title or cover: %s', kind, entry)
             continue
 
-        if is_local_path(source_cover):
+        if not is_local_path(source_cover):
+            jobs.append((entry, source_cover, local_cover_path(kind, title)))
+        elif source_cover in manifest:
+            jobs.append((entry, manifest[source_cover]['source_url'], PUBLIC_DIR / source_cover.lstrip('/')))
+        else:
             entry['cover'] = source_cover
-            logger.info('Skipping already-local %s cover: %s', title, source_cover)
-            continue
+            logger.info('Skipping hand-placed %s cover: %s', title, source_cover)
+
+    return jobs
+
 
-        output_path = local_cover_path(kind, title)
-        output_path.parent.mkdir(parents=True, exist_ok=True)
+def check_unique_outputs(jobs: list[tuple[dict[str, Any], str, Path]]) -> None:
+    """Raise ValueError if two entries would be written to the same file.
 
-        logger.info('Optimizing %s: %s', title, source_cover)
-        image = download_image(source_cover)
-        optimized = optimize_image(image)
-        optimized.save(output_path, format='JPEG', quality=90, optimize=True, progressive=True)
+    Covers are named after the slug of their title, and two worker processes
+    writing one file would leave whichever finished last.
+    """
+    titles: dict[Path, list[str]] = {}
+    for entry, _, output_path in jobs:
+        titles.setdefault(output_path, []).append(entry['title'])
+    clashes = {path: names for path, names in titles.items() if len(names) > 1}
+    if clashes:
+        details = '; '.join(f"{public_path(path)} <- {', '.join(names)}" for path, names in clashes.items())
+        raise ValueError(f"Favorites share an output file, give one a distinct title or local cover: {details}")
+
+
+def optimize_entries(
+    jobs: list[tuple[dict[str, Any], str, Path]],
+    favorite_items: list[Any],
+    manifest: dict[str, dict[str, Any]],
+    workers: int = DEFAULT_WORKERS,
+    download_workers: int = DEFAULT_DOWNLOAD_WORKERS,
+    refresh: bool = False,
+) -> tuple[int, list[tuple[str, str]]]:
+    """Build each planned asset whose source or settings changed, and point its entry at it.
+
+    An asset that ``manifest`` shows is current is kept without a request,
+    unless ``refresh`` is set. Then it is revalidated with a conditional
+    request and kept if the server answers 304 or sends the same bytes.
+    Everything else is downloaded on a thread pool and handed, as soon as it
+    arrives, to a process pool for decoding, resizing and encoding, so both
+    overlap. ``manifest`` is updated in place. ``favorite_items`` holds the
+    favorites.json items of every kind.
+
+    Returns how many assets were built and the ``(source_url, error)`` of
+    every cover that failed. A failed cover keeps its existing asset, if it
+    has one, rather than failing the run.
+    """
+    check_unique_outputs(jobs)
+    saved = 0
+    failures: list[tuple[str, str]] = []
 
-        local_path = public_path(output_path)
+    def point_at(entry: dict[str, Any], local_path: str) -> None:
         entry['cover'] = local_path
         update_favorite_cover(favorite_items, entry.get('url', ''), local_path)
-        saved += 1
 
-    return saved
+    with ThreadPoolExecutor(max_workers=max(download_workers, 1)) as downloads, \
+            ProcessPoolExecutor(max_workers=max(workers, 1)) as encoders:
+        # Future -> (stage, job, whether its asset was current / its source hash and validators)
+        pending: dict[Future, tuple[str, tuple[dict[str, Any], str, Path], Any]] = {}
+        for job in jobs:
+            entry, source_url, output_path = job
+            record = manifest.get(public_path(output_path))
+            current = is_current(record, source_url, output_path)
+            if current and not refresh:
+                point_at(entry, public_path(output_path))
+                continue
+            output_path.parent.mkdir(parents=True, exist_ok=True)
+            logger.info('Downloading %s: %s', entry['title'], source_url)
+            future = downloads.submit(download_image, source_url, conditional_headers(record) if current else None)
+            pending[future] = ('download', job, current)
+
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                stage, job, state = pending.pop(future)
+                entry, source_url, output_path = job
+                local_path = public_path(output_path)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    failures.append((source_url, str(e)))
+                    if local_path in manifest and output_path.exists():
+                        # Keep serving the asset built by an earlier run
+                        point_at(entry, local_path)
+                    continue
+
+                if stage == 'download':
+                    data, validators = result
+                    source_sha256 = hashlib.sha256(data).hexdigest() if data is not None else None
+                    record = manifest.get(local_path)
+                    if state and (data is None or record['source_sha256'] == source_sha256):
+                        logger.info('Keeping unchanged %s cover: %s', entry['title'], local_path)
+                        if data is not None:
+                            record.update(validators)
+                    else:
+                        logger.info('Optimizing %s', entry['title'])
+                        encode = encoders.submit(encode_cover, data, str(output_path))
+                        pending[encode] = ('encode', job, (source_sha256, validators))
+                        continue
+                else:
+                    source_sha256, validators = state
+                    manifest[local_path] = {
+                        'source_url': source_url,
+                        'source_sha256': source_sha256,
+                        **validators,
+                        'params': PIPELINE_PARAMS,
+                        'output_sha256': result,
+                    }
+                    saved += 1
+
+                point_at(entry, local_path)
+
+    return saved, failures
+
+
+def prune_assets(referenced: set[str], manifest: dict[str, dict[str, Any]]) -> int:
+    """Delete images under OUTPUT_DIR, and manifest records, that no favorite points at."""
+    pruned = 0
+    for path in sorted(OUTPUT_DIR.rglob('*.jpg')):
+        local_path = public_path(path)
+        if local_path not in referenced:
+            logger.info('Pruning orphaned asset %s', local_path)
+            path.unlink()
+            pruned += 1
+    for local_path in list(manifest):
+        if local_path not in referenced:
+            del manifest[local_path]
+    return pruned
 
 
 def main() -> None:
+    parser = argparse.ArgumentParser(description="Download and optimize remote favorites covers into public/.")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=DEFAULT_WORKERS,
+        help="Number of processes resizing and encoding covers. Defaults to the CPU count.",
+    )
+    parser.add_argument(
+        "--download-workers",
+        type=int,
+        default=DEFAULT_DOWNLOAD_WORKERS,
+        help="Number of covers to download at once. Each host is further limited by HOST_POLICIES.",
+    )
+    parser.add_argument(
+        "--prune",
+        action="store_true",
+        help="Delete images under public/images/favorites that no favorite uses.",
+    )
+    parser.add_argument(
+        "--refresh",
+        action="store_true",
+        help="Revalidate every generated cover against its source, rebuilding those that changed.",
+    )
+    args = parser.parse_args()
+
     with METADATA_FILE.open() as f:
         metadata = json.load(f)
     with FAVORITES_FILE.open() as f:
         favorites = json.load(f)
-
-    saved = 0
-    saved += optimize_entries(
-        metadata.get('films', []),
-        'films',
-        favorite_cover_sources(favorites.get('films', [])),
-        favorites.get('films', []),
-    )
-    saved += optimize_entries(
-        metadata.get('books', []),
-        'books',
-        favorite_cover_sources(favorites.get('books', [])),
-        favorites.get('books', []),
+    manifest = load_manifest()
+
+    jobs = []
+    favorite_items = []
+    for kind in ('films', 'books'):
+        jobs += plan_entries(
+            metadata.get(kind, []),
+            kind,
+            favorite_cover_sources(favorites.get(kind, [])),
+            manifest,
+        )
+        favorite_items += favorites.get(kind, [])
+    saved, failures = optimize_entries(
+        jobs,
+        favorite_items,
+        manifest,
+        workers=args.workers,
+        download_workers=args.download_workers,
+        refresh=args.refresh,
     )
 
+    if args.prune:
+        referenced = {entry.get('cover', '') for kind in ('films', 'books') for entry in metadata.get(kind, [])}
+        referenced |= set(favorite_cover_sources(favorite_items).values())
+        pruned = prune_assets(referenced, manifest)
+        logger.info('Pruned %s orphaned favorite assets', pruned)
+    save_manifest(manifest)
+
     with METADATA_FILE.open('w') as f:
         json.dump(metadata, f, indent=2)
         f.write('\n')
@@ -138,7 +376,13 @@ def main() -> None:
         json.dump(favorites, f, indent=2)
         f.write('\n')
 
-    logger.info('Saved %s optimized favorite assets to %s', saved, OUTPUT_DIR)
+    logger.info('Saved %s optimized favorite assets to %s; the rest were unchanged', saved, OUTPUT_DIR)
+
+    if failures:
+        for url, error in failures:
+            logger.error('Failed to optimize %s: %s', url, error)
+        logger.error('%s covers failed; existing assets kept where available', len(failures))
+        sys.exit(1)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,163 @@
+"""Tests for concurrent favorites scraping against pages served locally."""
+
+from __future__ import annotations
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import fetch_covers
+from http_scheduler import HostPolicy, RequestScheduler
+from response_cache import ResponseCache
+
+# Seconds each stub page takes to answer
+PAGE_DELAY = 0.2
+
+
+def film_page(slug: str) -> str:
+    ld = {
+        'name': slug.title(),
+        'director': [{'name': 'Director'}],
+        'releasedEvent': [{'startDate': '2001'}],
+    }
+    return (
+        '<html><head><script type="application/ld+json">/* <![CDATA[ */'
+        f'{json.dumps(ld)}/* ]]> */</script></head><body>'
+        f'<img src="https://a.ltrbxd.com/resized/film-poster/1/2/{slug}-0-230-0-345-crop.jpg?v=1">'
+        '</body></html>'
+    )
+
+
+def book_page(book_id: str) -> str:
+    ld = {'name': f'Book {book_id}', 'author': [{'name': 'Author'}], 'datePublished': '1999-01-01'}
+    return (
+        f'<html><head><meta property="og:image" content="https://images.example.com/{book_id}.jpg">'
+        f'<script type="application/ld+json">{json.dumps(ld)}</script></head><body></body></html>'
+    )
+
+
+class StubPages(BaseHTTPRequestHandler):
+    requests: list[str] = []
+
+    def do_GET(self):
+        StubPages.requests.append(self.path)
+        time.sleep(PAGE_DELAY)
+        parts = self.path.strip('/').split('/')
+        if parts[0] == 'film':
+            body = film_page(parts[1])
+        elif parts[:2] == ['book', 'show']:
+            body = book_page(parts[2])
+        else:
+            self.send_response(404)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html')
+        self.end_headers()
+        self.wfile.write(body.encode())
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def base_url(tmp_path, monkeypatch):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubPages)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setattr(fetch_covers, 'scheduler', RequestScheduler(
+        policies={}, default_policy=HostPolicy(limits=[(100, 1.0)], max_concurrency=8),
+    ))
+    monkeypatch.setattr(fetch_covers, 'OUTPUT_FILE', str(tmp_path / 'metadata.json'))
+    monkeypatch.setattr(StubPages, 'requests', [])
+    yield f'http://127.0.0.1:{server.server_address[1]}'
+    server.shutdown()
+
+
+class TestScrapeAll:
+    def test_keeps_input_order_and_overrides(self, base_url):
+        recs = {
+            'films': [f'{base_url}/film/{slug}/' for slug in ('heat', 'arrival', 'alien')],
+            'books': [{'url': f'{base_url}/book/show/7', 'cover': '/images/favorites/books/seven.jpg'}],
+        }
+        output, failures = fetch_covers.scrape_all(recs)
+        assert failures == []
+        assert [film['title'] for film in output['films']] == ['Heat', 'Arrival', 'Alien']
+        assert output['films'][0]['subtitle'] == 'Director, 2001'
+        assert output['films'][0]['cover'].endswith('/heat-0-600-0-900-crop.jpg?v=1')
+        assert output['books'] == [{
+            'url': f'{base_url}/book/show/7',
+            'title': 'Book 7',
+            'subtitle': 'Author, 1999',
+            'cover': '/images/favorites/books/seven.jpg',
+        }]
+
+    def test_pages_are_fetched_concurrently(self, base_url):
+        recs = {'films': [f'{base_url}/film/f{i}/' for i in range(8)], 'books': []}
+        started = time.perf_counter()
+        output, _ = fetch_covers.scrape_all(recs, workers=8)
+        assert len(output['films']) == 8
+        assert time.perf_counter() - started < PAGE_DELAY * 4
+
+    def test_failures_are_collected_and_keep_previous_metadata(self, base_url):
+        missing = f'{base_url}/film-gone/'
+        never_scraped = f'{base_url}/book-gone/'
+        previous = {'url': missing, 'title': 'Gone', 'subtitle': '', 'cover': ''}
+        with open(fetch_covers.OUTPUT_FILE, 'w') as f:
+            json.dump({'films': [previous], 'books': []}, f)
+
+        recs = {
+            'films': [f'{base_url}/film/heat/', {'url': missing, 'cover': '/images/favorites/films/gone.jpg'}],
+            'books': [never_scraped],
+        }
+        output, failures = fetch_covers.scrape_all(recs, force=True)
+        assert [url for url, _ in failures] == [missing, never_scraped]
+        assert [film['title'] for film in output['films']] == ['Heat', 'Gone']
+        # The kept entry still honours favorites.json overrides
+        assert output['films'][1]['cover'] == '/images/favorites/films/gone.jpg'
+        assert output['books'] == []
+
+
+class TestCaching:
+    def write_previous(self, films):
+        with open(fetch_covers.OUTPUT_FILE, 'w') as f:
+            json.dump({'films': films, 'books': []}, f)
+
+    def test_resolved_favorites_are_not_rescraped(self, base_url):
+        heat = f'{base_url}/film/heat/'
+        self.write_previous([{'url': heat, 'title': 'Heat (kept)', 'subtitle': '', 'cover': 'old.jpg'}])
+        recs = {'films': [{'url': heat, 'cover': '/images/favorites/films/heat.jpg'}, f'{base_url}/film/alien/']}
+
+        output, failures = fetch_covers.scrape_all(recs)
+        assert failures == []
+        assert StubPages.requests == ['/film/alien/']
+        assert output['films'][0] == {
+            'url': heat, 'title': 'Heat (kept)', 'subtitle': '', 'cover': '/images/favorites/films/heat.jpg',
+        }
+        assert output['films'][1]['title'] == 'Alien'
+
+    def test_refresh_rescrapes_only_the_given_urls(self, base_url):
+        heat, alien = f'{base_url}/film/heat/', f'{base_url}/film/alien/'
+        self.write_previous([
+            {'url': heat, 'title': 'Old', 'subtitle': '', 'cover': ''},
+            {'url': alien, 'title': 'Old', 'subtitle': '', 'cover': ''},
+        ])
+
+        output, _ = fetch_covers.scrape_all({'films': [heat, alien]}, refresh={alien})
+        assert StubPages.requests == ['/film/alien/']
+        assert [film['title'] for film in output['films']] == ['Old', 'Alien']
+
+    def test_force_reads_cached_pages_and_refresh_bypasses_them(self, base_url, tmp_path):
+        cache = ResponseCache(str(tmp_path / 'page_cache'))
+        heat = f'{base_url}/film/heat/'
+
+        fetch_covers.scrape_all({'films': [heat]}, cache=cache)
+        fetch_covers.scrape_all({'films': [heat]}, cache=cache, force=True)
+        assert StubPages.requests == ['/film/heat/']
+
+        output, _ = fetch_covers.scrape_all({'films': [heat]}, cache=cache, refresh=True)
+        assert StubPages.requests == ['/film/heat/', '/film/heat/']
+        assert output['films'][0]['title'] == 'Heat'
@@ -0,0 +1,208 @@
+"""Tests for the download-then-encode cover optimization pipeline."""
+
+from __future__ import annotations
+
+import hashlib
+from io import BytesIO
+
+import pytest
+from PIL import Image
+
+import optimize_assets
+
+
+def cover_bytes(color: str, size=(230, 345)) -> bytes:
+    buffer = BytesIO()
+    Image.new('RGB', size, color).save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+class FakeSources:
+    """Serves covers by URL, answering 304 when If-None-Match matches."""
+
+    def __init__(self, bodies, etags=True):
+        self.bodies = bodies
+        self.etags = etags
+        self.requests = []
+
+    def __call__(self, url, conditional_headers=None):
+        self.requests.append((url, conditional_headers or {}))
+        body = self.bodies[url]
+        if isinstance(body, Exception):
+            raise body
+        etag = f'"{hashlib.sha256(body).hexdigest()[:8]}"' if self.etags else None
+        validators = {'etag': etag, 'last_modified': None}
+        if etag and (conditional_headers or {}).get('If-None-Match') == etag:
+            return None, validators
+        return body, validators
+
+
+@pytest.fixture
+def sources(tmp_path, monkeypatch):
+    monkeypatch.setattr(optimize_assets, 'PUBLIC_DIR', tmp_path)
+    monkeypatch.setattr(optimize_assets, 'OUTPUT_DIR', tmp_path / 'images' / 'favorites')
+    fake = FakeSources({
+        'https://covers.example.com/heat.jpg': cover_bytes('red'),
+        'https://covers.example.com/alien.jpg': cover_bytes('green', (500, 500)),
+        'https://covers.example.com/seven.jpg': cover_bytes('blue'),
+    })
+    monkeypatch.setattr(optimize_assets, 'download_image', fake)
+    return fake
+
+
+def run(films, favorite_films, manifest, books=(), favorite_books=(), refresh=False):
+    jobs = optimize_assets.plan_entries(
+        films, 'films', optimize_assets.favorite_cover_sources(favorite_films), manifest
+    )
+    jobs += optimize_assets.plan_entries(
+        list(books), 'books', optimize_assets.favorite_cover_sources(list(favorite_books)), manifest
+    )
+    return optimize_assets.optimize_entries(
+        jobs,
+        list(favorite_films) + list(favorite_books),
+        manifest,
+        workers=2,
+        download_workers=2,
+        refresh=refresh,
+    )
+
+
+def two_films():
+    return [
+        {'url': 'film/heat', 'title': 'Heat', 'cover': 'https://covers.example.com/heat.jpg'},
+        {'url': 'film/alien', 'title': 'Alien', 'cover': 'https://covers.example.com/alien.jpg'},
+    ]
+
+
+class TestOptimizeEntries:
+    def test_writes_optimized_covers_and_updates_entries(self, sources, tmp_path):
+        films = two_films() + [{'url': 'film/local', 'title': 'Local', 'cover': '/images/favorites/films/local.jpg'}]
+        books = [{'url': 'book/7', 'title': 'Seven', 'cover': 'https://covers.example.com/ignored.jpg'}]
+        favorite_books = [{'url': 'book/7', 'cover': 'https://covers.example.com/seven.jpg'}]
+        manifest = {}
+
+        assert run(films, ['film/heat', 'film/alien'], manifest, books, favorite_books) == (3, [])
+        assert [film['cover'] for film in films] == [
+            '/images/favorites/films/heat.jpg',
+            '/images/favorites/films/alien.jpg',
+            '/images/favorites/films/local.jpg',
+        ]
+        assert books[0]['cover'] == favorite_books[0]['cover'] == '/images/favorites/books/seven.jpg'
+        output = tmp_path / 'images' / 'favorites' / 'films' / 'alien.jpg'
+        with Image.open(output) as image:
+            assert image.format == 'JPEG'
+            assert image.size == optimize_assets.TARGET_SIZE
+            assert image.info.get('progressive')
+
+        record = manifest['/images/favorites/films/alien.jpg']
+        assert record['source_url'] == 'https://covers.example.com/alien.jpg'
+        assert record['source_sha256'] == hashlib.sha256(sources.bodies[record['source_url']]).hexdigest()
+        assert record['params'] == optimize_assets.PIPELINE_PARAMS
+        assert record['output_sha256'] == optimize_assets.sha256_file(output)
+        assert '/images/favorites/films/local.jpg' not in manifest
+
+    def test_titles_with_the_same_slug_are_rejected(self, sources, tmp_path):
+        films = [
+            {'url': 'film/heat', 'title': 'Heat', 'cover': 'https://covers.example.com/heat.jpg'},
+            {'url': 'film/heat-1995', 'title': 'Heat!', 'cover': 'https://covers.example.com/alien.jpg'},
+        ]
+        with pytest.raises(ValueError, match='/images/favorites/films/heat.jpg'):
+            run(films, [], {})
+        assert not (tmp_path / 'images' / 'favorites' / 'films' / 'heat.jpg').exists()
+
+    def test_failures_are_collected_and_the_rest_built(self, sources):
+        sources.bodies['https://covers.example.com/gone.jpg'] = OSError('404 Not Found')
+        sources.bodies['https://covers.example.com/broken.jpg'] = b'not an image'
+        films = two_films() + [
+            {'url': 'film/gone', 'title': 'Gone', 'cover': 'https://covers.example.com/gone.jpg'},
+            {'url': 'film/broken', 'title': 'Broken', 'cover': 'https://covers.example.com/broken.jpg'},
+        ]
+        manifest = {}
+
+        saved, failures = run(films, [], manifest)
+        assert saved == 2
+        assert sorted(url for url, _ in failures) == [
+            'https://covers.example.com/broken.jpg',
+            'https://covers.example.com/gone.jpg',
+        ]
+        assert [film['cover'] for film in films[2:]] == [
+            'https://covers.example.com/gone.jpg',
+            'https://covers.example.com/broken.jpg',
+        ]
+        assert sorted(manifest) == ['/images/favorites/films/alien.jpg', '/images/favorites/films/heat.jpg']
+
+
+class TestIncrementalBuilds:
+    def test_current_assets_are_kept_without_requests(self, sources):
+        films, manifest = two_films(), {}
+        run(films, [], manifest)
+        sources.requests.clear()
+
+        assert run(two_films(), [], manifest) == (0, [])
+        assert sources.requests == []
+
+    def test_refresh_revalidates_unchanged_sources_without_rebuilding(self, sources):
+        films, manifest = two_films(), {}
+        run(films, [], manifest)
+        sources.requests.clear()
+
+        # The entries now point at the local files the manifest tracks
+        assert run(films, [], manifest, refresh=True) == (0, [])
+        assert sorted(headers['If-None-Match'] for _, headers in sources.requests) == sorted(
+            record['etag'] for record in manifest.values()
+        )
+
+    def test_same_bytes_without_validators_are_not_rebuilt(self, sources):
+        sources.etags = False
+        films, manifest = two_films(), {}
+        run(films, [], manifest)
+        assert run(two_films(), [], manifest, refresh=True) == (0, [])
+
+    def test_failed_revalidation_keeps_the_current_asset(self, sources):
+        films, manifest = two_films(), {}
+        run(films, [], manifest)
+        before = dict(manifest)
+        sources.bodies['https://covers.example.com/alien.jpg'] = OSError('connection reset')
+
+        films = two_films()
+        saved, failures = run(films, [], manifest, refresh=True)
+        assert saved == 0
+        assert [url for url, _ in failures] == ['https://covers.example.com/alien.jpg']
+        assert films[1]['cover'] == '/images/favorites/films/alien.jpg'
+        assert manifest == before
+
+    def test_changed_source_rebuilds_only_that_asset(self, sources):
+        films, manifest = two_films(), {}
+        run(films, [], manifest)
+        sources.bodies['https://covers.example.com/alien.jpg'] = cover_bytes('yellow')
+
+        assert run(films, [], manifest, refresh=True) == (1, [])
+        assert manifest['/images/favorites/films/alien.jpg']['source_sha256'] == hashlib.sha256(
+            cover_bytes('yellow')
+        ).hexdigest()
+
+    def test_changed_settings_or_missing_output_rebuild(self, sources, tmp_path, monkeypatch):
+        films, manifest = two_films(), {}
+        run(films, [], manifest)
+
+        (tmp_path / 'images' / 'favorites' / 'films' / 'heat.jpg').unlink()
+        assert run(films, [], manifest) == (1, [])
+
+        monkeypatch.setattr(optimize_assets, 'PIPELINE_PARAMS', {**optimize_assets.PIPELINE_PARAMS, 'jpeg_quality': 80})
+        assert run(films, [], manifest) == (2, [])
+        assert all(headers == {} for _, headers in sources.requests[-2:])
+
+
+class TestPruneAssets:
+    def test_deletes_unreferenced_images_and_records(self, sources, tmp_path):
+        films, manifest = two_films(), {}
+        run(films, [], manifest)
+        hand_placed = tmp_path / 'images' / 'favorites' / 'books' / 'kept.jpg'
+        hand_placed.parent.mkdir(parents=True)
+        hand_placed.write_bytes(b'jpeg')
+
+        referenced = {'/images/favorites/films/heat.jpg', '/images/favorites/books/kept.jpg'}
+        assert optimize_assets.prune_assets(referenced, manifest) == 1
+        assert not (tmp_path / 'images' / 'favorites' / 'films' / 'alien.jpg').exists()
+        assert hand_placed.exists()
+        assert list(manifest) == ['/images/favorites/films/heat.jpg']
@@ -0,0 +1,94 @@
+"""Differential tests: the streaming page metadata extractor against BeautifulSoup."""
+
+from __future__ import annotations
+
+import os
+import re
+
+import pytest
+from bs4 import BeautifulSoup
+
+from fetch_covers import POSTER_PATTERN
+from page_metadata import extract_page_metadata
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+FIXTURES = sorted(name for name in os.listdir(FIXTURES_DIR) if name.endswith('.html'))
+
+CHUNK_SIZES = [1, 7, 500, 4096, 16 * 1024, 1 << 30]
+
+
+def read_fixture(name: str) -> bytes:
+    with open(os.path.join(FIXTURES_DIR, name), 'rb') as f:
+        return f.read()
+
+
+def chunked(body: bytes, size: int) -> list[bytes]:
+    return [body[i:i + size] for i in range(0, len(body), size)]
+
+
+def parse_with_soup(html: str, pattern: re.Pattern[str] | None) -> tuple[str | None, str | None, str | None]:
+    """What scrape_film and scrape_book read from the page before page_metadata."""
+    soup = BeautifulSoup(html, 'html.parser')
+    ld_tag = soup.find('script', type='application/ld+json')
+    og_img = soup.find('meta', property='og:image')
+    matches = pattern.findall(html) if pattern else []
+    return (
+        ld_tag.string if ld_tag else None,
+        og_img['content'] if og_img else None,
+        matches[0] if matches else None,
+    )
+
+
+def extract(chunks: list[bytes], pattern: re.Pattern[str] | None) -> tuple[str | None, str | None, str | None]:
+    page = extract_page_metadata(chunks, pattern)
+    return page.json_ld, page.meta.get('og:image'), page.match
+
+
+@pytest.mark.parametrize('size', CHUNK_SIZES)
+@pytest.mark.parametrize('name', FIXTURES)
+def test_matches_beautifulsoup_on_fixtures(name, size):
+    body = read_fixture(name)
+    pattern = POSTER_PATTERN if name.startswith('film_') else None
+    assert extract(chunked(body, size), pattern) == parse_with_soup(body.decode(), pattern)
+
+
+@pytest.mark.parametrize('name', FIXTURES)
+def test_stops_reading_once_metadata_is_known(name):
+    body = read_fixture(name)
+    pattern = POSTER_PATTERN if name.startswith('film_') else None
+    read: list[bytes] = []
+    extract_page_metadata(chunked(body, 4096), pattern, read)
+    assert sum(map(len, read)) < len(body) / 2
+
+
+EDGE_CASES = [
+    '',
+    '<html><head><title>No metadata</title></head><body><p>film-poster/1/x.jpg</p></body></html>',
+    # JSON-LD only in the body, after the head closed
+    '<html><head><meta property="og:image" content="a.jpg"></head><body>'
+    '<script type="application/ld+json">{"name": "x"}</script></body></html>',
+    # Only the first JSON-LD block and og:image count
+    '<head><script type="application/ld+json">{"n": 1}</script>'
+    '<meta property="og:image" content="first &amp; best.jpg"><meta property="og:image" content="second.jpg">'
+    '<script type="application/ld+json">{"n": 2}</script></head>',
+    # Other script types are skipped, and markup inside scripts is not parsed
+    '<head><script type="application/json">{"n": 0}</script>'
+    '<script type="application/ld+json">{"html": "<meta property=\\"og:image\\" content=\\"no\\">"}</script>'
+    '</head><body><img src="film-poster/1/2/x-0-230-0-345-crop.jpg?v=1"></body>',
+    # A poster URL ending the document
+    '<head><script type="application/ld+json">{}</script></head>film-poster/9/x-0-230-0-345-crop.jpg?v=end',
+    # A page cut off inside the JSON-LD script
+    '<head><meta property="og:image" content="c.jpg"><script type="application/ld+json">{"name": "cut',
+]
+
+
+@pytest.mark.parametrize('size', [1, 3, 1 << 30])
+@pytest.mark.parametrize('html', EDGE_CASES)
+def test_matches_beautifulsoup_on_edge_cases(html, size):
+    body = html.encode()
+    assert extract(chunked(body, size), POSTER_PATTERN) == parse_with_soup(html, POSTER_PATTERN)
+
+
+def test_decodes_multibyte_characters_split_across_chunks():
+    html = '<head><script type="application/ld+json">{"name": "Amélie — 天気の子"}</script></head>'
+    assert extract(chunked(html.encode(), 1), None)[0] == '{"name": "Amélie — 天気の子"}'
@@ -3,18 +3,45 @@
 from __future__ import annotations
 
 import os
+import sys
 import json
-import time
+import hashlib
 import logging
 import argparse
 import xml.etree.ElementTree as ET
-from datetime import datetime
-from email.utils import parsedate_to_datetime
+from datetime import datetime, timedelta, timezone
 
 import requests
 
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
-DATA_FILE = os.path.join(SCRIPT_DIR, 'data', 'books.json')
+
+sys.path.insert(0, os.path.join(SCRIPT_DIR, '..', 'shared'))
+from dates import add_date_fields, rfc2822_to_epoch
+from http_cache import ValidatorCache
+from http_scheduler import RequestScheduler
+from instrument import add_trace_arguments, configure_from_args, finish, span, traced
+from jsonl_store import JsonlStore
+from rss_stream import iter_response_items
+from text_clean import clean_page
+
+DATA_FILE = os.path.join(SCRIPT_DIR, 'data', 'books.jsonl')
+LEGACY_DATA_FILE = os.path.join(SCRIPT_DIR, 'data', 'books.json')
+VALIDATORS_FILE = os.path.join(SCRIPT_DIR, 'data', 'http_validators.json')
+STATE_FILE = os.path.join(SCRIPT_DIR, 'data', 'sync_state.json')
+
+# Deep mode stops after this many consecutive pages with no new or changed books
+UNCHANGED_PAGES_LIMIT = 2
+
+# Deep mode runs a full sweep when the last one is older than this, to catch
+# edits to books far down the feed
+FULL_SWEEP_INTERVAL = timedelta(days=7)
+
+# RFC 2822 date fields stored with _epoch and _iso companions
+DATE_FIELDS = ('user_read_at', 'user_date_added')
+
+# Fields clean_page normalizes once per page
+REVIEW_FIELDS = ('user_review',)
+IMAGE_FIELDS = ('book_image_url', 'book_large_image_url')
 
 GOODREADS_RSS_URL = "https://www.goodreads.com/review/list_rss/44763252-noah-eisen"
 HEADERS = {
@@ -27,23 +54,72 @@ logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(
 logger = logging.getLogger(__name__)
 
 
+def book_content_hash(book: dict) -> str:
+    """Hash the user-editable fields that make a re-fetched book worth saving."""
+    fields = [book.get('user_rating'), book.get('user_review'), book.get('user_read_at'), book.get('user_shelves')]
+    return hashlib.sha1(json.dumps(fields).encode()).hexdigest()
+
+
+def add_book_dates(book: dict) -> dict:
+    """Add the canonical epoch and ISO 8601 forms of a book's dates."""
+    return add_date_fields(book, DATE_FIELDS, rfc2822_to_epoch, iso=True)
+
+
 class GoodreadsDataCollector:
-    def __init__(self, full_refresh: bool = False, shelf: str | None = None):
+    def __init__(
+        self,
+        full_refresh: bool = False,
+        shelf: str | None = None,
+        deep: bool = False,
+        scheduler: RequestScheduler | None = None,
+    ):
         self.full_refresh = full_refresh
         self.shelf = shelf
+        self.deep = deep
+        self.completed_full_sweep = False
+        # One pooled keep-alive session for every page of the feed
+        self.session = requests.Session()
+        self.session.headers.update(HEADERS)
+        self.scheduler = scheduler or RequestScheduler(session=self.session)
+        self.validators = ValidatorCache(VALIDATORS_FILE)
+        self.store = JsonlStore(DATA_FILE, 'book_id', legacy_path=LEGACY_DATA_FILE)
         self.existing_books = []
         self.fetched_books = []
 
     def load_existing_books(self) -> None:
-        if os.path.exists(DATA_FILE):
-            with open(DATA_FILE, 'r') as f:
-                self.existing_books = json.load(f)
+        with span('fetch_books.load_existing') as load:
+            self.existing_books = self.store.load()
+            load.add(len(self.existing_books))
+        if self.existing_books:
             logger.info(f"Loaded {len(self.existing_books)} existing books")
         else:
             logger.info("No existing books file found")
-            self.existing_books = []
+
+    def load_sync_state(self) -> dict:
+        if not os.path.exists(STATE_FILE):
+            return {}
+        with open(STATE_FILE, 'r') as f:
+            return json.load(f)
+
+    def full_sweep_due(self) -> bool:
+        """Whether deep mode should sweep every page this run."""
+        last_sweep = self.load_sync_state().get('last_full_sweep', {}).get(self.shelf or 'all')
+        if not last_sweep:
+            return True
+        return datetime.now(timezone.utc) - datetime.fromisoformat(last_sweep) >= FULL_SWEEP_INTERVAL
+
+    def save_sync_state(self) -> None:
+        state = self.load_sync_state()
+        state.setdefault('last_full_sweep', {})[self.shelf or 'all'] = datetime.now(timezone.utc).isoformat()
+        with open(STATE_FILE, 'w') as f:
+            json.dump(state, f, indent=2)
 
     def _parse_item(self, item: ET.Element) -> dict:
+        """Read one RSS item's fields as they appear in the feed.
+
+        Review HTML and image URLs are cleaned afterwards, a page at a time,
+        by ``clean_page``.
+        """
         def text(tag):
             el = item.find(tag)
             return el.text.strip() if el is not None and el.text else None
@@ -58,24 +134,13 @@ class GoodreadsDataCollector:
         user_read_at = text('user_read_at')
         user_date_added = text('user_date_added')
 
-        # Extract image URL and clean size patterns
-        image_url = text('book_image_url') or ''
-        import re
-        image_url = re.sub(r'\.?_S[XY]\d+_', '', image_url)
-
-        large_image_url = text('book_large_image_url') or ''
-        large_image_url = re.sub(r'\.?_S[XY]\d+_', '', large_image_url)
-
         # Extract review from description
         description = text('description') or ''
         review_text = ''
         if 'review:' in description:
             review_text = description.split('review:', 1)[1].strip()
-            # Strip leading/trailing <br/> tags left over from the RSS format
-            review_text = re.sub(r'^(<br\s*/?>)+', '', review_text)
-            review_text = re.sub(r'(<br\s*/?>)+$', '', review_text).strip()
 
-        return {
+        return add_book_dates({
             'book_id': book_id,
             'title': title,
             'author_name': text('author_name'),
@@ -88,77 +153,105 @@ class GoodreadsDataCollector:
             'num_pages': text('num_pages'),
             'book_published': text('book_published'),
             'average_rating': text('average_rating'),
-            'book_image_url': image_url,
-            'book_large_image_url': large_image_url,
+            'book_image_url': text('book_image_url') or '',
+            'book_large_image_url': text('book_large_image_url') or '',
             'guid': text('guid'),
-        }
+        })
 
+    @traced('fetch_books.fetch')
     def fetch_books(self) -> None:
         is_backfill = self.full_refresh or len(self.existing_books) == 0
+        if not is_backfill and self.deep and self.full_sweep_due():
+            logger.info(f"Last full sweep is over {FULL_SWEEP_INTERVAL.days} days old")
+            is_backfill = True
+        is_deep = self.deep and not is_backfill
+
         if is_backfill:
             logger.info("Full refresh mode: fetching ALL pages")
+        elif is_deep:
+            logger.info(f"Incremental-deep mode: fetching until {UNCHANGED_PAGES_LIMIT} pages in a row are unchanged")
         else:
             logger.info("Incremental mode: fetching page 1 only")
         logger.info(f"Fetching shelf: {self.shelf or 'all'}")
 
+        existing_hashes = {b['book_id']: book_content_hash(b) for b in self.existing_books} if is_deep else {}
+        unchanged_pages = 0
+
         page = 1
         while True:
             params = {"per_page": 100, "page": page}
             if self.shelf:
                 params["shelf"] = self.shelf
             logger.info(f"Fetching page {page}: {GOODREADS_RSS_URL}")
-            response = requests.get(GOODREADS_RSS_URL, params=params, headers=HEADERS, timeout=30)
+            cache_key = self.validators.key(GOODREADS_RSS_URL, params)
+            # Only trust a 304 when the books it refers to are already stored
+            headers = self.validators.conditional_headers(cache_key) if self.existing_books else {}
+            with span('fetch_books.request'):
+                response = self.scheduler.get(GOODREADS_RSS_URL, params=params, headers=headers, timeout=30, stream=True)
+
+            if response.status_code == 304:
+                response.close()
+                cached_items = (self.validators.get(cache_key) or {}).get('items', 0)
+                logger.info(f"Page {page} unchanged since last fetch ({cached_items} items), skipping")
+                if not cached_items or not (is_backfill or is_deep):
+                    break
+                # A backfill pages on to the end; only deep mode stops at unchanged pages
+                if is_deep:
+                    unchanged_pages += 1
+                    if unchanged_pages >= UNCHANGED_PAGES_LIMIT:
+                        logger.info(f"{unchanged_pages} unchanged pages in a row, done.")
+                        break
+                page += 1
+                continue
             response.raise_for_status()
 
-            root = ET.fromstring(response.content.decode('utf-8'))
-            items = root.findall('.//item')
+            # Items are parsed as the page downloads, then cleaned as a batch
+            with span('fetch_books.parse_page') as parse:
+                books = clean_page(
+                    list(iter_response_items(response, self._parse_item)),
+                    html_fields=REVIEW_FIELDS,
+                    image_fields=IMAGE_FIELDS,
+                )
+                parse.add(len(books))
+            items = len(books)
+            changed = 0
+            for book in books:
+                if book['book_id']:
+                    self.fetched_books.append(book)
+                    if existing_hashes.get(book['book_id']) != book_content_hash(book):
+                        changed += 1
+
+            self.validators.update(cache_key, response, items=items)
             if not items:
                 logger.info(f"No items on page {page}, done.")
                 break
 
-            for item in items:
-                book = self._parse_item(item)
-                if book['book_id']:
-                    self.fetched_books.append(book)
+            logger.info(f"Page {page}: fetched {items} items")
 
-            logger.info(f"Page {page}: fetched {len(items)} items")
-
-            if not is_backfill:
+            if is_deep:
+                logger.info(f"Page {page}: {changed} new or changed books")
+                unchanged_pages = 0 if changed else unchanged_pages + 1
+                if unchanged_pages >= UNCHANGED_PAGES_LIMIT:
+                    logger.info(f"{unchanged_pages} unchanged pages in a row, done.")
+                    break
+            elif not is_backfill:
                 break
 
             page += 1
-            time.sleep(1)
 
+        self.completed_full_sweep = is_backfill
         logger.info(f"Total fetched: {len(self.fetched_books)} books")
 
+    @traced('fetch_books.save')
     def update_and_save_books(self) -> None:
-        existing_dict = {b['book_id']: b for b in self.existing_books}
-        new_count = 0
-        updated_count = 0
-
-        for book in self.fetched_books:
-            if book['book_id'] in existing_dict:
-                existing_dict[book['book_id']] = book
-                updated_count += 1
-            else:
-                existing_dict[book['book_id']] = book
-                new_count += 1
+        # Only new or changed books are appended to the store
+        new_count, updated_count = self.store.upsert(self.fetched_books)
+        logger.info(f"Saved {len(self.store.index)} books ({new_count} new, {updated_count} updated)")
 
-        all_books = list(existing_dict.values())
-        # Sort by read date descending
-        def parse_read_at(date_str: str) -> datetime:
-            try:
-                return parsedate_to_datetime(date_str)
-            except Exception:
-                return datetime.min
-
-        all_books.sort(key=lambda x: (x.get('user_read_at') is None, parse_read_at(x.get('user_read_at', ''))), reverse=True)
-
-        os.makedirs(os.path.dirname(DATA_FILE), exist_ok=True)
-        with open(DATA_FILE, 'w') as f:
-            json.dump(all_books, f, indent=2)
-
-        logger.info(f"Saved {len(all_books)} books ({new_count} new, {updated_count} updated)")
+        # Saved only after the books, so validators never vouch for unsaved pages
+        self.validators.save()
+        if self.completed_full_sweep:
+            self.save_sync_state()
 
 
 def main() -> None:
@@ -168,16 +261,30 @@ def main() -> None:
         action="store_true",
         help="Fetch every RSS page instead of only the first incremental page.",
     )
+    parser.add_argument(
+        "--deep",
+        action="store_true",
+        help=(
+            "Keep paging while pages hold new or changed books, stopping after "
+            f"{UNCHANGED_PAGES_LIMIT} unchanged pages in a row. Runs a full sweep "
+            f"when the last one is over {FULL_SWEEP_INTERVAL.days} days old."
+        ),
+    )
     parser.add_argument(
         "--shelf",
         help="Fetch a specific Goodreads shelf. Defaults to the account's all-shelf RSS feed.",
     )
+    add_trace_arguments(parser)
     args = parser.parse_args()
-
-    collector = GoodreadsDataCollector(full_refresh=args.full, shelf=args.shelf)
-    collector.load_existing_books()
-    collector.fetch_books()
-    collector.update_and_save_books()
+    configure_from_args(args)
+
+    try:
+        collector = GoodreadsDataCollector(full_refresh=args.full, shelf=args.shelf, deep=args.deep)
+        collector.load_existing_books()
+        collector.fetch_books()
+        collector.update_and_save_books()
+    finally:
+        finish()
 
 
 if __name__ == '__main__':
@@ -0,0 +1,154 @@
+"""Tests for the Goodreads RSS paging modes against a feed served locally."""
+
+from __future__ import annotations
+
+import hashlib
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+from xml.sax.saxutils import escape
+
+import pytest
+
+import fetch_books
+from fetch_books import GoodreadsDataCollector
+from http_scheduler import HostPolicy, RequestScheduler
+from jsonl_store import read_records
+
+BOOKS_PER_PAGE = 2
+
+
+def make_book(book_id: int, rating: int = 4) -> dict:
+    return {
+        'book_id': str(book_id),
+        'title': f'Book {book_id} by Someone',
+        'author_name': 'Someone',
+        'user_rating': str(rating),
+        'user_read_at': 'Tue, 12 May 2026 00:00:00 -0700',
+        'user_date_added': 'Mon, 11 May 2026 00:00:00 -0700',
+        'user_shelves': 'read',
+        'description': f'review: Thoughts on book {book_id}.',
+    }
+
+
+def rss_page(books: list[dict]) -> bytes:
+    items = ''.join(
+        '<item>' + ''.join(f'<{tag}>{escape(value)}</{tag}>' for tag, value in book.items()) + '</item>'
+        for book in books
+    )
+    return f'<?xml version="1.0"?><rss version="2.0"><channel>{items}</channel></rss>'.encode()
+
+
+class StubGoodreads(BaseHTTPRequestHandler):
+    """Serves ``pages`` with an ETag per page, answering 304 when it matches."""
+
+    pages: dict[int, list[dict]] = {}
+    requested: list[int] = []
+
+    def do_GET(self):
+        page = int(parse_qs(urlparse(self.path).query)['page'][0])
+        self.requested.append(page)
+        body = rss_page(self.pages.get(page, []))
+        etag = f'"{hashlib.sha1(body).hexdigest()}"'
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/rss+xml')
+        self.send_header('ETag', etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def feed(tmp_path, monkeypatch):
+    StubGoodreads.requested = []
+    StubGoodreads.pages = {
+        page: [make_book(page * BOOKS_PER_PAGE + i) for i in range(BOOKS_PER_PAGE)]
+        for page in range(1, 11)
+    }
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubGoodreads)
+    thread = threading.Thread(target=server.serve_forever, kwargs={'poll_interval': 0.05}, daemon=True)
+    thread.start()
+    monkeypatch.setattr(fetch_books, 'GOODREADS_RSS_URL', f'http://127.0.0.1:{server.server_address[1]}/rss')
+    monkeypatch.setattr(fetch_books, 'DATA_FILE', str(tmp_path / 'books.jsonl'))
+    monkeypatch.setattr(fetch_books, 'LEGACY_DATA_FILE', str(tmp_path / 'books.json'))
+    monkeypatch.setattr(fetch_books, 'VALIDATORS_FILE', str(tmp_path / 'http_validators.json'))
+    monkeypatch.setattr(fetch_books, 'STATE_FILE', str(tmp_path / 'sync_state.json'))
+    yield StubGoodreads
+    server.shutdown()
+
+
+def run(**kwargs) -> GoodreadsDataCollector:
+    """Run one fetch like main() does and return the collector."""
+    scheduler = RequestScheduler(policies={'127.0.0.1': HostPolicy(limits=[(1000, 1.0)])}, max_wait=60)
+    collector = GoodreadsDataCollector(scheduler=scheduler, **kwargs)
+    collector.load_existing_books()
+    collector.fetch_books()
+    collector.update_and_save_books()
+    return collector
+
+
+def stored_ids() -> set[str]:
+    return {book['book_id'] for book in read_records(fetch_books.DATA_FILE, 'book_id')}
+
+
+class TestFetchBooks:
+    def test_first_run_backfills_every_page(self, feed):
+        collector = run()
+        assert feed.requested == list(range(1, 12))
+        assert len(stored_ids()) == 10 * BOOKS_PER_PAGE
+        assert collector.completed_full_sweep
+
+    def test_incremental_fetches_page_one_only(self, feed):
+        run()
+        feed.requested.clear()
+        feed.pages[1][0] = make_book(int(feed.pages[1][0]['book_id']), rating=1)
+
+        collector = run()
+        assert feed.requested == [1]
+        assert not collector.completed_full_sweep
+        assert {b['user_rating'] for b in read_records(fetch_books.DATA_FILE, 'book_id') if b['book_id'] == '2'} == {1}
+
+    def test_deep_stops_after_unchanged_pages(self, feed):
+        run()
+        feed.requested.clear()
+        feed.pages[2][0] = make_book(int(feed.pages[2][0]['book_id']), rating=2)
+
+        collector = run(deep=True)
+        # Page 2 changed, then pages 3 and 4 answer 304
+        assert feed.requested == [1, 2, 3, 4]
+        assert not collector.completed_full_sweep
+
+    def test_deep_counts_unchanged_200_pages(self, feed):
+        run()
+        feed.requested.clear()
+        # A new ETag with the same books is fetched but holds nothing new
+        feed.pages[1].append(make_book(int(feed.pages[1][0]['book_id'])))
+
+        run(deep=True)
+        assert feed.requested == [1, 2]
+
+    def test_backfill_pages_through_unchanged_pages(self, feed):
+        run()
+        feed.requested.clear()
+
+        collector = run(full_refresh=True)
+        # Every cached page answers 304, and the sweep still reaches the end
+        assert feed.requested == list(range(1, 12))
+        assert collector.completed_full_sweep
+        assert len(stored_ids()) == 10 * BOOKS_PER_PAGE
+
+    def test_due_full_sweep_pages_to_the_end(self, feed, monkeypatch):
+        run()
+        feed.requested.clear()
+        monkeypatch.setattr(fetch_books, 'FULL_SWEEP_INTERVAL', fetch_books.timedelta(0))
+
+        collector = run(deep=True)
+        assert feed.requested == list(range(1, 12))
+        assert collector.completed_full_sweep
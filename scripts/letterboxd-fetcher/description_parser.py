@@ -0,0 +1,225 @@
+"""Lightweight extractor for Letterboxd RSS item descriptions.
+
+Each description is a small HTML fragment: a poster ``<img>`` followed by the
+review as a run of ``<p>`` elements. ``parse_description`` pulls out both in a
+single ``HTMLParser`` pass without building a tree, and stops as soon as the
+review run ends.
+
+The output matches what the previous BeautifulSoup code produced:
+``soup.find('img')['src']`` and the ``str()`` of the first ``<p>`` after the
+image plus each directly following ``<p>`` sibling. Serialization follows
+BeautifulSoup's ``html.parser`` builder and its minimal formatter. Attributes
+are sorted, multi-valued attributes have their whitespace normalized, void
+elements are written as ``<br/>``, whitespace-only text is collapsed, and
+only ``&``, ``<`` and ``>`` are escaped. ``test_description_parser.py``
+checks the two against each other.
+"""
+
+from __future__ import annotations
+
+from html.entities import html5
+from html.parser import HTMLParser
+
+# Elements BeautifulSoup treats as empty and serializes as <tag/>
+VOID_ELEMENTS = frozenset({
+    'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'keygen', 'link', 'menuitem',
+    'meta', 'param', 'source', 'track', 'wbr', 'basefont', 'bgsound', 'command', 'frame',
+    'image', 'isindex', 'nextid', 'spacer',
+})
+
+# Elements whose text BeautifulSoup writes out unescaped
+RAW_TEXT_ELEMENTS = frozenset({'script', 'style'})
+
+# Elements inside which BeautifulSoup keeps whitespace-only text as is
+PRESERVE_WHITESPACE_ELEMENTS = frozenset({'pre', 'textarea'})
+
+ASCII_SPACES = '\x20\x0a\x09\x0c\x0d'
+
+# Whitespace-separated attributes BeautifulSoup splits and rejoins with single spaces
+LIST_ATTRIBUTES = {
+    '*': {'class', 'accesskey', 'dropzone'},
+    'a': {'rel', 'rev'},
+    'link': {'rel', 'rev'},
+    'td': {'headers'},
+    'th': {'headers'},
+    'form': {'accept-charset'},
+    'object': {'archive'},
+    'area': {'rel'},
+    'icon': {'sizes'},
+    'iframe': {'sandbox'},
+    'output': {'for'},
+}
+
+
+def escape_text(value: str) -> str:
+    return value.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+
+
+def quote_attribute(value: str) -> str:
+    value = escape_text(value)
+    if '"' not in value:
+        return f'"{value}"'
+    if "'" not in value:
+        return f"'{value}'"
+    return '"' + value.replace('"', '&quot;') + '"'
+
+
+def format_start_tag(tag: str, attrs: list[tuple[str, str | None]]) -> str:
+    # Later duplicates win, as in BeautifulSoup
+    values = {name: value or '' for name, value in attrs}
+    list_names = LIST_ATTRIBUTES['*'] | LIST_ATTRIBUTES.get(tag, set())
+    parts = [tag]
+    for name in sorted(values):
+        value = values[name]
+        if name in list_names:
+            value = ' '.join(value.split())
+        parts.append(f'{name}={quote_attribute(value)}')
+    return '<' + ' '.join(parts) + '>'
+
+
+class _Done(Exception):
+    """Raised to stop parsing once the review run has ended."""
+
+
+class DescriptionParser(HTMLParser):
+    """Single-pass state machine over one description fragment.
+
+    ``stack`` mirrors BeautifulSoup's open elements as ``(tag, index)`` pairs,
+    where ``index`` locates the tag's start in ``review`` while it is being
+    captured. An end tag closes back to the nearest open element of that name,
+    or is ignored when there is none. Void elements close straight away, except
+    in one BeautifulSoup quirk: a self-closed ``<br/>`` seen after a plain
+    ``<br>`` stays open and can gain children.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=False)
+        self.image_url = ''
+        self.found_image = False
+        self.stack: list[tuple[str, int | None]] = []
+        # Void elements BeautifulSoup closed on sight, so it swallows one end tag each
+        self.already_closed: list[str] = []
+        self.review: list[str] = []
+        # Text since the last tag, which BeautifulSoup treats as one string
+        self.text: list[str] = []
+        # Stack depth of the <p> being captured, or None between paragraphs
+        self.capture_depth: int | None = None
+        # Stack depth at which the next <p> sibling must open, once one is captured
+        self.sibling_depth: int | None = None
+
+    def handle_starttag(self, tag, attrs):
+        self.open_element(tag, attrs)
+        if tag in VOID_ELEMENTS:
+            self.pop_to(tag)
+            self.already_closed.append(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        self.open_element(tag, attrs)
+        self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        if tag in self.already_closed:
+            self.already_closed.remove(tag)
+            return
+        self.pop_to(tag)
+
+    def handle_data(self, data):
+        if self.capture_depth is not None:
+            self.text.append(data)
+
+    def handle_entityref(self, name):
+        # Unknown entities stay literal, minus the semicolon, as in BeautifulSoup
+        self.handle_data(html5.get(name + ';') or html5.get(name) or f'&{name}')
+
+    def handle_charref(self, name):
+        code = int(name[1:], 16) if name[0] in 'xX' else int(name)
+        data = None
+        if code < 256:
+            # Low references are often meant as windows-1252, not code points
+            try:
+                data = bytes([code]).decode('windows-1252')
+            except UnicodeDecodeError:
+                pass
+        if not data:
+            try:
+                data = chr(code)
+            except (ValueError, OverflowError):
+                pass
+        self.handle_data(data or '\N{REPLACEMENT CHARACTER}')
+
+    def handle_comment(self, data):
+        self.flush_text()
+        if self.capture_depth is not None:
+            self.review.append(f'<!--{data}-->')
+
+    def flush_text(self) -> None:
+        if not self.text:
+            return
+        data = ''.join(self.text)
+        self.text = []
+        tags = [name for name, _ in self.stack]
+        if not data.strip(ASCII_SPACES) and not PRESERVE_WHITESPACE_ELEMENTS.intersection(tags):
+            # BeautifulSoup collapses whitespace-only strings
+            data = '\n' if '\n' in data else ' '
+        self.review.append(data if tags[-1] in RAW_TEXT_ELEMENTS else escape_text(data))
+
+    def open_element(self, tag: str, attrs: list[tuple[str, str | None]]) -> None:
+        self.flush_text()
+        if not self.found_image:
+            if tag == 'img':
+                self.found_image = True
+                self.image_url = next((value or '' for name, value in reversed(attrs) if name == 'src'), '')
+        elif self.capture_depth is None:
+            if self.sibling_depth is not None and tag != 'p':
+                # The first element after a captured <p> is its next sibling
+                raise _Done
+            if tag == 'p':
+                self.capture_depth = len(self.stack)
+                self.sibling_depth = len(self.stack)
+
+        index = None
+        if self.capture_depth is not None:
+            index = len(self.review)
+            self.review.append(format_start_tag(tag, attrs))
+        self.stack.append((tag, index))
+
+    def pop_to(self, tag: str) -> None:
+        self.flush_text()
+        if not any(name == tag for name, _ in self.stack):
+            return
+        while self.stack:
+            name, index = self.stack.pop()
+            if index is not None:
+                self.close_element(name, index)
+                if len(self.stack) == self.capture_depth:
+                    self.capture_depth = None
+            if self.sibling_depth is not None and len(self.stack) < self.sibling_depth:
+                # The captured run's parent closed, so there are no more siblings
+                raise _Done
+            if name == tag:
+                return
+
+    def close_element(self, name: str, index: int) -> None:
+        if name in VOID_ELEMENTS and index == len(self.review) - 1:
+            self.review[index] = self.review[index][:-1] + '/>'
+        else:
+            self.review.append(f'</{name}>')
+
+    def finish(self) -> None:
+        """Close any <p> left open at the end of the fragment."""
+        self.flush_text()
+        if self.capture_depth is not None:
+            while len(self.stack) > self.capture_depth:
+                self.close_element(*self.stack.pop())
+
+
+def parse_description(html: str) -> tuple[str, str]:
+    """Return ``(image_url, review_html)`` for a Letterboxd item description."""
+    parser = DescriptionParser()
+    try:
+        parser.feed(html)
+        parser.close()
+    except _Done:
+        pass
+    parser.finish()
+    return parser.image_url, ''.join(parser.review)
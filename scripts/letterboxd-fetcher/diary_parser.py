@@ -0,0 +1,138 @@
+"""Lightweight extractor for Letterboxd diary pages.
+
+A diary page (``/<username>/films/diary/page/<n>/``) lists up to 50 viewings
+as ``<tr class="diary-entry-row" data-viewing-id="...">`` rows, newest first,
+followed by pagination links. ``parse_diary_page`` reads the rows in a single
+``HTMLParser`` pass and returns film records shaped like the RSS ones, with
+the fields the diary does not carry (review text, poster, publish date) left
+empty.
+"""
+
+from __future__ import annotations
+
+import re
+from html.parser import HTMLParser
+from urllib.parse import urljoin
+
+LETTERBOXD_URL = 'https://letterboxd.com'
+
+DIARY_DATE_RE = re.compile(r'/films/diary/for/(\d{4})/(\d{2})/(\d{2})/')
+DIARY_PAGE_RE = re.compile(r'/films/diary/page/(\d+)/')
+RATING_RE = re.compile(r'\brated-(\d+)\b')
+
+
+def diary_guid(viewing_id: str, has_review: bool) -> str:
+    """The RSS guid Letterboxd gives the same diary entry."""
+    kind = 'review' if has_review else 'watch'
+    return f'letterboxd-{kind}-{viewing_id}'
+
+
+class DiaryParser(HTMLParser):
+    """Single-pass state machine over one diary page.
+
+    Tracks the open entry row and the class of the cell being read, and
+    records each row's fields as their tags and text go by.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.entries: list[dict] = []
+        self.last_page = 1
+        self.row: dict | None = None
+        self.cell = ''
+        self.in_title = False
+        self.in_year = False
+        self.title_text: list[str] = []
+        self.year_text: list[str] = []
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        classes = (attrs.get('class') or '').split()
+        href = attrs.get('href') or ''
+
+        if tag == 'a':
+            match = DIARY_PAGE_RE.search(href)
+            if match:
+                self.last_page = max(self.last_page, int(match.group(1)))
+
+        if tag == 'tr':
+            self.finish_row()
+            if 'diary-entry-row' in classes and attrs.get('data-viewing-id'):
+                self.row = {'viewing_id': attrs['data-viewing-id'], 'is_rewatch': False, 'has_review': False}
+                self.title_text = []
+                self.year_text = []
+            return
+        if self.row is None:
+            return
+
+        if tag == 'td':
+            self.cell = next((c for c in classes if c.startswith('td-')), '')
+            if self.cell == 'td-rewatch':
+                self.row['is_rewatch'] = 'icon-status-off' not in classes
+        elif tag == 'a':
+            match = DIARY_DATE_RE.search(href)
+            if match and 'watched_date' not in self.row:
+                self.row['watched_date'] = '-'.join(match.groups())
+            if self.cell == 'td-film-details' and '/film/' in href and 'link' not in self.row:
+                self.row['link'] = urljoin(LETTERBOXD_URL, href)
+                self.in_title = True
+            elif self.cell == 'td-review' and 'icon-review' in classes:
+                self.row['has_review'] = True
+        elif tag == 'span':
+            if self.cell == 'td-rating' and 'rating' in classes and 'rating' not in self.row:
+                match = RATING_RE.search(attrs.get('class') or '')
+                if match:
+                    self.row['rating'] = int(match.group(1)) / 2
+            elif self.cell == 'td-released':
+                self.in_year = True
+
+    def handle_endtag(self, tag):
+        if tag == 'a':
+            self.in_title = False
+        elif tag == 'span':
+            self.in_year = False
+        elif tag == 'tr':
+            self.finish_row()
+        elif tag in ('tbody', 'table'):
+            self.finish_row()
+
+    def handle_data(self, data):
+        if self.row is None:
+            return
+        if self.in_title:
+            self.title_text.append(data)
+        elif self.in_year:
+            self.year_text.append(data)
+
+    def finish_row(self) -> None:
+        row, self.row = self.row, None
+        self.cell = ''
+        self.in_title = self.in_year = False
+        if row is None:
+            return
+
+        title = ''.join(self.title_text).strip()
+        if not title:
+            return
+        year = ''.join(self.year_text).strip()
+        self.entries.append({
+            'guid': diary_guid(row['viewing_id'], row['has_review']),
+            'title': title,
+            'year': int(year) if year.isdigit() else None,
+            'rating': row.get('rating', 0.0),
+            'watched_date': row.get('watched_date'),
+            'is_rewatch': row['is_rewatch'],
+            'image_url': '',
+            'review': '',
+            'link': row.get('link', ''),
+            'pub_date': None,
+        })
+
+
+def parse_diary_page(html: str) -> tuple[list[dict], int]:
+    """Return ``(films, last_page)`` for one diary page, films newest first."""
+    parser = DiaryParser()
+    parser.feed(html)
+    parser.close()
+    parser.finish_row()
+    return parser.entries, parser.last_page
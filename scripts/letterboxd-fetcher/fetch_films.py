@@ -3,18 +3,43 @@
 from __future__ import annotations
 
 import os
+import re
+import sys
 import json
 import logging
+import argparse
 import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
 
 import requests
-from bs4 import BeautifulSoup
+
+from description_parser import parse_description
+from diary_parser import parse_diary_page
 
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
-DATA_FILE = os.path.join(SCRIPT_DIR, 'data', 'films.json')
+
+sys.path.insert(0, os.path.join(SCRIPT_DIR, '..', 'shared'))
+from dates import add_date_fields, iso_to_epoch, rfc2822_to_epoch
+from http_cache import ValidatorCache
+from http_scheduler import RateLimitExceeded, RequestScheduler
+from instrument import add_trace_arguments, configure_from_args, finish, span, traced
+from jsonl_store import JsonlStore
+from rss_stream import iter_response_items
+
+DATA_FILE = os.path.join(SCRIPT_DIR, 'data', 'films.jsonl')
+LEGACY_DATA_FILE = os.path.join(SCRIPT_DIR, 'data', 'films.json')
+VALIDATORS_FILE = os.path.join(SCRIPT_DIR, 'data', 'http_validators.json')
+BACKFILL_STATE_FILE = os.path.join(SCRIPT_DIR, 'data', 'backfill_state.json')
 
 LETTERBOXD_USERNAME = 'ncteisen'
 RSS_URL = f"https://letterboxd.com/{LETTERBOXD_USERNAME}/rss/"
+DIARY_URL = f"https://letterboxd.com/{LETTERBOXD_USERNAME}/films/diary/"
+
+# RSS and diary guids end in the diary entry's viewing ID
+VIEWING_GUID_RE = re.compile(r'^letterboxd-(?:review|watch)-(\d+)$')
+
+# Fields the diary knows; anything else on a stored film (review, poster) is kept
+DIARY_FIELDS = ('title', 'year', 'rating', 'watched_date', 'is_rewatch', 'link')
 NAMESPACES = {
     'letterboxd': 'https://letterboxd.com',
     'dc': 'http://purl.org/dc/elements/1.1/',
@@ -25,19 +50,35 @@ logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(
 logger = logging.getLogger(__name__)
 
 
+def add_film_dates(film: dict) -> dict:
+    """Add the epoch of a film's watch date, and the epoch and ISO 8601 forms of its RSS publish date."""
+    add_date_fields(film, ('pub_date',), rfc2822_to_epoch, iso=True)
+    return add_date_fields(film, ('watched_date',), iso_to_epoch)
+
+
+def csv_guid(film: dict) -> str:
+    """The guid the one-off Letterboxd CSV import gave a diary entry."""
+    return f"csv-{film['title']}-{film['year']}-{(film['watched_date'] or '')[:7]}"
+
+
 class LetterboxdDataCollector:
-    def __init__(self):
+    def __init__(self, scheduler: RequestScheduler | None = None, diary_url: str = DIARY_URL):
+        self.diary_url = diary_url
+        self.session = requests.Session()
+        self.scheduler = scheduler or RequestScheduler(session=self.session)
+        self.validators = ValidatorCache(VALIDATORS_FILE)
+        self.store = JsonlStore(DATA_FILE, 'guid', legacy_path=LEGACY_DATA_FILE)
         self.existing_films = []
         self.fetched_films = []
 
     def load_existing_films(self) -> None:
-        if os.path.exists(DATA_FILE):
-            with open(DATA_FILE, 'r') as f:
-                self.existing_films = json.load(f)
+        with span('fetch_films.load_existing') as load:
+            self.existing_films = self.store.load()
+            load.add(len(self.existing_films))
+        if self.existing_films:
             logger.info(f"Loaded {len(self.existing_films)} existing films")
         else:
             logger.info("No existing films file found")
-            self.existing_films = []
 
     def _parse_item(self, item: ET.Element) -> dict | None:
         try:
@@ -61,20 +102,9 @@ class LetterboxdDataCollector:
             # Extract image and review from description HTML
             description = item.find('description')
             desc_text = description.text if description is not None and description.text else ''
-            soup = BeautifulSoup(desc_text, 'html.parser')
-
-            img_tag = soup.find('img')
-            image_url = img_tag.get('src', '') if img_tag else ''
+            image_url, review_text = parse_description(desc_text)
 
-            review_paragraphs = []
-            if img_tag:
-                current = img_tag.find_next('p')
-                while current and current.name == 'p':
-                    review_paragraphs.append(current)
-                    current = current.find_next_sibling()
-            review_text = ''.join(str(p) for p in review_paragraphs)
-
-            return {
+            return add_film_dates({
                 'guid': guid,
                 'title': title_el.text.strip(),
                 'year': int(year_el.text.strip()) if year_el is not None and year_el.text else None,
@@ -85,54 +115,198 @@ class LetterboxdDataCollector:
                 'review': review_text,
                 'link': link_el.text.strip() if link_el is not None and link_el.text else '',
                 'pub_date': pub_date_el.text.strip() if pub_date_el is not None and pub_date_el.text else None,
-            }
+            })
         except Exception as e:
             logger.error(f"Failed to parse RSS item: {e}")
             return None
 
+    @traced('fetch_films.fetch')
     def fetch_films(self) -> None:
         logger.info(f"Fetching RSS from {RSS_URL}")
-        response = requests.get(RSS_URL, timeout=30)
+        # Only trust a 304 when the films it refers to are already stored
+        headers = self.validators.conditional_headers(RSS_URL) if self.existing_films else {}
+        with span('fetch_films.request'):
+            response = self.scheduler.get(RSS_URL, headers=headers, timeout=30, stream=True)
+        if response.status_code == 304:
+            response.close()
+            logger.info("RSS feed unchanged since last fetch, skipping")
+            return
         response.raise_for_status()
 
-        root = ET.fromstring(response.content.decode('utf-8'))
-        channel = root.find('channel')
-
-        for item in channel.findall('item'):
-            film = self._parse_item(item)
-            if film:
-                self.fetched_films.append(film)
+        # Items are parsed as the feed downloads, one at a time
+        with span('fetch_films.parse_feed') as parse:
+            for film in iter_response_items(response, self._parse_item):
+                if film:
+                    self.fetched_films.append(film)
+            parse.add(len(self.fetched_films))
+        self.validators.update(RSS_URL, response)
 
         logger.info(f"Fetched {len(self.fetched_films)} films from RSS")
 
-    def update_and_save_films(self) -> None:
-        existing_dict = {f['guid']: f for f in self.existing_films}
+    @traced('fetch_films.fetch_diary_page', count=lambda result: len(result[0]))
+    def fetch_diary_page(self, page: int) -> tuple[list[dict], int]:
+        """Fetch one diary page, returning its films and the last page number."""
+        response = self.scheduler.get(f"{self.diary_url}page/{page}/", timeout=30)
+        if response.status_code == 404:
+            return [], page - 1
+        response.raise_for_status()
+        films, last_page = parse_diary_page(response.text)
+        # The current page is not a link in the pagination
+        return films, max(last_page, page)
+
+    def load_backfill_state(self) -> dict:
+        if not os.path.exists(BACKFILL_STATE_FILE):
+            return {}
+        with open(BACKFILL_STATE_FILE, 'r') as f:
+            return json.load(f)
+
+    def save_backfill_state(self, next_page: int, last_page: int) -> None:
+        os.makedirs(os.path.dirname(BACKFILL_STATE_FILE), exist_ok=True)
+        with open(BACKFILL_STATE_FILE, 'w') as f:
+            json.dump({'next_page': next_page, 'last_page': last_page}, f, indent=2)
+
+    @traced('fetch_films.merge_diary', count=sum)
+    def merge_diary_films(self, films: list[dict]) -> tuple[int, int]:
+        """Merge diary films into the existing films, returning (new, updated) counts.
+
+        Films match on viewing ID, so a stored RSS item keeps its review and
+        poster. A film logged by the CSV import is replaced by its diary entry.
+        """
+        by_guid = {f['guid']: f for f in self.existing_films}
+        by_viewing = {}
+        for guid in by_guid:
+            match = VIEWING_GUID_RE.match(guid)
+            if match:
+                by_viewing[match.group(1)] = guid
+
         new_count = 0
         updated_count = 0
-
-        for film in self.fetched_films:
-            if film['guid'] in existing_dict:
-                existing_dict[film['guid']] = film
-                updated_count += 1
-            else:
-                existing_dict[film['guid']] = film
+        for film in films:
+            add_film_dates(film)
+            viewing_id = VIEWING_GUID_RE.match(film['guid']).group(1)
+            guid = by_viewing.get(viewing_id)
+            if guid is None and csv_guid(film) in by_guid:
+                guid = csv_guid(film)
+            if guid is None:
+                by_guid[film['guid']] = film
+                by_viewing[viewing_id] = film['guid']
                 new_count += 1
+                continue
 
-        all_films = list(existing_dict.values())
-        all_films.sort(key=lambda x: (x.get('watched_date') is None, x.get('watched_date', '')), reverse=True)
+            stored = by_guid.pop(guid)
+            merged = {**film, **stored, **{field: film[field] for field in DIARY_FIELDS}}
+            merged['guid'] = stored['guid'] if guid != csv_guid(film) else film['guid']
+            # The watch date may come from the diary and the publish date from the store
+            add_film_dates(merged)
+            by_guid[merged['guid']] = merged
+            by_viewing[viewing_id] = merged['guid']
+            updated_count += 1
+
+        self.existing_films = list(by_guid.values())
+        return new_count, updated_count
+
+    def backfill(self, workers: int = 2) -> None:
+        """Walk every diary page, merging its films into the store as it goes.
+
+        Pages are fetched in windows of ``workers`` and merged in page order.
+        The store and a cursor are saved after each window, so an interrupted
+        run resumes near where it stopped. The diary can shift between runs:
+        new entries push older ones onto later pages, which are read again
+        harmlessly, and deleted entries pull them back onto earlier ones. A
+        resumed run therefore re-reads the last page it merged, which covers up
+        to a page's worth of deletions; a fresh backfill catches anything more.
+        """
+        state = self.load_backfill_state()
+        page = state.get('next_page', 1)
+        last_page = state.get('last_page', page)
+        if page > 1:
+            # Re-merging films is idempotent, so overlapping one page is safe
+            page -= 1
+            logger.info(f"Resuming diary backfill at page {page} of {last_page}")
+        else:
+            logger.info(f"Starting diary backfill from {self.diary_url}")
 
-        os.makedirs(os.path.dirname(DATA_FILE), exist_ok=True)
-        with open(DATA_FILE, 'w') as f:
-            json.dump(all_films, f, indent=2)
+        total_new = 0
+        total_updated = 0
+        with ThreadPoolExecutor(max_workers=max(workers, 1)) as executor:
+            while page <= last_page:
+                # The first page reveals how many pages there are
+                window = range(page, min(page + max(workers, 1), last_page + 1))
+                results = executor.map(self.fetch_diary_page, window)
 
-        logger.info(f"Saved {len(all_films)} films ({new_count} new, {updated_count} updated)")
+                done = False
+                try:
+                    for window_page, (films, page_last) in zip(window, results):
+                        if not films:
+                            logger.info(f"No entries on diary page {window_page}, done.")
+                            done = True
+                            break
+                        last_page = max(last_page, page_last)
+                        new_count, updated_count = self.merge_diary_films(films)
+                        total_new += new_count
+                        total_updated += updated_count
+                        logger.info(f"Diary page {window_page}: {new_count} new, {updated_count} updated")
+                        page = window_page + 1
+                except (RateLimitExceeded, requests.RequestException) as e:
+                    logger.error(f"Stopping diary backfill at page {page}: {e}")
+                    self.save_films()
+                    self.save_backfill_state(page, last_page)
+                    return
+
+                self.save_films()
+                if done:
+                    break
+                self.save_backfill_state(page, last_page)
+
+        if os.path.exists(BACKFILL_STATE_FILE):
+            os.remove(BACKFILL_STATE_FILE)
+        logger.info(f"Diary backfill complete: {total_new} new, {total_updated} updated films")
+
+    @traced('fetch_films.save')
+    def save_films(self) -> None:
+        # Appends only new or changed films, plus tombstones for replaced CSV entries
+        self.store.replace(self.existing_films)
+
+    @traced('fetch_films.save')
+    def update_and_save_films(self) -> None:
+        # Only new or changed films are appended to the store
+        new_count, updated_count = self.store.upsert(self.fetched_films)
+        logger.info(f"Saved {len(self.store.index)} films ({new_count} new, {updated_count} updated)")
+
+        # Saved only after the films, so validators never vouch for unsaved items
+        self.validators.save()
 
 
 def main() -> None:
-    collector = LetterboxdDataCollector()
-    collector.load_existing_films()
-    collector.fetch_films()
-    collector.update_and_save_films()
+    parser = argparse.ArgumentParser(description="Fetch Letterboxd film data.")
+    parser.add_argument(
+        "--backfill",
+        action="store_true",
+        help=(
+            "Walk every diary page instead of reading the RSS feed, merging entries "
+            "into films.jsonl. Resumes from data/backfill_state.json if interrupted."
+        ),
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=2,
+        help="Number of diary pages to request at once during a backfill.",
+    )
+    add_trace_arguments(parser)
+    args = parser.parse_args()
+    configure_from_args(args)
+
+    try:
+        collector = LetterboxdDataCollector()
+        collector.load_existing_films()
+        if args.backfill:
+            collector.backfill(workers=args.workers)
+            return
+        collector.fetch_films()
+        collector.update_and_save_films()
+    finally:
+        finish()
 
 
 if __name__ == '__main__':
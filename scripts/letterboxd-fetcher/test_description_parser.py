@@ -0,0 +1,92 @@
+"""Differential tests: the description extractor against the BeautifulSoup original."""
+
+from __future__ import annotations
+
+import os
+import random
+import xml.etree.ElementTree as ET
+
+import pytest
+from bs4 import BeautifulSoup
+
+from description_parser import parse_description
+
+FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'rss_feed.xml')
+
+
+def parse_with_soup(desc_text: str) -> tuple[str, str]:
+    """The BeautifulSoup extraction _parse_item used before parse_description."""
+    soup = BeautifulSoup(desc_text, 'html.parser')
+
+    img_tag = soup.find('img')
+    image_url = img_tag.get('src', '') if img_tag else ''
+
+    review_paragraphs = []
+    if img_tag:
+        current = img_tag.find_next('p')
+        while current and current.name == 'p':
+            review_paragraphs.append(current)
+            current = current.find_next_sibling()
+    return image_url, ''.join(str(p) for p in review_paragraphs)
+
+
+def fixture_descriptions() -> list[str]:
+    root = ET.parse(FIXTURE).getroot()
+    return [item.findtext('description') or '' for item in root.iter('item')]
+
+
+EDGE_CASES = [
+    '',
+    'plain text, no markup',
+    '<p>review without a poster</p>',
+    '<p><img src="a.jpg"/></p>',
+    '<p><img src="a.jpg"/></p> <p>one</p>\n<p>two</p> ',
+    '<p><img src="a.jpg"/></p><p>one</p><!-- note --><p>two</p>',
+    '<p><img src="a.jpg"/></p><p>one</p><div>stop</div><p>not review</p>',
+    '<p><img src="a.jpg"/></p><p>one<p>nested</p></p><p>three</p>',
+    '<p><img src="a.jpg"/></p><p>unclosed<p>nested',
+    '<p><img src="a.jpg"/></p><p>x</i>y</p></div><p>z</p>',
+    '<div><img src="a&amp;b.jpg"></div><p class=" x  y ">a &lt; &amp;nbsp; &nbsp; &#8217;<br>b</br><i>c</i></p>',
+    '<p><img src="a.jpg"/></p><p title=\'say "hi"\' data-x>q</p><p/>z<p>after</p>',
+    '<p><img src="a.jpg"/></p><p title="it\'s &quot;both&quot;">q</p>',
+    '<img src="a.jpg"><span><p>in span</p></span><p>out</p>',
+    '<div><p><img src="a.jpg"/></p><p>one</p></div><p>outside</p>',
+    '<p><img src="a.jpg"/></p><p>a <a href="x?a=1&amp;b=2" rel=" nofollow  noopener">link<a>.</a></a></p>',
+    '<p><img src="a.jpg"/></p><p><script>if (a < b) {}</script></p>',
+    '<p><img src="first.jpg" src="second.jpg"/></p><p><img src="inline.jpg">x</p>',
+    '<p><img alt="no src"/></p><p>review</p>',
+    '<p><img src="a.jpg"/></p><p>Caf&eacute; &#x1F600; &amp; &gt;</p>',
+]
+
+# Fragments that random_fragments strings together into mostly-broken markup
+TOKENS = [
+    '<p>', '</p>', '<p/>', '<P CLASS=z>', '<img src="a.jpg"/>', '<img src=b>', '</img>', '<br>', '<br/>', '</br>',
+    '<hr>', '<i>', '</i>', '<em>', '</em>', '<div>', '</div>', '<span class=" a b">', '</span>',
+    '<a href="q">', '</a>', '<b title="a\'b">', '<pre>', '</pre>', '<textarea>', '<script>a<b</script>',
+    '<!--c-->', 'text', ' ', ' \t ', '\n', ' & ', '&amp;', '&amp', '&nbsp;', '&notin', '&bogus;',
+    '&#8217;', '&#150;', '&#x81;', '&#0;', '&#99999999;',
+]
+
+
+def random_fragments(count: int, seed: int = 0) -> list[str]:
+    rng = random.Random(seed)
+    return [''.join(rng.choice(TOKENS) for _ in range(rng.randint(0, 25))) for _ in range(count)]
+
+
+class TestParseDescription:
+    def test_fixture_has_reviews(self):
+        descriptions = fixture_descriptions()
+        assert len(descriptions) > 100
+        assert sum(1 for d in descriptions if parse_with_soup(d)[1]) > 50
+
+    @pytest.mark.parametrize('desc_text', fixture_descriptions())
+    def test_matches_soup_on_recorded_feed(self, desc_text):
+        assert parse_description(desc_text) == parse_with_soup(desc_text)
+
+    @pytest.mark.parametrize('desc_text', EDGE_CASES)
+    def test_matches_soup_on_edge_cases(self, desc_text):
+        assert parse_description(desc_text) == parse_with_soup(desc_text)
+
+    def test_matches_soup_on_random_markup(self):
+        mismatches = [d for d in random_fragments(2000) if parse_description(d) != parse_with_soup(d)]
+        assert mismatches == []
@@ -0,0 +1,202 @@
+"""Tests for the Letterboxd diary backfill against saved diary pages served locally."""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import fetch_films
+from dates import iso_to_epoch
+from diary_parser import parse_diary_page
+from fetch_films import LetterboxdDataCollector
+from http_scheduler import HostPolicy, RequestScheduler
+from jsonl_store import read_records
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+
+def read_fixture(page: int) -> str:
+    with open(os.path.join(FIXTURES_DIR, f'diary_page_{page}.html')) as f:
+        return f.read()
+
+
+class StubLetterboxd(BaseHTTPRequestHandler):
+    requested: list[int] = []
+    # Page number -> status to answer with instead of the fixture
+    failures: dict[int, int] = {}
+
+    def do_GET(self):
+        match = re.fullmatch(r'/ncteisen/films/diary/page/(\d+)/', self.path)
+        page = int(match.group(1)) if match else 0
+        self.requested.append(page)
+        path = os.path.join(FIXTURES_DIR, f'diary_page_{page}.html')
+        if page in self.failures:
+            self.send_response(self.failures[page])
+            self.send_header('Retry-After', '3600')
+            self.end_headers()
+            return
+        if not os.path.exists(path):
+            self.send_response(404)
+            self.end_headers()
+            return
+        with open(path, 'rb') as f:
+            body = f.read()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def stub_server():
+    StubLetterboxd.requested = []
+    StubLetterboxd.failures = {}
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubLetterboxd)
+    thread = threading.Thread(target=server.serve_forever, kwargs={'poll_interval': 0.05}, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{server.server_address[1]}/ncteisen/films/diary/'
+    server.shutdown()
+
+
+@pytest.fixture
+def data_files(tmp_path, monkeypatch):
+    monkeypatch.setattr(fetch_films, 'DATA_FILE', str(tmp_path / 'films.jsonl'))
+    monkeypatch.setattr(fetch_films, 'LEGACY_DATA_FILE', str(tmp_path / 'films.json'))
+    monkeypatch.setattr(fetch_films, 'BACKFILL_STATE_FILE', str(tmp_path / 'backfill_state.json'))
+    return tmp_path
+
+
+def make_collector(diary_url: str) -> LetterboxdDataCollector:
+    scheduler = RequestScheduler(policies={'127.0.0.1': HostPolicy(limits=[(100, 1.0)])}, max_wait=60)
+    collector = LetterboxdDataCollector(scheduler=scheduler, diary_url=diary_url)
+    collector.load_existing_films()
+    return collector
+
+
+def stored_films(data_files) -> list[dict]:
+    return read_records(str(data_files / 'films.jsonl'), 'guid')
+
+
+def stored_guids(data_files) -> list[str]:
+    return [film['guid'] for film in stored_films(data_files)]
+
+
+class TestParseDiaryPage:
+    def test_reads_rows_and_pagination(self):
+        films, last_page = parse_diary_page(read_fixture(1))
+
+        assert last_page == 3
+        assert [f['guid'] for f in films] == [
+            'letterboxd-review-1460790310',
+            'letterboxd-review-1458812277',
+            'letterboxd-watch-1455130001',
+        ]
+        assert films[0] == {
+            'guid': 'letterboxd-review-1460790310',
+            'title': 'When Harry Met Sally...',
+            'year': 1989,
+            'rating': 5.0,
+            'watched_date': '2026-08-19',
+            'is_rewatch': True,
+            'image_url': '',
+            'review': '',
+            'link': 'https://letterboxd.com/ncteisen/film/when-harry-met-sally/1/',
+            'pub_date': None,
+        }
+        assert films[2]['rating'] == 3.5
+
+    def test_unescapes_titles_and_reads_unrated_rows(self):
+        films, _ = parse_diary_page(read_fixture(2))
+        assert films[1]['title'] == 'Dungeons & Dragons: Honor Among Thieves'
+        assert films[2]['rating'] == 0.0
+        assert not films[2]['is_rewatch']
+
+
+class TestBackfill:
+    @pytest.mark.parametrize('workers', [1, 2, 4])
+    def test_walks_every_page_and_merges_by_viewing_id(self, stub_server, data_files, workers):
+        rss_item = {
+            'guid': 'letterboxd-review-1460790310',
+            'title': 'When Harry Met Sally...',
+            'year': 1989,
+            'rating': 4.5,
+            'watched_date': '2026-08-19',
+            'is_rewatch': True,
+            'image_url': 'https://a.ltrbxd.com/poster.jpg',
+            'review': '<p>High maintenance</p>',
+            'link': 'https://letterboxd.com/ncteisen/film/when-harry-met-sally/1/',
+            'pub_date': 'Fri, 21 Aug 2026 14:46:44 +1200',
+        }
+        csv_item = {**rss_item, 'guid': 'csv-Oslo, August 31st-2011-2025-07', 'title': 'Oslo, August 31st',
+                    'year': 2011, 'watched_date': '2025-07-04', 'review': '', 'image_url': ''}
+        # Starts from a legacy films.json, which the store migrates on load
+        (data_files / 'films.json').write_text(json.dumps([rss_item, csv_item]))
+
+        collector = make_collector(stub_server)
+        collector.backfill(workers=workers)
+
+        films = {film['guid']: film for film in stored_films(data_files)}
+        assert not (data_files / 'films.json').exists()
+        assert len(films) == 8
+        harry = films['letterboxd-review-1460790310']
+        assert harry['rating'] == 5.0
+        assert harry['review'] == '<p>High maintenance</p>'
+        assert harry['pub_date'] == rss_item['pub_date']
+        # Date fields follow the merged watch and publish dates
+        assert harry['pub_date_iso'] == '2026-08-21T02:46:44Z'
+        assert harry['watched_date_epoch'] == iso_to_epoch(harry['watched_date'])
+        assert 'csv-Oslo, August 31st-2011-2025-07' not in films
+        assert films['letterboxd-watch-1301200001']['rating'] == 4.5
+        assert sorted(set(StubLetterboxd.requested)) == [1, 2, 3]
+        assert not (data_files / 'backfill_state.json').exists()
+
+    def test_resumes_from_saved_cursor_rereading_the_last_merged_page(self, stub_server, data_files):
+        (data_files / 'backfill_state.json').write_text(json.dumps({'next_page': 3, 'last_page': 3}))
+
+        make_collector(stub_server).backfill(workers=1)
+
+        # An entry deleted from page 2 would have pulled page 3's first entry onto it
+        assert StubLetterboxd.requested == [2, 3]
+        assert stored_guids(data_files)[-2:] == ['letterboxd-watch-1001200002', 'letterboxd-watch-1001200001']
+        assert len(stored_guids(data_files)) == 5
+        assert not (data_files / 'backfill_state.json').exists()
+
+    def test_interrupted_run_saves_progress_and_resumes(self, stub_server, data_files):
+        StubLetterboxd.failures = {2: 429}
+        make_collector(stub_server).backfill(workers=1)
+
+        assert len(stored_guids(data_files)) == 3
+        with open(data_files / 'backfill_state.json') as f:
+            assert json.load(f) == {'next_page': 2, 'last_page': 3}
+
+        StubLetterboxd.failures = {}
+        StubLetterboxd.requested = []
+        make_collector(stub_server).backfill(workers=1)
+
+        assert StubLetterboxd.requested == [1, 2, 3]
+        assert len(stored_guids(data_files)) == 8
+        assert not (data_files / 'backfill_state.json').exists()
+
+    def test_http_error_saves_progress(self, stub_server, data_files):
+        StubLetterboxd.failures = {3: 403}
+        make_collector(stub_server).backfill(workers=1)
+
+        assert len(stored_guids(data_files)) == 6
+        with open(data_files / 'backfill_state.json') as f:
+            assert json.load(f) == {'next_page': 3, 'last_page': 3}
+
+    def test_missing_page_ends_the_backfill(self, stub_server, data_files):
+        (data_files / 'backfill_state.json').write_text(json.dumps({'next_page': 3, 'last_page': 5}))
+
+        make_collector(stub_server).backfill(workers=3)
+
+        assert sorted(StubLetterboxd.requested) == [2, 3, 4]
+        assert len(stored_guids(data_files)) == 5
@@ -0,0 +1,112 @@
+"""Shared date normalization for the fetchers and social data processors.
+
+Source records carry dates as strings: RFC 2822 for Goodreads and the
+Letterboxd feed (``Tue, 12 May 2026 00:00:00 +0000``) and ISO 8601 for
+Strava (``2026-05-12T14:03:00Z``). Each date field gets a ``<field>_epoch``
+companion, an integer count of seconds since the Unix epoch (or None when
+the field is missing or unparseable). RFC 2822 fields also get
+``<field>_iso``, the same instant as a UTC ISO 8601 string, which sorts
+chronologically as plain text.
+
+The fetchers add both with ``add_date_fields`` as records are ingested, and
+``migrate_dates.py`` upgrades records stored before that. The processors
+call ``normalize_dates``, which only parses records that lack the epoch.
+The parsers keep an LRU cache, since the same strings repeat across
+records (every book read on one day has the same ``user_read_at``).
+"""
+
+from __future__ import annotations
+
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from functools import lru_cache
+from typing import Callable, Iterable
+
+# Distinct date strings kept per parser
+CACHE_SIZE = 4096
+
+EPOCH_SUFFIX = '_epoch'
+ISO_SUFFIX = '_iso'
+
+
+def _to_epoch(dt: datetime) -> int:
+    # Dates without a zone (RFC 2822 "-0000") are taken as UTC
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return int(dt.timestamp())
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def rfc2822_to_epoch(value: str) -> int | None:
+    """Epoch seconds for an RFC 2822 date string, or None if it does not parse."""
+    try:
+        return _to_epoch(parsedate_to_datetime(value))
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def iso_to_epoch(value: str) -> int | None:
+    """Epoch seconds for an ISO 8601 date string, or None if it does not parse."""
+    try:
+        return _to_epoch(datetime.fromisoformat(value.replace('Z', '+00:00')))
+    except (TypeError, ValueError):
+        return None
+
+
+def utc_year(epoch: int) -> int:
+    return time.gmtime(epoch).tm_year
+
+
+def epoch_to_iso(epoch: int) -> str:
+    return time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(epoch))
+
+
+def epoch_field(field: str) -> str:
+    """Name of the record key holding ``field``'s epoch seconds."""
+    return field + EPOCH_SUFFIX
+
+
+def iso_field(field: str) -> str:
+    """Name of the record key holding ``field`` as a UTC ISO 8601 string."""
+    return field + ISO_SUFFIX
+
+
+def add_date_fields(
+    record: dict,
+    fields: Iterable[str],
+    parse: Callable[[str], int | None],
+    iso: bool = False,
+) -> dict:
+    """Set ``<field>_epoch`` (and ``<field>_iso`` if ``iso``) from each raw field, returning the record.
+
+    Unlike ``record_epoch``, this always re-parses, so it is safe to call
+    again after a raw field changes.
+    """
+    for field in fields:
+        value = record.get(field)
+        epoch = parse(value) if value else None
+        record[epoch_field(field)] = epoch
+        if iso:
+            record[iso_field(field)] = epoch_to_iso(epoch) if epoch is not None else None
+    return record
+
+
+def record_epoch(record: dict, field: str, parse: Callable[[str], int | None]) -> int | None:
+    """Epoch seconds of ``record[field]``, parsed on first use and stored on the record."""
+    key = epoch_field(field)
+    if key in record:
+        return record[key]
+    value = record.get(field)
+    epoch = parse(value) if value else None
+    record[key] = epoch
+    return epoch
+
+
+def normalize_dates(records: Iterable[dict], fields: Iterable[str], parse: Callable[[str], int | None]) -> None:
+    """Store ``<field>_epoch`` on every record for each of ``fields``."""
+    fields = list(fields)
+    for record in records:
+        for field in fields:
+            record_epoch(record, field, parse)
@@ -0,0 +1,66 @@
+"""On-disk validator cache for conditional GETs.
+
+Stores the ``ETag`` and ``Last-Modified`` validators of each fetched URL so
+the next run can send ``If-None-Match``/``If-Modified-Since`` and skip
+downloading and parsing anything the server reports as unchanged (304).
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+from urllib.parse import urlencode
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+
+class ValidatorCache:
+    """Per-request validators, keyed by URL plus query parameters.
+
+    Entries can carry extra fields (such as how many items a page held), so
+    a 304 still tells the caller what the unchanged response contained.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.entries: dict[str, dict] = {}
+        if os.path.exists(path):
+            try:
+                with open(path, 'r') as f:
+                    self.entries = json.load(f)
+            except (OSError, json.JSONDecodeError) as e:
+                logger.warning(f"Ignoring unreadable validator cache {path}: {e}")
+
+    @staticmethod
+    def key(url: str, params: dict | None = None) -> str:
+        return f"{url}?{urlencode(sorted(params.items()))}" if params else url
+
+    def get(self, key: str) -> dict | None:
+        return self.entries.get(key)
+
+    def conditional_headers(self, key: str) -> dict[str, str]:
+        """Return the If-None-Match/If-Modified-Since headers for a cached request."""
+        entry = self.entries.get(key) or {}
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def update(self, key: str, response: requests.Response, **extra) -> None:
+        """Remember a 200 response's validators, or forget them if it sent none."""
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        if not etag and not last_modified:
+            self.entries.pop(key, None)
+            return
+        self.entries[key] = {'etag': etag, 'last_modified': last_modified, **extra}
+
+    def save(self) -> None:
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path, 'w') as f:
+            json.dump(self.entries, f, indent=2, sort_keys=True)
@@ -0,0 +1,285 @@
+"""Opt-in timing spans, record counts and profiling for the data scripts.
+
+Instrumentation is off unless ``SOCIAL_TRACE`` names a trace file, or a
+script is run with the ``--trace`` flag from ``add_trace_arguments``. The
+flag sets the same variable, so worker processes pick it up as well. When
+off, a traced call costs one attribute check.
+
+    SOCIAL_TRACE=trace.json python scripts/social-data/orchestrate.py
+    python scripts/goodreads-fetcher/fetch_books.py --trace trace.json --profile fetch_books.parse_page
+
+Every ``span`` records its wall time and, optionally, how many records it
+handled. At the end of a run ``finish`` writes the spans to the trace file
+in the Chrome trace event format (open it in https://ui.perfetto.dev or
+chrome://tracing) and logs a summary table. ``SOCIAL_PROFILE`` (``--profile``)
+names one span to run under cProfile, or under tracemalloc with
+``SOCIAL_PROFILE_MODE=tracemalloc``. Its report is logged, and cProfile
+stats are also saved as ``<trace file>.<span>.prof``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import cProfile
+import functools
+import io
+import json
+import logging
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator
+
+logger = logging.getLogger(__name__)
+
+TRACE_ENV = 'SOCIAL_TRACE'
+PROFILE_ENV = 'SOCIAL_PROFILE'
+PROFILE_MODE_ENV = 'SOCIAL_PROFILE_MODE'
+PROFILE_MODES = ('cprofile', 'tracemalloc')
+
+# Lines of cProfile or tracemalloc output logged for the profiled span
+PROFILE_LINES = 25
+
+
+class Span:
+    """One timed region. ``add`` counts the records it handled."""
+
+    __slots__ = ('name', 'start', 'seconds', 'count', 'depth', 'pid', 'tid', 'args', 'anchor')
+
+    def __init__(self, name: str, depth: int, count: int | None = None):
+        self.name = name
+        self.start = time.perf_counter()
+        self.seconds = 0.0
+        self.count = count
+        self.depth = depth
+        self.pid = os.getpid()
+        self.tid = threading.get_ident()
+        self.args: dict[str, Any] = {}
+        # Start of the span this one is listed under in the summary; a worker's
+        # spans are anchored to the span that was open when they were merged
+        self.anchor = self.start
+
+    def add(self, count: int) -> None:
+        self.count = (self.count or 0) + count
+
+    def to_json(self) -> dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    @classmethod
+    def from_json(cls, data: dict) -> Span:
+        span = cls.__new__(cls)
+        for name in cls.__slots__:
+            setattr(span, name, data[name])
+        return span
+
+
+class _NullSpan:
+    """Stands in for a span when instrumentation is off."""
+
+    def add(self, count: int) -> None:
+        pass
+
+
+NULL_SPAN = _NullSpan()
+
+
+class Tracer:
+    def __init__(self):
+        self.configure()
+
+    def configure(
+        self,
+        trace_path: str | None = None,
+        profile: str | None = None,
+        profile_mode: str | None = None,
+    ) -> None:
+        """Turn instrumentation on or off, falling back to the environment for unset values."""
+        self.trace_path = trace_path or os.environ.get(TRACE_ENV) or None
+        self.profile = profile or os.environ.get(PROFILE_ENV) or None
+        self.profile_mode = profile_mode or os.environ.get(PROFILE_MODE_ENV) or 'cprofile'
+        if self.profile_mode not in PROFILE_MODES:
+            raise ValueError(f"{PROFILE_MODE_ENV} must be one of {', '.join(PROFILE_MODES)}")
+        self.enabled = self.trace_path is not None
+        self.reset()
+
+    def reset(self) -> None:
+        """Drop recorded spans, e.g. in a forked worker that inherited its parent's."""
+        self.spans: list[Span] = []
+        self._local = threading.local()
+
+    def _stack(self) -> list[Span]:
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    @contextmanager
+    def span(self, name: str, count: int | None = None) -> Iterator[Span | _NullSpan]:
+        if not self.enabled:
+            yield NULL_SPAN
+            return
+        stack = self._stack()
+        span = Span(name, len(stack), count)
+        stack.append(span)
+        profiling = name == self.profile
+        profiler = self._start_profile() if profiling else None
+        try:
+            yield span
+        finally:
+            span.seconds = time.perf_counter() - span.start
+            if profiling:
+                self._finish_profile(span, profiler)
+            stack.pop()
+            self.spans.append(span)
+
+    def _start_profile(self) -> cProfile.Profile | None:
+        if self.profile_mode == 'tracemalloc':
+            tracemalloc.start()
+            return None
+        profiler = cProfile.Profile()
+        profiler.enable()
+        return profiler
+
+    def _finish_profile(self, span: Span, profiler: cProfile.Profile | None) -> None:
+        if profiler is None:
+            snapshot = tracemalloc.take_snapshot()
+            _, span.args['peak_bytes'] = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            top = snapshot.statistics('lineno')[:PROFILE_LINES]
+            report = '\n'.join(str(stat) for stat in top)
+            logger.info(f"tracemalloc for {span.name} (peak {span.args['peak_bytes'] / 2**20:.1f} MB):\n{report}")
+            return
+        profiler.disable()
+        stats_path = f"{self.trace_path}.{span.name}.prof"
+        profiler.dump_stats(stats_path)
+        out = io.StringIO()
+        pstats.Stats(profiler, stream=out).sort_stats('cumulative').print_stats(PROFILE_LINES)
+        logger.info(f"cProfile for {span.name} (saved to {stats_path}):\n{out.getvalue()}")
+
+    def drain(self) -> list[dict]:
+        """Hand over the recorded spans as plain dicts, for sending from a worker process."""
+        spans = [span.to_json() for span in self.spans]
+        self.spans = []
+        return spans
+
+    def merge(self, spans: list[dict]) -> None:
+        """Add spans drained in a worker, nested under the current span."""
+        if not self.enabled:
+            return
+        stack = self._stack()
+        anchor = stack[-1].start if stack else time.perf_counter()
+        for data in spans:
+            span = Span.from_json(data)
+            span.depth += len(stack)
+            span.anchor = anchor
+            self.spans.append(span)
+
+    def summary_rows(self) -> list[dict]:
+        """Totals per span name, each worker's names listed together under the span that ran them."""
+        rows: dict[str, dict] = {}
+        # Merged spans come after the span they are anchored to, one worker at a time
+        for span in sorted(self.spans, key=lambda s: (s.anchor, s.anchor != s.start, s.pid, s.start)):
+            row = rows.setdefault(span.name, {
+                'name': span.name, 'depth': span.depth, 'calls': 0, 'seconds': 0.0, 'records': None,
+            })
+            row['depth'] = min(row['depth'], span.depth)
+            row['calls'] += 1
+            row['seconds'] += span.seconds
+            if span.count is not None:
+                row['records'] = (row['records'] or 0) + span.count
+        return list(rows.values())
+
+    def summary_table(self) -> str:
+        lines = [f"{'Span':<44} {'Calls':>6} {'Total s':>9} {'Mean ms':>9} {'Records':>9} {'Records/s':>11}"]
+        for row in self.summary_rows():
+            name = '  ' * row['depth'] + row['name']
+            records = row['records']
+            rate = f"{records / row['seconds']:>11.0f}" if records is not None and row['seconds'] else f"{'-':>11}"
+            lines.append(
+                f"{name:<44} {row['calls']:>6} {row['seconds']:>9.3f} "
+                f"{row['seconds'] / row['calls'] * 1000:>9.1f} "
+                f"{records if records is not None else '-':>9} {rate}"
+            )
+        return '\n'.join(lines)
+
+    def trace_events(self) -> dict:
+        origin = min((span.start for span in self.spans), default=0.0)
+        events = [
+            {
+                'name': span.name,
+                'ph': 'X',
+                'ts': round((span.start - origin) * 1e6, 1),
+                'dur': round(span.seconds * 1e6, 1),
+                'pid': span.pid,
+                'tid': span.tid,
+                'args': {**span.args, **({'count': span.count} if span.count is not None else {})},
+            }
+            for span in self.spans
+        ]
+        return {'traceEvents': events, 'displayTimeUnit': 'ms', 'summary': self.summary_rows()}
+
+    def finish(self) -> None:
+        """Write the trace file and log the summary table."""
+        if not self.enabled:
+            return
+        with open(self.trace_path, 'w') as f:
+            json.dump(self.trace_events(), f)
+        logger.info(f"Wrote {len(self.spans)} spans to {self.trace_path}\n{self.summary_table()}")
+
+
+TRACER = Tracer()
+
+
+def span(name: str, count: int | None = None):
+    """Context manager timing the enclosed block as ``name``."""
+    return TRACER.span(name, count)
+
+
+def traced(name: str, count: Callable[[Any], int] | None = None):
+    """Decorator timing each call as ``name``, counting ``count(result)`` records."""
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not TRACER.enabled:
+                return fn(*args, **kwargs)
+            with TRACER.span(name) as current:
+                result = fn(*args, **kwargs)
+                if count is not None:
+                    current.add(count(result))
+                return result
+        return wrapper
+    return decorate
+
+
+def finish() -> None:
+    TRACER.finish()
+
+
+def add_trace_arguments(parser: argparse.ArgumentParser) -> None:
+    """Add the --trace, --profile and --profile-mode flags to a script's parser."""
+    parser.add_argument(
+        "--trace",
+        metavar="PATH",
+        help=f"Time each stage and write a trace file to PATH (same as {TRACE_ENV}=PATH).",
+    )
+    parser.add_argument(
+        "--profile",
+        metavar="SPAN",
+        help="With --trace, run the named span under cProfile or tracemalloc.",
+    )
+    parser.add_argument(
+        "--profile-mode",
+        choices=PROFILE_MODES,
+        help="Profiler for --profile. Defaults to cprofile.",
+    )
+
+
+def configure_from_args(args: argparse.Namespace) -> None:
+    """Apply the flags from ``add_trace_arguments``, exporting them for worker processes."""
+    for env, value in ((TRACE_ENV, args.trace), (PROFILE_ENV, args.profile), (PROFILE_MODE_ENV, args.profile_mode)):
+        if value:
+            os.environ[env] = value
+    TRACER.configure(args.trace, args.profile, args.profile_mode)
@@ -0,0 +1,147 @@
+"""Append-only JSON Lines record store shared by the fetchers.
+
+Each line is one version of a record, keyed by an ID field. Saving appends
+only the records that are new or changed, so a nightly run writes (and
+commits) a few lines instead of the whole history. Readers resolve the
+latest version per ID. Records keep the position of their first version,
+which matches the order the old dict-based rewrites produced. Removed
+records are written as ``{"<key>": id, "_deleted": true}`` tombstones. The
+file is compacted back to one line per live record once stale lines make up
+more than ``COMPACT_RATIO`` of it.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+from typing import Any, Iterable
+
+logger = logging.getLogger(__name__)
+
+# Compact once stale versions and tombstones exceed this share of all lines
+COMPACT_RATIO = 0.5
+
+DELETED = '_deleted'
+
+
+def read_records(path: str, key: str) -> list[dict]:
+    """Latest version of every live record in a store, for read-only callers."""
+    return JsonlStore(path, key).load()
+
+
+class JsonlStore:
+    """Records in a ``.jsonl`` file, with an in-memory index of the latest version per ID.
+
+    ``legacy_path`` names the pretty-printed JSON array the store replaces.
+    When the ``.jsonl`` file does not exist yet, ``load`` imports the legacy
+    file into a compacted store and removes it.
+    """
+
+    def __init__(self, path: str, key: str, legacy_path: str | None = None):
+        self.path = path
+        self.key = key
+        self.legacy_path = legacy_path
+        self.index: dict[Any, dict] = {}
+        self.lines = 0
+        # Set when the file does not end in a complete line, so the next
+        # write must not be appended straight after the fragment
+        self.torn = False
+
+    def load(self) -> list[dict]:
+        self.index = {}
+        self.lines = 0
+        self.torn = False
+        if not os.path.exists(self.path):
+            if self.legacy_path and os.path.exists(self.legacy_path):
+                self.import_legacy()
+            return list(self.index.values())
+
+        with open(self.path, 'r') as f:
+            for number, line in enumerate(f, 1):
+                if not line.endswith('\n'):
+                    self.torn = True
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # A run killed mid-append leaves at most one torn last line
+                    logger.warning(f"Skipping unreadable line {number} of {self.path}")
+                    self.torn = True
+                    continue
+                self.lines += 1
+                if record.get(DELETED):
+                    self.index.pop(record[self.key], None)
+                else:
+                    self.index[record[self.key]] = record
+        return list(self.index.values())
+
+    def import_legacy(self) -> None:
+        with open(self.legacy_path, 'r') as f:
+            records = json.load(f)
+        for record in records:
+            self.index[record[self.key]] = record
+        self.compact()
+        os.remove(self.legacy_path)
+        logger.info(f"Migrated {len(self.index)} records from {self.legacy_path} to {self.path}")
+
+    def append(self, lines: list[str]) -> None:
+        if not lines:
+            return
+        self.lines += len(lines)
+        if self.torn:
+            # The index already holds these records; rewriting drops the fragment
+            self.compact()
+            return
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        with open(self.path, 'a') as f:
+            f.write(''.join(lines))
+        if self.lines - len(self.index) > COMPACT_RATIO * self.lines:
+            self.compact()
+
+    def upsert(self, records: Iterable[dict]) -> tuple[int, int]:
+        """Append every new or changed record, returning (new, updated) counts."""
+        lines = []
+        new_count = 0
+        updated_count = 0
+        for record in records:
+            record_id = record[self.key]
+            stored = self.index.get(record_id)
+            if stored == record:
+                continue
+            if stored is None:
+                new_count += 1
+            else:
+                updated_count += 1
+            self.index[record_id] = record
+            lines.append(json.dumps(record, ensure_ascii=False) + '\n')
+        self.append(lines)
+        return new_count, updated_count
+
+    def delete(self, ids: Iterable[Any]) -> int:
+        """Append tombstones for the given IDs, returning how many were live."""
+        lines = []
+        for record_id in ids:
+            if self.index.pop(record_id, None) is not None:
+                lines.append(json.dumps({self.key: record_id, DELETED: True}) + '\n')
+        self.append(lines)
+        return len(lines)
+
+    def replace(self, records: list[dict]) -> tuple[int, int, int]:
+        """Make ``records`` the full contents, returning (new, updated, deleted) counts."""
+        keep = {record[self.key] for record in records}
+        deleted = self.delete([record_id for record_id in self.index if record_id not in keep])
+        new_count, updated_count = self.upsert(records)
+        return new_count, updated_count, deleted
+
+    def compact(self) -> None:
+        """Rewrite the file with one line per live record, in first-seen order."""
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as f:
+            f.write(''.join(json.dumps(record, ensure_ascii=False) + '\n' for record in self.index.values()))
+        os.replace(tmp_path, self.path)
+        self.torn = False
+        logger.info(f"Compacted {self.path}: {self.lines} lines down to {len(self.index)}")
+        self.lines = len(self.index)
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""One-off upgrade of stores written before the fetchers added date fields.
+
+Runs each fetcher's date normalization over every stored record, appends the
+records that gained fields, and compacts the store. Records that already
+carry their date fields are left alone, so re-running it is a no-op.
+
+    python scripts/shared/migrate_dates.py
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import sys
+from typing import Callable
+
+SCRIPTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+for fetcher_dir in ('goodreads-fetcher', 'letterboxd-fetcher', 'strava-fetcher'):
+    sys.path.insert(0, os.path.join(SCRIPTS_DIR, fetcher_dir))
+
+import fetch_activities
+import fetch_books
+import fetch_films
+from jsonl_store import JsonlStore
+
+logger = logging.getLogger(__name__)
+
+# (store path, key field, date normalization) per fetcher
+STORES: list[tuple[str, str, Callable[[dict], dict]]] = [
+    (fetch_books.DATA_FILE, 'book_id', fetch_books.add_book_dates),
+    (fetch_films.DATA_FILE, 'guid', fetch_films.add_film_dates),
+    (fetch_activities.DATA_FILE, 'id', fetch_activities.add_activity_dates),
+]
+
+
+def migrate_store(path: str, key: str, add_dates: Callable[[dict], dict]) -> int:
+    """Add date fields to every record in the store at ``path``, returning how many changed."""
+    if not os.path.exists(path):
+        logger.info(f"No store at {path}, skipping")
+        return 0
+    store = JsonlStore(path, key)
+    records = store.load()
+    _, updated = store.upsert([add_dates(dict(record)) for record in records])
+    if updated:
+        store.compact()
+    logger.info(f"Added date fields to {updated} of {len(records)} records in {path}")
+    return updated
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    for path, key, add_dates in STORES:
+        migrate_store(path, key, add_dates)
+
+
+if __name__ == '__main__':
+    main()
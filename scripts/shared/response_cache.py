@@ -0,0 +1,108 @@
+"""On-disk, content-addressed cache of HTTP response bodies.
+
+Bodies are stored once per SHA-256 under ``objects/``, and ``index.json``
+maps each URL to the hash of its last body and when it was fetched. Entries
+older than the TTL are not served, and the least recently fetched entries are
+evicted once the stored bodies exceed the size budget.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTL = 30 * 24 * 3600
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+class ResponseCache:
+    """URL -> response body, safe to share between scraping threads."""
+
+    def __init__(
+        self,
+        root: str,
+        ttl: float = DEFAULT_TTL,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        clock=time.time,
+    ):
+        self.root = root
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.clock = clock
+        self.index_path = os.path.join(root, 'index.json')
+        self.entries: dict[str, dict] = {}
+        self._lock = threading.Lock()
+        if os.path.exists(self.index_path):
+            try:
+                with open(self.index_path, 'r') as f:
+                    self.entries = json.load(f)
+            except (OSError, json.JSONDecodeError) as e:
+                logger.warning(f"Ignoring unreadable response cache index {self.index_path}: {e}")
+
+    def _object_path(self, digest: str) -> str:
+        return os.path.join(self.root, 'objects', digest[:2], digest)
+
+    def get(self, url: str) -> bytes | None:
+        """Return the cached body for ``url``, or None if missing or older than the TTL."""
+        with self._lock:
+            entry = self.entries.get(url)
+        if not entry or self.clock() - entry['fetched_at'] > self.ttl:
+            return None
+        try:
+            with open(self._object_path(entry['sha256']), 'rb') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def put(self, url: str, body: bytes) -> str:
+        """Store ``body`` as the latest response for ``url`` and return its hash."""
+        digest = hashlib.sha256(body).hexdigest()
+        path = self._object_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(body)
+            os.replace(tmp_path, path)
+        with self._lock:
+            self.entries[url] = {'sha256': digest, 'size': len(body), 'fetched_at': self.clock()}
+        return digest
+
+    def evict(self) -> int:
+        """Drop expired entries, then the oldest until within ``max_bytes``; return how many went."""
+        now = self.clock()
+        with self._lock:
+            kept = {url: e for url, e in self.entries.items() if now - e['fetched_at'] <= self.ttl}
+            sizes = {e['sha256']: e['size'] for e in kept.values()}
+            total = sum(sizes.values())
+            for url, entry in sorted(kept.items(), key=lambda item: item[1]['fetched_at']):
+                if total <= self.max_bytes:
+                    break
+                del kept[url]
+                if not any(e['sha256'] == entry['sha256'] for e in kept.values()):
+                    total -= sizes.pop(entry['sha256'])
+            evicted = len(self.entries) - len(kept)
+            self.entries = kept
+            live = {e['sha256'] for e in kept.values()}
+
+        objects_dir = os.path.join(self.root, 'objects')
+        if os.path.isdir(objects_dir):
+            for dirpath, _, filenames in os.walk(objects_dir):
+                for name in filenames:
+                    if name not in live:
+                        os.remove(os.path.join(dirpath, name))
+        return evicted
+
+    def save(self) -> None:
+        """Apply eviction and write the index."""
+        self.evict()
+        os.makedirs(self.root, exist_ok=True)
+        with self._lock:
+            with open(self.index_path, 'w') as f:
+                json.dump(self.entries, f, indent=2, sort_keys=True)
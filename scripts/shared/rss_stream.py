@@ -0,0 +1,59 @@
+"""Streaming RSS item parser.
+
+Feeds raw response chunks into an ``ET.XMLPullParser`` and hands back one
+parsed item per ``<item>`` end event, so parsing overlaps the download and
+each item's subtree is freed as soon as it has been consumed. Peak memory
+stays flat however many items a feed page holds.
+"""
+
+from __future__ import annotations
+
+import xml.etree.ElementTree as ET
+from typing import Callable, Iterable, Iterator, TypeVar
+
+T = TypeVar('T')
+
+# Bytes read from the response per parser feed
+CHUNK_SIZE = 64 * 1024
+
+
+def iter_rss_items(chunks: Iterable[bytes], parse_item: Callable[[ET.Element], T]) -> Iterator[T]:
+    """Yield ``parse_item(element)`` for every ``<item>`` in the streamed feed.
+
+    Each element is cleared and detached from its parent right after
+    ``parse_item`` returns, so callers must copy out anything they need.
+    Raises ``ET.ParseError`` on malformed or truncated XML, like
+    ``ET.fromstring`` does.
+    """
+    parser = ET.XMLPullParser(events=('start', 'end'))
+    # Open elements, so a finished item can be detached from its parent
+    stack: list[ET.Element] = []
+
+    def drain() -> Iterator[T]:
+        for event, element in parser.read_events():
+            if event == 'start':
+                stack.append(element)
+                continue
+            stack.pop()
+            if element.tag != 'item':
+                continue
+            parsed = parse_item(element)
+            element.clear()
+            if stack:
+                stack[-1].remove(element)
+            yield parsed
+
+    for chunk in chunks:
+        if chunk:
+            parser.feed(chunk)
+            yield from drain()
+    parser.close()
+    yield from drain()
+
+
+def iter_response_items(response, parse_item: Callable[[ET.Element], T]) -> Iterator[T]:
+    """Stream the items of a ``stream=True`` response body through ``iter_rss_items``."""
+    try:
+        yield from iter_rss_items(response.iter_content(chunk_size=CHUNK_SIZE), parse_item)
+    finally:
+        response.close()
@@ -0,0 +1,69 @@
+"""Tests for the shared date normalization helpers."""
+
+from __future__ import annotations
+
+from datetime import datetime, timezone
+
+from dates import add_date_fields, iso_to_epoch, normalize_dates, record_epoch, rfc2822_to_epoch, utc_year
+
+
+class TestParsers:
+    def test_rfc2822(self):
+        assert rfc2822_to_epoch('Tue, 12 May 2026 00:00:00 +0000') == 1778544000
+        assert rfc2822_to_epoch('Tue, 12 May 2026 00:00:00 -0700') == 1778544000 + 7 * 3600
+        # No zone means UTC
+        assert rfc2822_to_epoch('Tue, 12 May 2026 00:00:00 -0000') == 1778544000
+
+    def test_iso(self):
+        assert iso_to_epoch('2026-05-12T00:00:00Z') == 1778544000
+        assert iso_to_epoch('2026-05-12T02:00:00+02:00') == 1778544000
+        assert iso_to_epoch('2026-05-12T00:00:00') == 1778544000
+
+    def test_unparseable_is_none(self):
+        assert rfc2822_to_epoch('not a date') is None
+        assert rfc2822_to_epoch('') is None
+        assert iso_to_epoch('yesterday') is None
+
+    def test_repeated_strings_hit_the_cache(self):
+        rfc2822_to_epoch.cache_clear()
+        for _ in range(3):
+            rfc2822_to_epoch('Wed, 29 Jul 2026 00:00:00 +0000')
+        info = rfc2822_to_epoch.cache_info()
+        assert (info.misses, info.hits) == (1, 2)
+
+    def test_utc_year(self):
+        new_year = int(datetime(2026, 1, 1, tzinfo=timezone.utc).timestamp())
+        assert utc_year(new_year) == 2026
+        assert utc_year(new_year - 1) == 2025
+
+
+class TestNormalizeDates:
+    def test_stores_epoch_on_each_record(self):
+        records = [
+            {'start_date': '2026-05-12T00:00:00Z'},
+            {'start_date': None},
+            {},
+        ]
+        normalize_dates(records, ['start_date'], iso_to_epoch)
+        assert [r['start_date_epoch'] for r in records] == [1778544000, None, None]
+
+    def test_stored_epoch_is_not_parsed_again(self):
+        record = {'start_date': '2026-05-12T00:00:00Z', 'start_date_epoch': 42}
+        assert record_epoch(record, 'start_date', iso_to_epoch) == 42
+
+
+class TestAddDateFields:
+    def test_adds_epoch_and_utc_iso(self):
+        book = {'user_read_at': 'Tue, 12 May 2026 00:00:00 -0700', 'user_date_added': None}
+        add_date_fields(book, ['user_read_at', 'user_date_added'], rfc2822_to_epoch, iso=True)
+        assert book['user_read_at_epoch'] == 1778544000 + 7 * 3600
+        assert book['user_read_at_iso'] == '2026-05-12T07:00:00Z'
+        assert book['user_date_added_epoch'] is None
+        assert book['user_date_added_iso'] is None
+
+    def test_recomputes_after_the_raw_field_changes(self):
+        film = add_date_fields({'watched_date': '2026-05-12'}, ['watched_date'], iso_to_epoch)
+        film['watched_date'] = '2026-05-13'
+        add_date_fields(film, ['watched_date'], iso_to_epoch)
+        assert film['watched_date_epoch'] == 1778544000 + 24 * 3600
+        assert 'watched_date_iso' not in film
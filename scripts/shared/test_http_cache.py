@@ -0,0 +1,40 @@
+"""Tests for the conditional GET validator cache."""
+
+from __future__ import annotations
+
+from http_cache import ValidatorCache
+
+
+class FakeResponse:
+    def __init__(self, headers):
+        self.headers = headers
+
+
+class TestValidatorCache:
+    def test_round_trips_validators_and_extras(self, tmp_path):
+        path = str(tmp_path / 'validators.json')
+        cache = ValidatorCache(path)
+        key = cache.key('https://example.com/rss', {'page': 2, 'per_page': 100})
+        cache.update(key, FakeResponse({'ETag': '"abc"', 'Last-Modified': 'Tue, 12 May 2026 00:00:00 GMT'}), items=100)
+        cache.save()
+
+        reloaded = ValidatorCache(path)
+        assert reloaded.conditional_headers(key) == {
+            'If-None-Match': '"abc"',
+            'If-Modified-Since': 'Tue, 12 May 2026 00:00:00 GMT',
+        }
+        assert reloaded.get(key)['items'] == 100
+
+    def test_key_ignores_param_order(self):
+        assert ValidatorCache.key('u', {'a': 1, 'b': 2}) == ValidatorCache.key('u', {'b': 2, 'a': 1})
+
+    def test_response_without_validators_clears_entry(self, tmp_path):
+        cache = ValidatorCache(str(tmp_path / 'validators.json'))
+        cache.update('u', FakeResponse({'ETag': '"abc"'}))
+        cache.update('u', FakeResponse({}))
+        assert cache.conditional_headers('u') == {}
+
+    def test_unreadable_file_starts_empty(self, tmp_path):
+        path = tmp_path / 'validators.json'
+        path.write_text('{not json')
+        assert ValidatorCache(str(path)).entries == {}
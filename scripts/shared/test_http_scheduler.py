@@ -0,0 +1,183 @@
+"""Tests for the shared HTTP request scheduler."""
+
+from __future__ import annotations
+
+import pytest
+import requests
+
+from http_scheduler import HOST_POLICIES, HostPolicy, RateLimitExceeded, RequestScheduler, parse_retry_after
+
+
+class FakeResponse:
+    def __init__(self, status_code=200, headers=None, url='https://example.com/'):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.url = url
+
+    def close(self):
+        pass
+
+
+class FakeSession:
+    """Returns queued responses (or raises queued exceptions) in order."""
+
+    def __init__(self, *results):
+        self.results = list(results)
+        self.calls = 0
+
+    def request(self, method, url, **kwargs):
+        self.calls += 1
+        result = self.results.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def make_scheduler(session, limits=((100, 1.0),), fixed_windows=False, **kwargs):
+    clock = FakeClock()
+    scheduler = RequestScheduler(
+        policies={'example.com': HostPolicy(limits=list(limits), fixed_windows=fixed_windows)},
+        session=session,
+        clock=clock,
+        wall_clock=clock,
+        sleep=clock.sleep,
+        jitter=lambda: 1.0,
+        **kwargs,
+    )
+    return scheduler, clock
+
+
+class TestRequestScheduler:
+    def test_paces_requests_with_token_bucket(self):
+        session = FakeSession(*[FakeResponse() for _ in range(3)])
+        scheduler, clock = make_scheduler(session, limits=[(2, 900)])
+
+        for _ in range(3):
+            scheduler.get('https://example.com/')
+
+        assert clock.sleeps == [pytest.approx(450)]
+
+    def test_retries_429_after_retry_after(self):
+        session = FakeSession(FakeResponse(429, {'Retry-After': '7'}), FakeResponse(200))
+        scheduler, clock = make_scheduler(session)
+
+        response = scheduler.get('https://example.com/')
+
+        assert response.status_code == 200
+        assert clock.sleeps == [pytest.approx(7)]
+
+    def test_backs_off_exponentially_then_returns_last_error(self):
+        session = FakeSession(*[FakeResponse(503) for _ in range(3)])
+        scheduler, clock = make_scheduler(session, max_retries=2)
+
+        response = scheduler.get('https://example.com/')
+
+        assert response.status_code == 503
+        assert session.calls == 3
+        assert clock.sleeps == [pytest.approx(1), pytest.approx(2)]
+
+    def test_retries_connection_errors(self):
+        session = FakeSession(requests.ConnectionError('reset'), FakeResponse(200))
+        scheduler, _ = make_scheduler(session)
+
+        assert scheduler.get('https://example.com/').status_code == 200
+
+    def test_strava_style_headers_sync_buckets(self):
+        headers = {'X-RateLimit-Limit': '200,2000', 'X-RateLimit-Usage': '200,10'}
+        session = FakeSession(FakeResponse(200, headers), FakeResponse(200))
+        scheduler, clock = make_scheduler(session, limits=[(100, 900), (1000, 86400)])
+
+        scheduler.get('https://example.com/')
+        scheduler.get('https://example.com/')
+
+        state = scheduler.host_state('https://example.com/')
+        assert state.buckets[0].limit == 200
+        assert clock.sleeps == [pytest.approx(4.5)]
+
+    def test_raises_when_wait_exceeds_max_wait(self):
+        headers = {'X-RateLimit-Remaining': '0', 'X-RateLimit-Reset': '3600'}
+        session = FakeSession(FakeResponse(200, headers))
+        scheduler, _ = make_scheduler(session, max_wait=60)
+
+        scheduler.get('https://example.com/')
+        with pytest.raises(RateLimitExceeded):
+            scheduler.get('https://example.com/')
+
+    def test_epoch_reset_is_measured_against_the_wall_clock(self):
+        clock_now = 2_000_000_000.0
+        headers = {'X-RateLimit-Remaining': '0', 'X-RateLimit-Reset': str(int(clock_now) + 30)}
+        session = FakeSession(FakeResponse(200, headers), FakeResponse(200))
+        scheduler, clock = make_scheduler(session, max_wait=60)
+        clock.now = clock_now
+
+        scheduler.get('https://example.com/')
+        scheduler.get('https://example.com/')
+
+        assert clock.sleeps == [pytest.approx(30)]
+
+
+class TestFixedWindows:
+    def test_waits_for_the_next_window_boundary(self):
+        session = FakeSession(*[FakeResponse() for _ in range(5)])
+        scheduler, clock = make_scheduler(session, limits=[(2, 900)], fixed_windows=True)
+        clock.now = 600.0
+
+        for _ in range(5):
+            scheduler.get('https://example.com/')
+
+        # Two requests per quarter hour, never more, however the windows fall
+        assert clock.sleeps == [pytest.approx(300), pytest.approx(900)]
+
+    def test_spent_daily_budget_raises(self):
+        session = FakeSession(*[FakeResponse() for _ in range(3)])
+        scheduler, clock = make_scheduler(session, limits=[(100, 900), (3, 86400)], fixed_windows=True)
+        clock.now = 3600.0
+
+        for _ in range(3):
+            scheduler.get('https://example.com/')
+        with pytest.raises(RateLimitExceeded):
+            scheduler.get('https://example.com/')
+        assert session.calls == 3
+
+    def test_usage_headers_seed_the_windows(self):
+        headers = {'X-RateLimit-Limit': '100,1000', 'X-RateLimit-Usage': '40,1000'}
+        session = FakeSession(FakeResponse(200, headers))
+        scheduler, clock = make_scheduler(session, limits=[(100, 900), (1000, 86400)], fixed_windows=True)
+        clock.now = 3600.0
+
+        scheduler.get('https://example.com/')
+        with pytest.raises(RateLimitExceeded):
+            scheduler.get('https://example.com/')
+
+        state = scheduler.host_state('https://example.com/')
+        assert state.buckets[0].used == 40
+
+    def test_strava_uses_fixed_windows(self):
+        assert HOST_POLICIES['www.strava.com'].fixed_windows
+
+
+class TestParseRetryAfter:
+    def test_seconds(self):
+        assert parse_retry_after('120') == 120
+
+    def test_http_date(self):
+        from datetime import datetime, timezone
+        now = datetime(2026, 1, 1, 12, 0, 0, tzinfo=timezone.utc)
+        assert parse_retry_after('Thu, 01 Jan 2026 12:00:30 GMT', now=now) == 30
+
+    def test_invalid(self):
+        assert parse_retry_after('soon') is None
+        assert parse_retry_after(None) is None
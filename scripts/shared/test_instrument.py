@@ -0,0 +1,126 @@
+"""Tests for the opt-in tracing spans."""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+
+import pytest
+
+import instrument
+from instrument import NULL_SPAN, TRACER, Tracer, add_trace_arguments, configure_from_args, span, traced
+
+
+@pytest.fixture
+def tracer(tmp_path, monkeypatch):
+    for env in (instrument.TRACE_ENV, instrument.PROFILE_ENV, instrument.PROFILE_MODE_ENV):
+        monkeypatch.delenv(env, raising=False)
+    trace_path = tmp_path / 'trace.json'
+    TRACER.configure(str(trace_path))
+    yield TRACER
+    TRACER.configure()
+
+
+@traced('double', count=len)
+def double(items):
+    return items * 2
+
+
+class TestDisabled:
+    def test_records_nothing(self, monkeypatch):
+        monkeypatch.delenv(instrument.TRACE_ENV, raising=False)
+        tracer = Tracer()
+        with tracer.span('stage') as current:
+            current.add(3)
+        assert current is NULL_SPAN
+        assert tracer.spans == []
+
+    def test_traced_calls_straight_through(self):
+        assert not TRACER.enabled
+        assert double([1]) == [1, 1]
+        assert TRACER.spans == []
+
+    def test_env_enables(self, monkeypatch, tmp_path):
+        monkeypatch.setenv(instrument.TRACE_ENV, str(tmp_path / 't.json'))
+        assert Tracer().enabled
+
+
+class TestSpans:
+    def test_nesting_and_counts(self, tracer):
+        with span('outer', 2) as outer:
+            outer.add(3)
+            double([1, 2])
+        by_name = {s.name: s for s in tracer.spans}
+        assert (by_name['outer'].depth, by_name['outer'].count) == (0, 5)
+        assert (by_name['double'].depth, by_name['double'].count) == (1, 4)
+        assert by_name['outer'].seconds >= by_name['double'].seconds
+
+    def test_summary_totals_per_name(self, tracer):
+        with span('load'):
+            for _ in range(3):
+                double([1])
+        rows = tracer.summary_rows()
+        assert [(r['name'], r['depth'], r['calls'], r['records']) for r in rows] == [
+            ('load', 0, 1, None),
+            ('double', 1, 3, 6),
+        ]
+        assert 'double' in tracer.summary_table()
+
+    def test_worker_spans_nest_under_the_open_span(self, tracer):
+        worker = Tracer()
+        worker.enabled = True
+        with worker.span('worker.get_data'):
+            with worker.span('worker.load', 10):
+                pass
+        with span('process'):
+            tracer.merge(worker.drain())
+        with span('write'):
+            pass
+        assert worker.spans == []
+        rows = tracer.summary_rows()
+        assert [(r['name'], r['depth']) for r in rows] == [
+            ('process', 0), ('worker.get_data', 1), ('worker.load', 2), ('write', 0),
+        ]
+
+    def test_finish_writes_chrome_trace(self, tracer):
+        with span('stage', 7):
+            pass
+        tracer.finish()
+        trace = json.loads(open(tracer.trace_path).read())
+        event, = trace['traceEvents']
+        assert (event['name'], event['ph'], event['args']) == ('stage', 'X', {'count': 7})
+        assert trace['summary'][0]['calls'] == 1
+
+
+class TestProfile:
+    def test_cprofile_saves_stats(self, tracer):
+        tracer.profile = 'hot'
+        with span('hot'):
+            sorted(range(1000), reverse=True)
+        assert os.path.exists(f'{tracer.trace_path}.hot.prof')
+
+    def test_tracemalloc_records_peak(self, tracer):
+        tracer.profile, tracer.profile_mode = 'hot', 'tracemalloc'
+        with span('hot'):
+            data = [0] * 100_000
+        del data
+        assert tracer.spans[0].args['peak_bytes'] >= 800_000
+
+
+class TestArguments:
+    def test_flags_configure_and_export(self, tmp_path, monkeypatch):
+        for env in (instrument.TRACE_ENV, instrument.PROFILE_ENV, instrument.PROFILE_MODE_ENV):
+            monkeypatch.delenv(env, raising=False)
+        parser = argparse.ArgumentParser()
+        add_trace_arguments(parser)
+        trace_path = str(tmp_path / 'trace.json')
+        try:
+            configure_from_args(parser.parse_args(['--trace', trace_path, '--profile', 'stage']))
+            assert TRACER.enabled and TRACER.profile == 'stage'
+            assert os.environ[instrument.TRACE_ENV] == trace_path
+        finally:
+            monkeypatch.delenv(instrument.TRACE_ENV)
+            monkeypatch.delenv(instrument.PROFILE_ENV)
+            TRACER.configure()
+        assert not TRACER.enabled
@@ -0,0 +1,95 @@
+"""Tests for the append-only JSONL record store."""
+
+from __future__ import annotations
+
+import json
+
+import jsonl_store
+from jsonl_store import JsonlStore, read_records
+
+
+def line_count(path) -> int:
+    with open(path) as f:
+        return sum(1 for _ in f)
+
+
+class TestJsonlStore:
+    def test_appends_only_new_and_changed_records(self, tmp_path):
+        path = str(tmp_path / 'books.jsonl')
+        store = JsonlStore(path, 'id')
+        store.load()
+        assert store.upsert([{'id': 1, 'rating': 3}, {'id': 2, 'rating': 4}]) == (2, 0)
+
+        store = JsonlStore(path, 'id')
+        store.load()
+        assert store.upsert([{'id': 1, 'rating': 3}, {'id': 2, 'rating': 5}, {'id': 3, 'rating': 1}]) == (1, 1)
+        assert line_count(path) == 4
+
+    def test_readers_resolve_latest_version_in_first_seen_order(self, tmp_path):
+        path = str(tmp_path / 'books.jsonl')
+        store = JsonlStore(path, 'id')
+        store.load()
+        store.upsert([{'id': 'a', 'v': 1}, {'id': 'b', 'v': 1}, {'id': 'c', 'v': 1}])
+        store.upsert([{'id': 'a', 'v': 2}])
+        store.upsert([{'id': 'd', 'v': 1}])
+
+        assert read_records(path, 'id') == [
+            {'id': 'a', 'v': 2}, {'id': 'b', 'v': 1}, {'id': 'c', 'v': 1}, {'id': 'd', 'v': 1},
+        ]
+
+    def test_replace_writes_tombstones(self, tmp_path):
+        path = str(tmp_path / 'films.jsonl')
+        store = JsonlStore(path, 'guid')
+        store.load()
+        store.upsert([{'guid': 'a'}, {'guid': 'b'}, {'guid': 'c'}])
+        assert store.replace([{'guid': 'a'}, {'guid': 'c', 'x': 1}, {'guid': 'd'}]) == (1, 1, 1)
+
+        assert read_records(path, 'guid') == [{'guid': 'a'}, {'guid': 'c', 'x': 1}, {'guid': 'd'}]
+
+    def test_compacts_when_stale_lines_dominate(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(jsonl_store, 'COMPACT_RATIO', 0.5)
+        path = str(tmp_path / 'activities.jsonl')
+        store = JsonlStore(path, 'id')
+        store.load()
+        store.upsert([{'id': i, 'v': 0} for i in range(4)])
+        store.upsert([{'id': i, 'v': 1} for i in range(4)])
+        # Half the lines are stale, which is not yet more than COMPACT_RATIO
+        assert line_count(path) == 8
+
+        store.upsert([{'id': 0, 'v': 2}])
+        assert line_count(path) == 4
+        assert read_records(path, 'id') == [{'id': 0, 'v': 2}, {'id': 1, 'v': 1}, {'id': 2, 'v': 1}, {'id': 3, 'v': 1}]
+
+    def test_migrates_legacy_json_array(self, tmp_path):
+        legacy = tmp_path / 'books.json'
+        records = [{'book_id': '2', 'title': 'Ulysses'}, {'book_id': '1', 'title': 'Emma'}]
+        legacy.write_text(json.dumps(records, indent=2))
+
+        store = JsonlStore(str(tmp_path / 'books.jsonl'), 'book_id', legacy_path=str(legacy))
+        assert store.load() == records
+        assert not legacy.exists()
+        assert line_count(tmp_path / 'books.jsonl') == 2
+
+    def test_skips_torn_last_line(self, tmp_path):
+        path = tmp_path / 'films.jsonl'
+        path.write_text('{"guid": "a"}\n{"guid": "b", "ti')
+        assert read_records(str(path), 'guid') == [{'guid': 'a'}]
+
+    def test_append_after_torn_line_keeps_new_records(self, tmp_path):
+        path = tmp_path / 'activities.jsonl'
+        path.write_text('{"id": 1, "v": 1}\n{"id": 2, "v": 1}\n{"id": 3, "v"')
+        store = JsonlStore(str(path), 'id')
+        store.load()
+        store.upsert([{'id': 4, 'v': 1}])
+
+        assert read_records(str(path), 'id') == [{'id': 1, 'v': 1}, {'id': 2, 'v': 1}, {'id': 4, 'v': 1}]
+        assert path.read_text().endswith('\n')
+
+    def test_line_missing_its_newline_is_not_joined(self, tmp_path):
+        path = tmp_path / 'activities.jsonl'
+        path.write_text('{"id": 1, "v": 1}')
+        store = JsonlStore(str(path), 'id')
+        store.load()
+        store.upsert([{'id': 2, 'v': 1}])
+
+        assert read_records(str(path), 'id') == [{'id': 1, 'v': 1}, {'id': 2, 'v': 1}]
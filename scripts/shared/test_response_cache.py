@@ -0,0 +1,56 @@
+"""Tests for the content-addressed response cache."""
+
+from __future__ import annotations
+
+import os
+
+from response_cache import ResponseCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def object_count(root):
+    return sum(len(files) for _, _, files in os.walk(root / 'objects'))
+
+
+class TestResponseCache:
+    def test_round_trips_bodies_across_instances(self, tmp_path):
+        cache = ResponseCache(str(tmp_path))
+        cache.put('https://example.com/a', b'<html>a</html>')
+        cache.save()
+
+        assert ResponseCache(str(tmp_path)).get('https://example.com/a') == b'<html>a</html>'
+        assert ResponseCache(str(tmp_path)).get('https://example.com/b') is None
+
+    def test_identical_bodies_are_stored_once(self, tmp_path):
+        cache = ResponseCache(str(tmp_path))
+        assert cache.put('https://example.com/a', b'same') == cache.put('https://example.com/b', b'same')
+        assert object_count(tmp_path) == 1
+
+    def test_expired_entries_are_not_served_and_are_evicted(self, tmp_path):
+        clock = FakeClock()
+        cache = ResponseCache(str(tmp_path), ttl=60, clock=clock)
+        cache.put('https://example.com/a', b'a')
+        clock.now += 61
+
+        assert cache.get('https://example.com/a') is None
+        assert cache.evict() == 1
+        assert object_count(tmp_path) == 0
+
+    def test_oldest_entries_are_evicted_over_the_size_budget(self, tmp_path):
+        clock = FakeClock()
+        cache = ResponseCache(str(tmp_path), max_bytes=5, clock=clock)
+        for url in ('a', 'b', 'c'):
+            cache.put(url, url.encode() * 4)
+            clock.now += 1
+
+        assert cache.evict() == 2
+        assert cache.get('a') is None and cache.get('b') is None
+        assert cache.get('c') == b'cccc'
+        assert object_count(tmp_path) == 1
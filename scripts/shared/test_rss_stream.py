@@ -0,0 +1,76 @@
+"""Tests for the streaming RSS item parser."""
+
+from __future__ import annotations
+
+import xml.etree.ElementTree as ET
+
+import pytest
+
+from rss_stream import iter_response_items, iter_rss_items
+
+FEED = (
+    '<?xml version="1.0" encoding="UTF-8"?>\n'
+    '<rss version="2.0" xmlns:letterboxd="https://letterboxd.com">'
+    '<channel><title>Feed</title>'
+    + ''.join(
+        f'<item><guid>g{i}</guid><title>Café {i}</title>'
+        f'<letterboxd:filmYear>{2000 + i}</letterboxd:filmYear>'
+        f'<description><![CDATA[<p>Review {i}</p>]]></description></item>'
+        for i in range(5)
+    )
+    + '</channel></rss>'
+).encode('utf-8')
+
+NAMESPACES = {'letterboxd': 'https://letterboxd.com'}
+
+
+def parse(item: ET.Element) -> dict:
+    return {
+        'guid': item.findtext('guid'),
+        'title': item.findtext('title'),
+        'year': item.findtext('letterboxd:filmYear', namespaces=NAMESPACES),
+        'description': item.findtext('description'),
+    }
+
+
+def chunked(data: bytes, size: int) -> list[bytes]:
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+class FakeResponse:
+    def __init__(self, data: bytes):
+        self.data = data
+        self.closed = False
+
+    def iter_content(self, chunk_size):
+        return iter(chunked(self.data, chunk_size))
+
+    def close(self):
+        self.closed = True
+
+
+class TestIterRssItems:
+    @pytest.mark.parametrize('size', [1, 7, 64, len(FEED)])
+    def test_matches_full_tree_parse_at_any_chunk_size(self, size):
+        expected = [parse(item) for item in ET.fromstring(FEED).findall('.//item')]
+        assert list(iter_rss_items(chunked(FEED, size), parse)) == expected
+
+    def test_items_are_cleared_and_detached_after_use(self):
+        seen = []
+        for _ in iter_rss_items([FEED], lambda item: seen.append(item)):
+            pass
+        assert len(seen) == 5
+        assert all(len(item) == 0 for item in seen)
+
+    def test_yields_before_the_feed_is_complete(self):
+        items = iter_rss_items(iter([FEED[:FEED.index(b'</item>') + 7], b'<item>']), parse)
+        assert next(items)['guid'] == 'g0'
+
+    def test_truncated_feed_raises(self):
+        with pytest.raises(ET.ParseError):
+            list(iter_rss_items([FEED[:-20]], parse))
+
+    def test_response_is_closed_after_streaming(self):
+        response = FakeResponse(FEED)
+        assert len(list(iter_response_items(response, parse))) == 5
+        assert response.closed
@@ -0,0 +1,82 @@
+"""Tests for the shared feed text cleaning helpers."""
+
+from __future__ import annotations
+
+import re
+
+import pytest
+
+from text_clean import clean_page, clean_review_html, strip_image_size
+
+
+def reference_review(text: str) -> str:
+    # The uncompiled cleaning the Goodreads path used before text_clean
+    text = re.sub(r'^(<br\s*/?>)+', '', text)
+    text = re.sub(r'(<br\s*/?>)+$', '', text)
+    return text.strip()
+
+
+class TestCleanReviewHtml:
+    def test_strips_leading_br(self):
+        assert clean_review_html("<br/>Great book") == "Great book"
+
+    def test_strips_trailing_br(self):
+        assert clean_review_html("Great book<br/>") == "Great book"
+
+    def test_strips_both(self):
+        assert clean_review_html("<br/>Great book<br/>") == "Great book"
+
+    def test_strips_multiple_br(self):
+        assert clean_review_html("<br/><br/>Great book<br/><br/>") == "Great book"
+
+    def test_strips_br_with_space(self):
+        assert clean_review_html("<br />Hello<br />") == "Hello"
+
+    def test_empty_br_only(self):
+        assert clean_review_html("<br/><br/>") == ""
+
+    def test_preserves_interior_br(self):
+        assert clean_review_html("Good<br/>Very good") == "Good<br/>Very good"
+
+    def test_empty_string(self):
+        assert clean_review_html("") == ""
+
+    @pytest.mark.parametrize('text', [
+        'Plain text',
+        '<br>x<br >',
+        '<br/>x<br/>\n',
+        '<b>bold</b>',
+        'ends with <i>tag</i>',
+        '<br/> spaced <br/> ',
+        '<brx>not a break',
+        'x<br/><br/>\n',
+    ])
+    def test_matches_reference(self, text):
+        assert clean_review_html(text) == reference_review(text)
+
+
+class TestStripImageSize:
+    def test_strips_size_marker(self):
+        url = 'https://i.gr-assets.com/books/1555447414l/44767458._SX50_.jpg'
+        assert strip_image_size(url) == 'https://i.gr-assets.com/books/1555447414l/44767458.jpg'
+
+    def test_strips_marker_without_dot(self):
+        assert strip_image_size('https://example.com/cover_SY75_.jpg') == 'https://example.com/cover.jpg'
+
+    def test_leaves_other_urls(self):
+        url = 'https://example.com/cover.jpg'
+        assert strip_image_size(url) is url
+
+
+class TestCleanPage:
+    def test_cleans_named_fields_in_place(self):
+        items = [
+            {'user_review': '<br/>Good<br/>', 'book_image_url': 'a._SX50_.jpg', 'title': '<br/>kept'},
+            {'user_review': '', 'book_image_url': None},
+            {},
+        ]
+        result = clean_page(items, html_fields=['user_review'], image_fields=['book_image_url'])
+        assert result is items
+        assert items[0] == {'user_review': 'Good', 'book_image_url': 'a.jpg', 'title': '<br/>kept'}
+        assert items[1] == {'user_review': '', 'book_image_url': None}
+        assert items[2] == {}
@@ -0,0 +1,73 @@
+"""Text normalization for fetched feed items.
+
+Patterns are compiled once at import, and each helper checks a cheap prefix,
+suffix or substring first, so clean text never reaches the regex engine.
+``clean_page`` applies them to a whole page of parsed items in one call.
+"""
+
+from __future__ import annotations
+
+import re
+from typing import Iterable
+
+BR_TAG_RE = re.compile(r'<br\s*/?>')
+LEADING_BR_RE = re.compile(r'(?:<br\s*/?>)+')
+
+# Goodreads thumbnail size markers, e.g. "._SX50_" or "_SY75_"
+IMAGE_SIZE_RE = re.compile(r'\.?_S[XY]\d+_')
+
+
+def _trailing_br_start(text: str) -> int:
+    """Index where the run of <br/> tags ending ``text`` begins.
+
+    Walks back one tag at a time with ``rfind`` instead of running a
+    ``$``-anchored pattern over the whole review. Like ``$``, it also
+    matches a run followed by one final newline.
+    """
+    end = len(text) - 1 if text.endswith('\n') else len(text)
+    start = end
+    while text.endswith('>', 0, start):
+        tag = text.rfind('<br', 0, start)
+        if tag < 0 or not BR_TAG_RE.fullmatch(text, tag, start):
+            break
+        start = tag
+    return start if start < end else len(text)
+
+
+def clean_review_html(text: str) -> str:
+    """Strip leading/trailing <br/> tags from review HTML."""
+    if text.startswith('<br'):
+        match = LEADING_BR_RE.match(text)
+        if match:
+            text = text[match.end():]
+    return text[:_trailing_br_start(text)].strip()
+
+
+def strip_image_size(url: str) -> str:
+    """Drop thumbnail size markers from an image URL, leaving the full-size image."""
+    if '_S' not in url:
+        return url
+    return IMAGE_SIZE_RE.sub('', url)
+
+
+def clean_page(
+    items: list[dict],
+    html_fields: Iterable[str] = (),
+    image_fields: Iterable[str] = (),
+) -> list[dict]:
+    """Clean the given fields of every item on a page in place, returning the items.
+
+    Missing or empty fields are left as they are.
+    """
+    html_fields = tuple(html_fields)
+    image_fields = tuple(image_fields)
+    for item in items:
+        for field in html_fields:
+            value = item.get(field)
+            if value:
+                item[field] = clean_review_html(value)
+        for field in image_fields:
+            value = item.get(field)
+            if value:
+                item[field] = strip_image_size(value)
+    return items
@@ -1,11 +1,14 @@
 from __future__ import annotations
 
-import json
 import logging
 import os
-import re
-from datetime import date, datetime
-from email.utils import parsedate_to_datetime
+import sys
+from datetime import date
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'shared'))
+from dates import normalize_dates, record_epoch, rfc2822_to_epoch, utc_year
+from instrument import span, traced
+from jsonl_store import read_records
 
 logger = logging.getLogger(__name__)
 
@@ -14,7 +17,7 @@ RECENT_ACTIVITY_LIMIT = 8
 GOODREADS_PROFILE_URL = "https://www.goodreads.com/user/show/44763252-noah-eisen"
 
 # Data store from fetcher
-BOOKS_DATA_FILE = os.path.join(os.path.dirname(__file__), '..', 'goodreads-fetcher', 'data', 'books.json')
+BOOKS_DATA_FILE = os.path.join(os.path.dirname(__file__), '..', 'goodreads-fetcher', 'data', 'books.jsonl')
 
 
 def _dedupe_key(review: dict) -> tuple[str, str, str]:
@@ -34,27 +37,33 @@ def _review_quality_score(review: dict) -> tuple[int, int, int]:
     )
 
 
+def _epoch_or_min(epoch: int | None) -> float:
+    """Sort value for an epoch, with unparseable dates sorting oldest."""
+    return float('-inf') if epoch is None else epoch
+
+
+@traced('goodreads.load', count=len)
 def load_books_data() -> list[dict]:
     """Load books from the goodreads-fetcher data store."""
     resolved = os.path.normpath(BOOKS_DATA_FILE)
     if not os.path.exists(resolved):
         logger.warning(f"Books data file not found: {resolved}")
         return []
-    with open(resolved, 'r') as f:
-        books = json.load(f)
+    books = read_records(resolved, 'book_id')
+    # Only books stored before the fetcher added user_read_at_epoch are parsed
+    normalize_dates(books, ['user_read_at'], rfc2822_to_epoch)
+    # The store keeps books in first-fetched order; dedupe_reviews keeps the
+    # first of equally good duplicates, so restore the newest-read-first order
+    books.sort(key=lambda b: (b.get('user_read_at') is None, _epoch_or_min(b['user_read_at_epoch'])), reverse=True)
     logger.info(f"Loaded {len(books)} books from data store")
     return books
 
 
-def clean_review_html(text: str) -> str:
-    """Strip leading/trailing <br/> tags from review HTML."""
-    text = re.sub(r'^(<br\s*/?>)+', '', text)
-    text = re.sub(r'(<br\s*/?>)+$', '', text)
-    return text.strip()
-
-
 def convert_book_to_review(book: dict) -> dict:
-    """Convert a raw book record to the review format used by the site."""
+    """Convert a raw book record to the review format used by the site.
+
+    The fetcher cleans ``user_review`` at ingest, so it is used as stored.
+    """
     return {
         'title': book.get('title', ''),
         'author': book.get('author_name', ''),
@@ -62,7 +71,7 @@ def convert_book_to_review(book: dict) -> dict:
         'read_at': book.get('user_read_at'),
         'image_url': book.get('book_image_url', ''),
         'link': book.get('guid', ''),
-        'review': clean_review_html(book.get('user_review', '')),
+        'review': book.get('user_review', ''),
     }
 
 
@@ -77,59 +86,73 @@ def dedupe_reviews(reviews: list[dict]) -> list[dict]:
     return list(deduped.values())
 
 
-def parse_read_at(date_str: str) -> datetime | None:
-    """Parse an RFC 2822 date string into a datetime."""
-    try:
-        return parsedate_to_datetime(date_str)
-    except Exception:
-        return None
-
+def summarize_books(books: list[dict]) -> tuple[list[dict], dict]:
+    """Convert, dedupe and count every book in a single pass.
 
-def calculate_stats(books: list[dict]) -> dict:
-    """Calculate profile statistics from the books data."""
-    reviews = [convert_book_to_review(b) for b in books]
-    rated_reviews = dedupe_reviews([r for r in reviews if r['rating'] > 0])
-    reviewed_reviews = dedupe_reviews([r for r in reviews if r['review']])
+    Returns the reviews of rated books with a read date, newest read first,
+    and the profile stats. Each book is converted once. Duplicate edition
+    records of one read event collapse to the best one by
+    ``_review_quality_score``, as ``dedupe_reviews`` does: among rated
+    copies for the review list, ratings and this year's count, and among
+    copies with review text for the review count.
+    """
     current_year = date.today().year
+    # Dedupe key -> (quality score, review, read date epoch) of the best rated copy
+    rated: dict[tuple[str, str, str], tuple[tuple[int, int, int], dict, int | None]] = {}
+    reviewed: set[tuple[str, str, str]] = set()
+    for book in books:
+        review = convert_book_to_review(book)
+        is_rated = review['rating'] > 0
+        if not is_rated and not review['review']:
+            continue
+        key = _dedupe_key(review)
+        if review['review']:
+            reviewed.add(key)
+        if is_rated:
+            score = _review_quality_score(review)
+            existing = rated.get(key)
+            if existing is None or score > existing[0]:
+                rated[key] = (score, review, record_epoch(book, 'user_read_at', rfc2822_to_epoch))
+
+    ratings_sum = 0
+    books_this_year = 0
+    dated = []
+    for _, review, epoch in rated.values():
+        ratings_sum += review['rating']
+        # Goodreads read dates are midnight +0000, so their UTC year is the read year
+        if epoch is not None and utc_year(epoch) == current_year:
+            books_this_year += 1
+        if review['read_at']:
+            dated.append((_epoch_or_min(epoch), review))
+
+    # Stable, so reviews read on the same day keep their store order
+    with span('goodreads.sort', len(dated)):
+        dated.sort(key=lambda entry: entry[0], reverse=True)
+    stats = {
+        'total_ratings': len(rated),
+        'average_rating': round(ratings_sum / len(rated), 2) if rated else 0.0,
+        'total_reviews': len(reviewed),
+        'books_this_year': books_this_year,
+    }
+    return [review for _, review in dated], stats
 
-    # Books read this year (by read date)
-    books_this_year = []
-    for review in rated_reviews:
-        read_at = review.get('read_at')
-        if read_at:
-            dt = parse_read_at(read_at)
-            if dt and dt.year == current_year:
-                books_this_year.append(review)
-
-    # Average rating
-    ratings = [r['rating'] for r in rated_reviews]
-    average_rating = round(sum(ratings) / len(ratings), 2) if ratings else 0.0
 
-    return {
-        'total_ratings': len(rated_reviews),
-        'average_rating': average_rating,
-        'total_reviews': len(reviewed_reviews),
-        'books_this_year': len(books_this_year),
-    }
+def calculate_stats(books: list[dict]) -> dict:
+    """Calculate profile statistics from the books data."""
+    return summarize_books(books)[1]
 
 
+@traced('goodreads.get_data', count=lambda data: len(data['all_reviews']))
 def get_goodreads_data() -> dict:
     """Load books, compute reviews and stats."""
     books = load_books_data()
-    reviews = [convert_book_to_review(b) for b in books]
-
-    # Filter out unrated books and books without read dates
-    all_reviews = dedupe_reviews([r for r in reviews if r['rating'] > 0 and r['read_at']])
-    all_reviews.sort(
-        key=lambda x: (x['read_at'] is None, parse_read_at(x['read_at']) or date.min),
-        reverse=True,
-    )
-
+    with span('goodreads.summarize', len(books)):
+        all_reviews, stats = summarize_books(books)
     return {
         'all_reviews': all_reviews,
         'recent_reviews': all_reviews[:RECENT_ACTIVITY_LIMIT],
         'profile_url': GOODREADS_PROFILE_URL,
-        'stats': calculate_stats(books),
+        'stats': stats,
     }
 
 
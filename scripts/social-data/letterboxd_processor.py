@@ -2,28 +2,32 @@
 
 from __future__ import annotations
 
-import json
 import logging
 import os
+import sys
 from datetime import datetime, timezone
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'shared'))
+from instrument import span, traced
+from jsonl_store import read_records
+
 logger = logging.getLogger(__name__)
 
 LETTERBOXD_USERNAME = 'ncteisen'
 RECENT_ACTIVITY_LIMIT = 8
 
 # Data store from fetcher
-FILMS_DATA_FILE = os.path.join(os.path.dirname(__file__), '..', 'letterboxd-fetcher', 'data', 'films.json')
+FILMS_DATA_FILE = os.path.join(os.path.dirname(__file__), '..', 'letterboxd-fetcher', 'data', 'films.jsonl')
 
 
+@traced('letterboxd.load', count=len)
 def load_films_data() -> list[dict]:
     """Load films from the letterboxd-fetcher data store."""
     resolved = os.path.normpath(FILMS_DATA_FILE)
     if not os.path.exists(resolved):
         logger.warning(f"Films data file not found: {resolved}")
         return []
-    with open(resolved, 'r') as f:
-        films = json.load(f)
+    films = read_records(resolved, 'guid')
     logger.info(f"Loaded {len(films)} films from data store")
     return films
 
@@ -61,17 +65,22 @@ class LetterboxdProcessor:
     def __init__(self, username: str = LETTERBOXD_USERNAME) -> None:
         self.username = username
 
+    @traced('letterboxd.get_data', count=lambda data: len(data['all_reviews']))
     def get_data(self) -> dict:
         """Load films from data store and compute stats."""
         films = load_films_data()
-        all_reviews = [convert_film_to_review(f) for f in films]
-        all_reviews.sort(key=lambda x: (x['watched_date'] is None, x['watched_date']), reverse=True)
+        with span('letterboxd.convert', len(films)):
+            all_reviews = [convert_film_to_review(f) for f in films]
+        with span('letterboxd.sort', len(all_reviews)):
+            all_reviews.sort(key=lambda x: (x['watched_date'] is None, x['watched_date']), reverse=True)
+        with span('letterboxd.stats', len(films)):
+            stats = calculate_stats(films)
 
         return {
             'username': self.username,
             'all_reviews': all_reviews,
             'recent_reviews': all_reviews[:RECENT_ACTIVITY_LIMIT],
-            'stats': calculate_stats(films),
+            'stats': stats,
         }
 
 
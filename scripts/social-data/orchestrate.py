@@ -2,15 +2,27 @@
 
 from __future__ import annotations
 
+import argparse
+import hashlib
 import json
 import logging
-from datetime import datetime
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack
+from datetime import datetime, timezone
 from pathlib import Path
+from typing import Any, Callable
 
-from letterboxd_processor import create_letterboxd_processor
-from goodreads_processor import get_goodreads_data
+from output_format import FORMATS, decode_columnar, dump_json
+from letterboxd_processor import FILMS_DATA_FILE, create_letterboxd_processor
+from goodreads_processor import BOOKS_DATA_FILE, get_goodreads_data
 from strava_processor import StravaProcessor
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'shared'))
+from instrument import TRACER, add_trace_arguments, configure_from_args, finish, span
+
 # Set up logging
 logging.basicConfig(
     level=logging.INFO,
@@ -19,8 +31,188 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 # Constants
-OUTPUT_DIR = Path('src/data')
-OUTPUT_FILE = OUTPUT_DIR / 'social_data.json'
+OUTPUT_DIR = Path('src/data/social')
+MANIFEST_FILE = OUTPUT_DIR / 'manifest.json'
+
+# Shard -> the keys of each source's data it carries. Each page imports only
+# the shard it renders, so small summaries are repeated rather than shared.
+SHARDS: dict[str, dict[str, list[str]]] = {
+    # index.astro
+    'recent': {
+        'letterboxd': ['username', 'recent_reviews', 'stats'],
+        'goodreads': ['profile_url', 'recent_reviews', 'stats'],
+        'strava': ['recent_runs', 'recent_bikes', 'recent_hikes', 'stats'],
+    },
+    # journal.astro
+    'reviews': {
+        'letterboxd': ['all_reviews'],
+        'goodreads': ['all_reviews'],
+    },
+    # activities.astro
+    'activities': {
+        'strava': ['all_activities'],
+    },
+    # records.astro
+    'records': {
+        'strava': [
+            'longest_run', 'longest_ride', 'longest_hike',
+            'most_vert_run', 'most_vert_ride', 'most_vert_hike',
+        ],
+    },
+}
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+
+# Code every source's output depends on, besides its own processor
+SHARED_CODE_FILES = [
+    SCRIPT_DIR / 'orchestrate.py',
+    SCRIPT_DIR / '..' / 'shared' / 'jsonl_store.py',
+    SCRIPT_DIR / '..' / 'shared' / 'dates.py',
+]
+
+
+def process_letterboxd() -> dict:
+    return create_letterboxd_processor().get_data()
+
+
+def process_goodreads() -> dict:
+    return get_goodreads_data()
+
+
+def process_strava() -> dict:
+    return StravaProcessor().get_recent_activities_data()
+
+
+# Output key -> processor entry point. Entry points run in worker processes,
+# so they must be module-level functions.
+SOURCES: dict[str, Callable[[], dict]] = {
+    'letterboxd': process_letterboxd,
+    'goodreads': process_goodreads,
+    'strava': process_strava,
+}
+
+SOURCE_LABELS = {
+    'letterboxd': 'Letterboxd',
+    'goodreads': 'Goodreads',
+    'strava': 'Strava',
+}
+
+# Output key -> (data store, processor module) its output is computed from
+SOURCE_FILES: dict[str, tuple[Path, Path]] = {
+    'letterboxd': (Path(FILMS_DATA_FILE), SCRIPT_DIR / 'letterboxd_processor.py'),
+    'goodreads': (Path(BOOKS_DATA_FILE), SCRIPT_DIR / 'goodreads_processor.py'),
+    'strava': (Path(StravaProcessor().activities_file), SCRIPT_DIR / 'strava_processor.py'),
+}
+
+
+def date_buckets(now: datetime) -> dict[str, str]:
+    """The part of the current date each source's output depends on."""
+    utc = now.astimezone(timezone.utc)
+    return {
+        # films_this_year counts by UTC year
+        'letterboxd': str(utc.year),
+        # books_this_year counts by local year
+        'goodreads': str(now.astimezone().year),
+        # YTD totals and the 28-day recent window move every UTC day
+        'strava': utc.date().isoformat(),
+    }
+
+
+def file_digest(path: Path) -> str | None:
+    """SHA-256 of a file's bytes, or None if it does not exist."""
+    try:
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            # Chunked rather than hashlib.file_digest, which needs Python 3.11
+            while chunk := f.read(1 << 16):
+                digest.update(chunk)
+        return digest.hexdigest()
+    except FileNotFoundError:
+        return None
+
+
+def source_fingerprints(now: datetime) -> dict[str, str]:
+    """Hash of everything each source's output is computed from.
+
+    Covers the source's data store, its processor code plus the shared code,
+    and the date bucket its year-to-date and recent windows fall in. Equal
+    fingerprints mean the processor would produce the same output again.
+    """
+    shared = [file_digest(path) for path in SHARED_CODE_FILES]
+    buckets = date_buckets(now)
+    fingerprints = {}
+    for name, (data_file, code_file) in SOURCE_FILES.items():
+        parts = [file_digest(data_file), file_digest(code_file), *shared, buckets.get(name)]
+        fingerprints[name] = hashlib.sha256(json.dumps(parts).encode()).hexdigest()
+    return fingerprints
+
+
+def run_source(process: Callable[[], dict]) -> tuple[dict, float, str | None, list[dict]]:
+    """Run one processor, returning its data, wall time in seconds, any error and its trace spans."""
+    # A forked worker starts with a copy of the parent's spans
+    TRACER.reset()
+    started = time.perf_counter()
+    try:
+        result = process()
+    except Exception as e:
+        # Reported as text, since not every exception survives pickling
+        return {}, time.perf_counter() - started, str(e), TRACER.drain()
+    return result, time.perf_counter() - started, None, TRACER.drain()
+
+
+def process_sources(sources: dict[str, Callable[[], dict]] = SOURCES) -> tuple[dict[str, Any], dict[str, float | None]]:
+    """Run every source's processor in its own process.
+
+    Returns the data of each source that succeeded, and every source's wall
+    time. A source that raises, or whose worker dies, is logged and left out
+    of the results without affecting the others.
+    """
+    results: dict[str, Any] = {}
+    timings: dict[str, float | None] = {}
+    with ExitStack() as stack:
+        # One single-worker pool per source, so a crashed worker only breaks its own pool
+        futures = {
+            name: stack.enter_context(ProcessPoolExecutor(max_workers=1)).submit(run_source, process)
+            for name, process in sources.items()
+        }
+        for name, future in futures.items():
+            label = SOURCE_LABELS.get(name, name)
+            try:
+                result, seconds, error, spans = future.result()
+            except Exception as e:
+                timings[name] = None
+                logger.error(f"Failed to process {label} data: {e}")
+                continue
+
+            TRACER.merge(spans)
+            timings[name] = round(seconds, 3)
+            if error is not None:
+                logger.error(f"Failed to process {label} data: {error}")
+                continue
+            results[name] = result
+            logger.info(f"Successfully processed {label} data in {seconds:.2f}s")
+    return results, timings
+
+
+def split_shards(sections: dict[str, dict]) -> dict[str, dict]:
+    """Split each source's data into the shards listed in ``SHARDS``."""
+    shards = {
+        shard: {
+            name: {key: sections[name][key] for key in keys if key in sections.get(name, {})}
+            for name, keys in spec.items()
+        }
+        for shard, spec in SHARDS.items()
+    }
+    for name, section in sections.items():
+        covered = {key for spec in SHARDS.values() for key in spec.get(name, [])}
+        for key in section.keys() - covered:
+            logger.warning(f"{SOURCE_LABELS.get(name, name)} key {key!r} is in no shard and will not be written")
+    return shards
+
+
+def shard_path(shard: str) -> Path:
+    return OUTPUT_DIR / f'{shard}.json'
+
 
 def ensure_output_directory() -> None:
     """Ensure the output directory exists."""
@@ -31,59 +223,155 @@ def ensure_output_directory() -> None:
         logger.error(f"Failed to create output directory: {e}")
         raise
 
-def save_data(data: dict) -> None:
-    """Save the fetched data to a JSON file."""
+def load_manifest() -> dict:
+    """The last written manifest, or {} if there is none or it cannot be read."""
     try:
-        with open(OUTPUT_FILE, 'w') as f:
-            json.dump(data, f, indent=2)
-        logger.info(f"Data saved successfully to {OUTPUT_FILE}")
+        with open(MANIFEST_FILE, 'r') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, json.JSONDecodeError) as e:
+        logger.warning(f"Could not read previous manifest {MANIFEST_FILE}: {e}")
+        return {}
+
+def load_previous_sections(names: list[str]) -> dict[str, dict]:
+    """Reassemble the given sources' previous data from the shards carrying it.
+
+    A source is left out if any of its shards cannot be read.
+    """
+    sections: dict[str, dict] = {name: {} for name in names}
+    for shard, spec in SHARDS.items():
+        wanted = [name for name in spec if name in sections]
+        if not wanted:
+            continue
+        try:
+            with open(shard_path(shard), 'r', encoding='utf-8') as f:
+                data = decode_columnar(json.load(f))
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"Could not read previous shard {shard_path(shard)}: {e}")
+            for name in wanted:
+                sections.pop(name)
+            continue
+        for name in wanted:
+            sections[name].update(data.get(name, {}))
+    return sections
+
+def save_bytes(path: Path, data: bytes) -> None:
+    """Write a file via a temporary sibling, so readers never see half of it."""
+    try:
+        tmp_path = path.with_name(path.name + '.tmp')
+        tmp_path.write_bytes(data)
+        tmp_path.replace(path)
+        logger.info(f"Data saved successfully to {path}")
     except Exception as e:
         logger.error(f"Failed to save data: {e}")
         raise
 
-def main() -> None:
-    """Main function to process and save social media data."""
+def main(argv: list[str] | None = None) -> None:
+    """Main function to process and save social media data.
+
+    Each source is only reprocessed when its fingerprint differs from the one
+    recorded in the previous manifest, and only shards whose contents changed
+    are rewritten. A different ``--format`` than the previous run
+    re-serializes every shard, from the previous data if no input changed.
+    Otherwise, when no source needs reprocessing, or the reprocessed sources
+    come out unchanged, the output is left untouched.
+    """
+    parser = argparse.ArgumentParser(description="Combine the fetched social data into the site's data shards.")
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Reprocess every source and rewrite every shard even if no input changed.",
+    )
+    parser.add_argument(
+        "--format",
+        choices=FORMATS,
+        default='pretty',
+        help=(
+            "Shard serialization: indented JSON, minified JSON, or minified JSON with "
+            "record lists stored as columns plus rows."
+        ),
+    )
+    add_trace_arguments(parser)
+    args = parser.parse_args(argv)
+    configure_from_args(args)
+
     try:
         # Ensure output directory exists
         ensure_output_directory()
 
-        # Initialize data structure
-        data = {
-            'last_updated': datetime.utcnow().isoformat(),
-            'letterboxd': {},
-            'goodreads': {},
-            'strava': {},
-        }
-
-        # Process Letterboxd data
-        try:
-            letterboxd_processor = create_letterboxd_processor()
-            data['letterboxd'] = letterboxd_processor.get_data()
-            logger.info("Successfully processed Letterboxd data")
-        except Exception as e:
-            logger.error(f"Failed to process Letterboxd data: {e}")
+        with span('orchestrate.load_manifest'):
+            manifest = load_manifest()
+        previous_hashes = manifest.get('metadata', {}).get('input_hashes', {})
+        with span('orchestrate.fingerprint', len(SOURCES)):
+            fingerprints = source_fingerprints(datetime.now().astimezone())
+        unchanged = [
+            name for name in SOURCES
+            if not args.force and fingerprints[name] == previous_hashes.get(name)
+        ]
+        with span('orchestrate.load_previous', len(unchanged)):
+            previous = load_previous_sections(unchanged)
+        stale = {name: process for name, process in SOURCES.items() if name not in previous}
+        output_changed = manifest.get('format') != args.format
+        if not stale and not output_changed:
+            logger.info("No inputs changed since the last run, nothing to do")
+            return
+        for name in previous:
+            logger.info(f"{SOURCE_LABELS.get(name, name)} inputs unchanged, reusing previous data")
 
-        # Process Goodreads data
-        try:
-            data['goodreads'] = get_goodreads_data()
-            logger.info("Successfully processed Goodreads data")
-        except Exception as e:
-            logger.error(f"Failed to process Goodreads data: {e}")
+        started = time.perf_counter()
+        results: dict[str, Any] = {}
+        timings: dict[str, float | None] = {}
+        if stale:
+            with span('orchestrate.process', len(stale)):
+                results, timings = process_sources(stale)
+        else:
+            logger.info("Output format changed, re-serializing the previous data")
+        sections = {name: previous.get(name, results.get(name, {})) for name in SOURCES}
 
-        # Process Strava data
-        try:
-            strava_processor = StravaProcessor()
-            data['strava'] = strava_processor.get_recent_activities_data()
-            logger.info("Successfully processed Strava data")
-        except Exception as e:
-            logger.error(f"Failed to process Strava data: {e}")
+        previous_shards = manifest.get('shards', {})
+        shards = {}
+        changed = {}
+        with span('orchestrate.serialize', len(SHARDS)):
+            for shard, data in split_shards(sections).items():
+                encoded = dump_json(data, args.format).encode('utf-8')
+                digest = hashlib.sha256(encoded).hexdigest()
+                shards[shard] = {'file': shard_path(shard).name, 'bytes': len(encoded), 'sha256': digest}
+                if (
+                    args.force
+                    or output_changed
+                    or previous_shards.get(shard, {}).get('sha256') != digest
+                    or not shard_path(shard).exists()
+                ):
+                    changed[shard] = encoded
+        if not changed:
+            logger.info("Reprocessed data is unchanged, leaving the output as is")
+            return
 
-        # Save the data
-        save_data(data)
+        # Shards first, so the manifest never lists content that is not on disk
+        with span('orchestrate.write', len(changed)):
+            for shard, encoded in changed.items():
+                save_bytes(shard_path(shard), encoded)
+        save_bytes(MANIFEST_FILE, dump_json({
+            'last_updated': datetime.utcnow().isoformat(),
+            'format': args.format,
+            'shards': shards,
+            'metadata': {
+                'processing_seconds': timings,
+                'total_seconds': round(time.perf_counter() - started, 3),
+                # A failed source has no hash, so the next run retries it
+                'input_hashes': {
+                    name: fingerprints[name] if name in results or name in previous else None
+                    for name in SOURCES
+                },
+            },
+        }).encode('utf-8'))
 
     except Exception as e:
         logger.error(f"An error occurred: {e}")
         raise
+    finally:
+        finish()
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,63 @@
+"""Serialization of the social data shards.
+
+Three formats are supported:
+
+- ``pretty``: ``indent=2`` JSON, easy to read and diff.
+- ``minified``: JSON without any whitespace.
+- ``columnar``: minified JSON where every list of records sharing the same
+  keys is stored as ``{"$columns": [keys...], "$rows": [[values...], ...]}``,
+  so each key name is written once per list instead of once per record.
+
+``decode_columnar`` reverses the columnar encoding and leaves other values
+alone, so it reads all three formats. ``src/data/socialData.ts`` is its
+counterpart for the Astro pages.
+"""
+
+from __future__ import annotations
+
+import json
+from typing import Any
+
+FORMATS = ('pretty', 'minified', 'columnar')
+
+COLUMNS = '$columns'
+ROWS = '$rows'
+
+
+def encode_columnar(value: Any) -> Any:
+    """Store each list of same-keyed records as columns plus rows, recursively."""
+    if isinstance(value, dict):
+        return {key: encode_columnar(item) for key, item in value.items()}
+    if not isinstance(value, list):
+        return value
+    items = [encode_columnar(item) for item in value]
+    if not items or not all(isinstance(item, dict) for item in items):
+        return items
+    columns = list(items[0])
+    # Only lists whose records all have exactly the same keys round-trip
+    if not columns or any(item.keys() != items[0].keys() for item in items):
+        return items
+    return {COLUMNS: columns, ROWS: [[item[key] for key in columns] for item in items]}
+
+
+def decode_columnar(value: Any) -> Any:
+    """Inverse of ``encode_columnar``. Values that are not columnar pass through."""
+    if isinstance(value, list):
+        return [decode_columnar(item) for item in value]
+    if not isinstance(value, dict):
+        return value
+    if value.keys() == {COLUMNS, ROWS}:
+        columns = value[COLUMNS]
+        return [
+            {key: decode_columnar(item) for key, item in zip(columns, row)}
+            for row in value[ROWS]
+        ]
+    return {key: decode_columnar(item) for key, item in value.items()}
+
+
+def dump_json(data: Any, output_format: str = 'pretty') -> str:
+    if output_format == 'pretty':
+        return json.dumps(data, indent=2)
+    if output_format == 'columnar':
+        data = encode_columnar(data)
+    return json.dumps(data, separators=(',', ':'), ensure_ascii=False)
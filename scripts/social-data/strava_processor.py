@@ -1,11 +1,19 @@
 from __future__ import annotations
 
 import os
+import sys
 import json
+import bisect
 import logging
+from array import array
 from datetime import datetime, timedelta, timezone
 from typing import TypedDict
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'shared'))
+from dates import iso_to_epoch, normalize_dates, record_epoch, utc_year
+from instrument import traced
+from jsonl_store import read_records
+
 logger = logging.getLogger(__name__)
 
 # Unit conversion constants
@@ -22,6 +30,29 @@ ALL_ACTIVITIES_LIMIT = 100
 # Commutes below this distance are filtered out of public activity lists.
 MIN_COMMUTE_DISTANCE_MILES = 5
 
+# Length of the "recent" stats window
+RECENT_WINDOW_DAYS = 28
+
+# Sports the aggregation engine tracks; the index is the bit in a sport mask
+TRACKED_SPORTS = ('Run', 'Ride', 'Hike', 'Swim')
+
+# Sports with ytd/all-time/recent totals, keyed by their name in the stats output
+STATS_SPORTS = {'running': 'Run', 'biking': 'Ride', 'swimming': 'Swim'}
+
+# Sports with recent lists, an activity log entry, and longest/most-vertical records
+LOG_SPORTS = ('Run', 'Ride', 'Hike')
+
+# Record names per LOG_SPORTS sport
+LONGEST_RECORDS = {sport: f'longest_{sport}' for sport in LOG_SPORTS}
+MOST_VERT_RECORDS = {sport: f'most_vert_{sport}' for sport in LOG_SPORTS}
+
+# Bump when the checkpoint layout or the aggregation rules change
+CHECKPOINT_VERSION = 1
+
+# Data store from fetcher
+ACTIVITIES_DATA_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'strava-fetcher', 'data', 'activities.jsonl')
+
+
 class StravaActivity(TypedDict):
     id: int
     name: str
@@ -48,51 +79,341 @@ class StravaActivity(TypedDict):
     end_latlng: list[float] | None
     map: dict[str, str]
 
+def sport_mask(activity_type: str | None, sport_type: str | None) -> int:
+    """Return the TRACKED_SPORTS bitmask an activity's type/sport_type pair matches."""
+    mask = 0
+    for bit, sport in enumerate(TRACKED_SPORTS):
+        if activity_type == sport or sport_type == sport:
+            mask |= 1 << bit
+    return mask
+
+
+def _accumulate(bucket: list, sums: tuple, sign: int = 1) -> None:
+    """Add (or with ``sign=-1``, subtract) one activity's sums to a totals bucket."""
+    distance, moving_time, elapsed_time, elevation = sums
+    bucket[0] += sign
+    bucket[1] += sign * distance
+    bucket[2] += sign * moving_time
+    bucket[3] += sign * elapsed_time
+    bucket[4] += sign * elevation
+
+
+def _newest_first(entry: list) -> tuple:
+    """Sort key for ``[epoch, activity_id]`` entries, newest first."""
+    return (-entry[0], -entry[1])
+
+
+class ActivityColumns:
+    """Compact column store of the activity fields the aggregations read.
+
+    Each activity is visited once: its ``start_date_epoch`` (see
+    ``dates.normalize_dates``) gives the epoch seconds and UTC year, and the ``type``/``sport_type`` pair is
+    interned into a TRACKED_SPORTS mask. ``index`` maps activity IDs to rows.
+
+    ``fingerprint`` holds a content hash of each row's values. The values are
+    all numbers, whose ``hash()`` is stable across runs, so a stored
+    fingerprint tells whether an activity changed in any way that matters to
+    the aggregates. Edits to anything else (name, description, heart rate)
+    keep it stable, since the output reads those from the live activity.
+    """
+
+    # Column name -> array typecode, in row_values() order
+    TYPECODES = {
+        'id': 'q',
+        'epoch': 'd',
+        'year': 'H',
+        'mask': 'B',
+        'public': 'B',
+        'distance': 'd',
+        'moving_time': 'q',
+        'elapsed_time': 'q',
+        'elevation': 'd',
+        'fingerprint': 'q',
+    }
+
+    def __init__(self):
+        for name, typecode in self.TYPECODES.items():
+            setattr(self, name, array(typecode))
+        self.index: dict[int, int] = {}
+        self._masks: dict[tuple[str | None, str | None], int] = {}
+
+    @classmethod
+    def from_activities(cls, activities: list[StravaActivity]) -> ActivityColumns:
+        columns = cls()
+        rows = [columns.row_values(activity) for activity in activities]
+        columns.index = {values[0]: row for row, values in enumerate(rows)}
+        if len(columns.index) < len(rows):
+            # Repeated IDs: let later copies overwrite earlier rows
+            columns.index = {}
+            for values in rows:
+                columns.upsert(values)
+            return columns
+
+        for (name, typecode), column in zip(cls.TYPECODES.items(), zip(*rows)):
+            setattr(columns, name, array(typecode, column))
+        return columns
+
+    def __len__(self) -> int:
+        return len(self.id)
+
+    def row_values(self, activity: StravaActivity) -> tuple:
+        """Return an activity's column values, ending with their fingerprint."""
+        get = activity.get
+        sport_key = (get('type'), get('sport_type'))
+        mask = self._masks.get(sport_key)
+        if mask is None:
+            mask = self._masks[sport_key] = sport_mask(*sport_key)
+
+        # Strava start dates are UTC, so the UTC year is the activity's year
+        epoch = record_epoch(activity, 'start_date', iso_to_epoch)
+        distance = get('distance', 0)
+        values = (
+            activity['id'],
+            epoch,
+            utc_year(epoch),
+            mask,
+            not get('commute', False) or distance * METERS_TO_MILES > MIN_COMMUTE_DISTANCE_MILES,
+            distance,
+            get('moving_time', 0),
+            get('elapsed_time', 0),
+            get('total_elevation_gain', 0),
+        )
+        return values + (hash(values),)
+
+    def upsert(self, values: tuple) -> int:
+        """Write ``values`` into the activity's existing row, or append a new one; return the row."""
+        row = self.index.get(values[0])
+        if row is None:
+            row = self.index[values[0]] = len(self.id)
+            for name, value in zip(self.TYPECODES, values):
+                getattr(self, name).append(value)
+        else:
+            for name, value in zip(self.TYPECODES, values):
+                getattr(self, name)[row] = value
+        return row
+
+    def drop(self, activity_ids: set[int]) -> None:
+        """Remove the rows of ``activity_ids`` and reindex the rest."""
+        keep = [row for row, activity_id in enumerate(self.id) if activity_id not in activity_ids]
+        for name, typecode in self.TYPECODES.items():
+            column = getattr(self, name)
+            setattr(self, name, array(typecode, (column[row] for row in keep)))
+        self.index = {activity_id: row for row, activity_id in enumerate(self.id)}
+
+    def to_json(self) -> dict:
+        return {name: getattr(self, name).tolist() for name in self.TYPECODES}
+
+    @classmethod
+    def from_json(cls, data: dict) -> ActivityColumns:
+        columns = cls()
+        for name, typecode in cls.TYPECODES.items():
+            setattr(columns, name, array(typecode, data[name]))
+        columns.index = {activity_id: row for row, activity_id in enumerate(columns.id)}
+        return columns
+
+
+class ActivityAggregates:
+    """Running totals, records, and latest-activity lists over ActivityColumns rows.
+
+    Rows are folded in one at a time with ``add``, so a full recompute is a
+    single pass and an incremental run only folds in new or changed rows.
+    Sums can be backed out with ``remove``; records and latest lists cannot,
+    so ``remove`` reports when the caller has to recompute from scratch.
+
+    - ``all_time[sport]``: ``[count, distance, moving, elapsed, elevation]`` of
+      public activities (short commutes skipped, like the public lists).
+    - ``years[sport][year]``: the same sums over every activity, per UTC year.
+    - ``records[name]``: ``[activity_id, value]`` of the ``longest_<sport>``,
+      ``most_vert_<sport>``, ``biggest_ride`` and ``biggest_climb`` holders.
+    - ``latest[sport]``: ``[epoch, activity_id]`` of the newest public activities.
+    - ``recent``: IDs of activities that started on or after ``recent_start``.
+    """
+
+    def __init__(self, recent_start: float):
+        self.recent_start = recent_start
+        self.all_time = {sport: [0, 0, 0, 0, 0] for sport in STATS_SPORTS.values()}
+        self.years: dict[str, dict[str, list]] = {sport: {} for sport in STATS_SPORTS.values()}
+        self.records: dict[str, list | None] = dict.fromkeys(
+            [*LONGEST_RECORDS.values(), *MOST_VERT_RECORDS.values(), 'biggest_ride', 'biggest_climb']
+        )
+        self.latest: dict[str, list[list]] = {sport: [] for sport in LOG_SPORTS}
+        self.recent: set[int] = set()
+        self._sports: dict[int, tuple[list[str], list[str]]] = {}
+
+    def _sports_for(self, mask: int) -> tuple[list[str], list[str]]:
+        sports = self._sports.get(mask)
+        if sports is None:
+            matches = [sport for bit, sport in enumerate(TRACKED_SPORTS) if mask >> bit & 1]
+            sports = self._sports[mask] = (
+                [sport for sport in STATS_SPORTS.values() if sport in matches],
+                [sport for sport in LOG_SPORTS if sport in matches],
+            )
+        return sports
+
+    def _update_record(self, name: str, activity_id: int, value: float) -> None:
+        # max() semantics: the first holder keeps a tie
+        holder = self.records[name]
+        if holder is None or value > holder[1]:
+            self.records[name] = [activity_id, value]
+
+    def add(self, columns: ActivityColumns, row: int) -> None:
+        activity_id = columns.id[row]
+        epoch = columns.epoch[row]
+        distance = columns.distance[row]
+        elevation = columns.elevation[row]
+        is_public = columns.public[row]
+        stats_sports, log_sports = self._sports_for(columns.mask[row])
+
+        self._update_record('biggest_climb', activity_id, elevation)
+        if 'Ride' in log_sports:
+            self._update_record('biggest_ride', activity_id, distance)
+        if not stats_sports and not log_sports:
+            return
+
+        if epoch >= self.recent_start:
+            self.recent.add(activity_id)
+
+        sums = (distance, columns.moving_time[row], columns.elapsed_time[row], elevation)
+        year = str(columns.year[row])
+        for sport in stats_sports:
+            bucket = self.years[sport].get(year)
+            if bucket is None:
+                bucket = self.years[sport][year] = [0, 0, 0, 0, 0]
+            _accumulate(bucket, sums)
+            if is_public:
+                _accumulate(self.all_time[sport], sums)
+
+        if not is_public:
+            return
+        entry = [epoch, activity_id]
+        for sport in log_sports:
+            self._update_record(LONGEST_RECORDS[sport], activity_id, distance)
+            self._update_record(MOST_VERT_RECORDS[sport], activity_id, elevation)
+            latest = self.latest[sport]
+            if len(latest) < ALL_ACTIVITIES_LIMIT or entry > latest[-1]:
+                bisect.insort(latest, entry, key=_newest_first)
+                del latest[ALL_ACTIVITIES_LIMIT:]
+
+    def remove(self, columns: ActivityColumns, row: int) -> bool:
+        """Back a row's contribution out; return False if a full recompute is needed."""
+        activity_id = columns.id[row]
+        if any(holder and holder[0] == activity_id for holder in self.records.values()):
+            return False
+
+        stats_sports, log_sports = self._sports_for(columns.mask[row])
+        is_public = columns.public[row]
+        for sport in log_sports if is_public else ():
+            latest = self.latest[sport]
+            entry = [columns.epoch[row], activity_id]
+            if entry in latest:
+                # A full list would need its next-newest activity backfilled
+                if len(latest) == ALL_ACTIVITIES_LIMIT:
+                    return False
+                latest.remove(entry)
+
+        self.recent.discard(activity_id)
+        sums = (columns.distance[row], columns.moving_time[row], columns.elapsed_time[row], columns.elevation[row])
+        year = str(columns.year[row])
+        for sport in stats_sports:
+            _accumulate(self.years[sport][year], sums, sign=-1)
+            if is_public:
+                _accumulate(self.all_time[sport], sums, sign=-1)
+        return True
+
+    def advance(self, columns: ActivityColumns, recent_start: float) -> bool:
+        """Slide the recent window forward; return False if it would move backwards."""
+        if recent_start < self.recent_start:
+            return False
+        self.recent_start = recent_start
+        self.recent = {
+            activity_id for activity_id in self.recent
+            if columns.epoch[columns.index[activity_id]] >= recent_start
+        }
+        return True
+
+    def recent_totals(self, columns: ActivityColumns) -> dict[str, list]:
+        """Sum the recent window per STATS_SPORTS sport, in row order."""
+        totals = {sport: [0, 0, 0, 0, 0] for sport in STATS_SPORTS.values()}
+        for row in sorted(columns.index[activity_id] for activity_id in self.recent):
+            sums = (columns.distance[row], columns.moving_time[row], columns.elapsed_time[row], columns.elevation[row])
+            for sport in self._sports_for(columns.mask[row])[0]:
+                _accumulate(totals[sport], sums)
+        return totals
+
+    @classmethod
+    def from_columns(cls, columns: ActivityColumns, recent_start: float) -> ActivityAggregates:
+        """Recompute everything in one pass over the rows."""
+        aggregates = cls(recent_start)
+        for row in range(len(columns)):
+            aggregates.add(columns, row)
+        return aggregates
+
+    def to_json(self) -> dict:
+        return {
+            'recent_start': self.recent_start,
+            'all_time': self.all_time,
+            'years': self.years,
+            'records': self.records,
+            'latest': self.latest,
+            'recent': sorted(self.recent),
+        }
+
+    @classmethod
+    def from_json(cls, data: dict) -> ActivityAggregates:
+        aggregates = cls(data['recent_start'])
+        aggregates.all_time = data['all_time']
+        aggregates.years = data['years']
+        aggregates.records = data['records']
+        aggregates.latest = data['latest']
+        aggregates.recent = set(data['recent'])
+        return aggregates
+
+
 class StravaProcessor:
     def __init__(self):
-        # Get the absolute path to the strava-fetcher data
         self.script_dir = os.path.dirname(os.path.abspath(__file__))
-        self.activities_file = os.path.join(
-            self.script_dir,
-            '..',
-            'strava-fetcher',
-            'data',
-            'activities.json'
-        )
+        self.activities_file = ACTIVITIES_DATA_FILE
+        # Persisted aggregates, so later runs only fold in new or changed activities
+        self.checkpoint_file = os.path.join(os.path.dirname(self.activities_file), 'activities_checkpoint.json')
         self.activities_data = None
 
+    @traced('strava.load', count=len)
     def load_activities_data(self) -> list[StravaActivity]:
-        """Load activities from the cached JSON file."""
+        """Load the latest version of each activity from the fetcher's JSONL store."""
         if self.activities_data is not None:
             return self.activities_data
             
-        try:
-            with open(self.activities_file, 'r') as f:
-                self.activities_data = json.load(f)
-            return self.activities_data
-        except FileNotFoundError:
+        if not os.path.exists(self.activities_file):
             raise FileNotFoundError(
                 f"Activities file not found at {self.activities_file}. "
                 "Please run the strava-fetcher first."
             )
-        except json.JSONDecodeError:
-            raise ValueError(f"Invalid JSON in activities file: {self.activities_file}")
+        self.activities_data = read_records(self.activities_file, 'id')
+        normalize_dates(self.activities_data, ['start_date'], iso_to_epoch)
+        return self.activities_data
 
     def filter_activities_by_date_range(self, activities: list[StravaActivity], days_back: int) -> list[StravaActivity]:
         """Filter activities to only include those within the specified number of days."""
-        cutoff_date = datetime.now(timezone.utc) - timedelta(days=days_back)
-        filtered_activities = []
-        
-        for activity in activities:
-            activity_date = datetime.fromisoformat(activity['start_date'].replace('Z', '+00:00'))
-            if activity_date >= cutoff_date:
-                filtered_activities.append(activity)
-                
-        return filtered_activities
+        cutoff = (datetime.now(timezone.utc) - timedelta(days=days_back)).timestamp()
+        return [
+            activity for activity in activities
+            if record_epoch(activity, 'start_date', iso_to_epoch) >= cutoff
+        ]
 
     def calculate_activity_totals(self, activities: list[StravaActivity]) -> dict:
         """Calculate totals for a list of activities."""
-        if not activities:
+        return self.format_totals([
+            len(activities),
+            sum(activity.get('distance', 0) for activity in activities),
+            sum(activity.get('moving_time', 0) for activity in activities),
+            sum(activity.get('elapsed_time', 0) for activity in activities),
+            sum(activity.get('total_elevation_gain', 0) for activity in activities),
+        ])
+
+    def format_totals(self, totals: list) -> dict:
+        """Format raw ``[count, distance, moving, elapsed, elevation]`` sums for output."""
+        count, total_distance, total_moving_time, total_elapsed_time, total_elevation = totals
+        if not count:
             return {
                 'count': 0,
                 'distance': 0,
@@ -100,14 +421,9 @@ class StravaProcessor:
                 'elapsed_time': 0,
                 'elevation_gain': 0
             }
-        
-        total_distance = sum(activity.get('distance', 0) for activity in activities)
-        total_moving_time = sum(activity.get('moving_time', 0) for activity in activities)
-        total_elapsed_time = sum(activity.get('elapsed_time', 0) for activity in activities)
-        total_elevation = sum(activity.get('total_elevation_gain', 0) for activity in activities)
-        
+
         return {
-            'count': len(activities),
+            'count': count,
             'distance': round(total_distance * METERS_TO_MILES, 2),
             'moving_time': total_moving_time,
             'elapsed_time': total_elapsed_time,
@@ -182,91 +498,181 @@ class StravaProcessor:
             'biggest_climb_elevation_gain': round(biggest_climb.get('total_elevation_gain', 0) * METERS_TO_FEET, 0)
         }
 
+    def checkpoint_settings(self) -> dict:
+        """Settings a checkpoint was computed under; any change forces a full recompute."""
+        return {
+            'version': CHECKPOINT_VERSION,
+            'tracked_sports': list(TRACKED_SPORTS),
+            'min_commute_distance_miles': MIN_COMMUTE_DISTANCE_MILES,
+            'latest_limit': ALL_ACTIVITIES_LIMIT,
+            'recent_window_days': RECENT_WINDOW_DAYS,
+        }
+
+    @traced('strava.load_checkpoint')
+    def load_checkpoint(self) -> tuple[ActivityColumns, ActivityAggregates, int] | None:
+        """Load the aggregate checkpoint, or None if it is missing or stale."""
+        try:
+            with open(self.checkpoint_file, 'r') as f:
+                checkpoint = json.load(f)
+        except FileNotFoundError:
+            logger.info(f"No Strava checkpoint at {self.checkpoint_file}; recomputing all activities")
+            return None
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"Ignoring unreadable Strava checkpoint {self.checkpoint_file}: {e}")
+            return None
+
+        if checkpoint.get('settings') != self.checkpoint_settings():
+            logger.info("Strava checkpoint settings changed; recomputing all activities")
+            return None
+
+        return (
+            ActivityColumns.from_json(checkpoint['columns']),
+            ActivityAggregates.from_json(checkpoint['aggregates']),
+            checkpoint['high_water_id'],
+        )
+
+    @traced('strava.save_checkpoint')
+    def save_checkpoint(self, columns: ActivityColumns, aggregates: ActivityAggregates) -> None:
+        """Persist the column store and aggregates next to the activities file."""
+        checkpoint = {
+            'settings': self.checkpoint_settings(),
+            'high_water_id': max(columns.id, default=0),
+            'columns': columns.to_json(),
+            'aggregates': aggregates.to_json(),
+        }
+        tmp_file = f"{self.checkpoint_file}.tmp"
+        with open(tmp_file, 'w') as f:
+            f.write(json.dumps(checkpoint, separators=(',', ':')))
+        os.replace(tmp_file, self.checkpoint_file)
+
+    def sync_checkpoint(
+        self,
+        columns: ActivityColumns,
+        aggregates: ActivityAggregates,
+        high_water_id: int,
+        activities: list[StravaActivity],
+        recent_start: float,
+    ) -> int | None:
+        """Fold new, changed and deleted activities into a loaded checkpoint.
+
+        Returns how many activities were folded in, or None when a change cannot
+        be applied incrementally (a record holder or latest-list entry was
+        edited or deleted) and the caller has to recompute from scratch.
+        """
+        if not aggregates.advance(columns, recent_start):
+            return None
+
+        seen = set()
+        new_count = changed_count = 0
+        for activity in activities:
+            activity_id = activity['id']
+            seen.add(activity_id)
+            values = columns.row_values(activity)
+            # IDs above the high-water mark cannot be in the checkpoint yet
+            row = columns.index.get(activity_id) if activity_id <= high_water_id else None
+            if row is None:
+                new_count += 1
+            elif columns.fingerprint[row] == values[-1]:
+                continue
+            elif aggregates.remove(columns, row):
+                changed_count += 1
+            else:
+                logger.info(f"Strava activity {activity_id} changed and holds a record; recomputing")
+                return None
+            aggregates.add(columns, columns.upsert(values))
+
+        deleted = set(columns.index) - seen
+        for activity_id in deleted:
+            if not aggregates.remove(columns, columns.index[activity_id]):
+                logger.info(f"Strava activity {activity_id} was deleted and holds a record; recomputing")
+                return None
+        if deleted:
+            columns.drop(deleted)
+
+        logger.info(
+            f"Folded {new_count} new, {changed_count} changed and {len(deleted)} deleted "
+            "activities into the Strava checkpoint"
+        )
+        return new_count + changed_count + len(deleted)
+
+    @traced('strava.aggregate', count=lambda result: result[2])
+    def build_aggregates(
+        self, activities: list[StravaActivity], now: datetime
+    ) -> tuple[ActivityColumns, ActivityAggregates, int]:
+        """Return the column store, aggregates, and how many activities were folded in.
+
+        Starts from the checkpoint when one applies, and recomputes everything
+        in a single pass otherwise.
+        """
+        recent_start = (now - timedelta(days=RECENT_WINDOW_DAYS)).timestamp()
+        checkpoint = self.load_checkpoint()
+        if checkpoint is not None:
+            columns, aggregates, high_water_id = checkpoint
+            folded = self.sync_checkpoint(columns, aggregates, high_water_id, activities, recent_start)
+            if folded is not None:
+                return columns, aggregates, folded
+
+        columns = ActivityColumns.from_activities(activities)
+        return columns, ActivityAggregates.from_columns(columns, recent_start), len(columns)
+
+    @traced('strava.get_data')
     def get_recent_activities_data(self) -> dict:
         """Get recent activities and stats, formatted into a consistent structure."""
         activities = self.load_activities_data()
-        
-        # Get activities by type (latest 8 of each, excluding commutes)
-        all_runs = self.get_activities_by_type('Run', exclude_commutes=True)
-        all_bikes = self.get_activities_by_type('Ride', exclude_commutes=True)
-        all_hikes = self.get_activities_by_type('Hike', exclude_commutes=True)
-        all_swims = self.get_activities_by_type('Swim', exclude_commutes=True)
-        
-        # Sort by date and take latest N
-        runs = sorted(all_runs, key=lambda x: x['start_date'], reverse=True)[:RECENT_ACTIVITY_LIMIT]
-        bike_rides = sorted(all_bikes, key=lambda x: x['start_date'], reverse=True)[:RECENT_ACTIVITY_LIMIT]
-        hikes = sorted(all_hikes, key=lambda x: x['start_date'], reverse=True)[:RECENT_ACTIVITY_LIMIT]
-        
-        # Calculate stats for different time periods
-        current_year = datetime.now(timezone.utc).year
-        ytd_activities = [
-            a for a in activities 
-            if datetime.fromisoformat(a['start_date'].replace('Z', '+00:00')).year == current_year
-        ]
-        recent_activities = self.filter_activities_by_date_range(activities, 28)  # 4 weeks
-        
-        # Filter by activity type for stats
-        ytd_runs = [a for a in ytd_activities if a.get('type') == 'Run' or a.get('sport_type') == 'Run']
-        ytd_rides = [a for a in ytd_activities if a.get('type') == 'Ride' or a.get('sport_type') == 'Ride']
-        ytd_swims = [a for a in ytd_activities if a.get('type') == 'Swim' or a.get('sport_type') == 'Swim']
-        
-        recent_runs = [a for a in recent_activities if a.get('type') == 'Run' or a.get('sport_type') == 'Run']
-        recent_rides = [a for a in recent_activities if a.get('type') == 'Ride' or a.get('sport_type') == 'Ride']
-        recent_swims = [a for a in recent_activities if a.get('type') == 'Swim' or a.get('sport_type') == 'Swim']
-        
-        # Calculate record stats
-        records = self.calculate_record_stats(activities)
-        
-        # Build combined activity log (runs + rides + hikes, capped)
-        all_log_activities = sorted(
-            all_runs + all_bikes + all_hikes,
-            key=lambda x: x['start_date'],
-            reverse=True,
-        )[:ALL_ACTIVITIES_LIMIT]
-
-        # Find longest and most vertical for each activity type
-        longest_run = max(all_runs, key=lambda x: x.get('distance', 0)) if all_runs else None
-        longest_ride = max(all_bikes, key=lambda x: x.get('distance', 0)) if all_bikes else None
-        longest_hike = max(all_hikes, key=lambda x: x.get('distance', 0)) if all_hikes else None
-
-        most_vert_run = max(all_runs, key=lambda x: x.get('total_elevation_gain', 0)) if all_runs else None
-        most_vert_ride = max(all_bikes, key=lambda x: x.get('total_elevation_gain', 0)) if all_bikes else None
-        most_vert_hike = max(all_hikes, key=lambda x: x.get('total_elevation_gain', 0)) if all_hikes else None
+        now = datetime.now(timezone.utc)
+        columns, aggregates, folded = self.build_aggregates(activities, now)
+        if folded:
+            try:
+                self.save_checkpoint(columns, aggregates)
+            except OSError as e:
+                logger.warning(f"Failed to save Strava checkpoint: {e}")
 
-        return {
-            'all_activities': [self.format_activity(a) for a in all_log_activities],
-            'longest_run': self.format_activity(longest_run) if longest_run else None,
-            'longest_ride': self.format_activity(longest_ride) if longest_ride else None,
-            'longest_hike': self.format_activity(longest_hike) if longest_hike else None,
-            'most_vert_run': self.format_activity(most_vert_run) if most_vert_run else None,
-            'most_vert_ride': self.format_activity(most_vert_ride) if most_vert_ride else None,
-            'most_vert_hike': self.format_activity(most_vert_hike) if most_vert_hike else None,
-            'recent_runs': [self.format_activity(run) for run in runs],
-            'recent_bikes': [self.format_activity(bike) for bike in bike_rides],
-            'recent_hikes': [self.format_activity(hike) for hike in hikes],
-            'stats': {
-                # Running stats
-                'running': {
-                    'ytd': self.calculate_activity_totals(ytd_runs),
-                    'all_time': self.calculate_activity_totals(all_runs),
-                    'recent': self.calculate_activity_totals(recent_runs)
-                },
-                # Biking stats
-                'biking': {
-                    'ytd': self.calculate_activity_totals(ytd_rides),
-                    'all_time': self.calculate_activity_totals(all_bikes),
-                    'recent': self.calculate_activity_totals(recent_rides)
-                },
-                # Swimming stats
-                'swimming': {
-                    'ytd': self.calculate_activity_totals(ytd_swims),
-                    'all_time': self.calculate_activity_totals(all_swims),
-                    'recent': self.calculate_activity_totals(recent_swims)
-                },
-                # Record stats
-                'biggest_ride_distance': records['biggest_ride_distance'],
-                'biggest_climb_elevation_gain': records['biggest_climb_elevation_gain']
+        by_id = {activity['id']: activity for activity in activities}
+        records = aggregates.records
+        latest = aggregates.latest
+
+        def format_record(name: str) -> dict | None:
+            holder = records[name]
+            return self.format_activity(by_id[holder[0]]) if holder else None
+
+        def format_entries(entries: list[list], limit: int) -> list[dict]:
+            return [self.format_activity(by_id[activity_id]) for _, activity_id in entries[:limit]]
+
+        # Combined activity log (runs + rides + hikes, capped)
+        log_entries = sorted((entry for sport in LOG_SPORTS for entry in latest[sport]), key=_newest_first)
+
+        # Records across every activity, zeroed when there is no data at all
+        biggest_ride_distance = biggest_climb_elevation_gain = 0
+        if len(columns):
+            biggest_ride = records['biggest_ride']
+            biggest_ride_distance = round((biggest_ride[1] if biggest_ride else 0) * METERS_TO_MILES, 2)
+            biggest_climb_elevation_gain = round(records['biggest_climb'][1] * METERS_TO_FEET, 0)
+
+        year = str(now.year)
+        recent = aggregates.recent_totals(columns)
+        stats = {
+            name: {
+                'ytd': self.format_totals(aggregates.years[sport].get(year, [0, 0, 0, 0, 0])),
+                'all_time': self.format_totals(aggregates.all_time[sport]),
+                'recent': self.format_totals(recent[sport]),
             }
+            for name, sport in STATS_SPORTS.items()
+        }
+        stats['biggest_ride_distance'] = biggest_ride_distance
+        stats['biggest_climb_elevation_gain'] = biggest_climb_elevation_gain
+
+        return {
+            'all_activities': format_entries(log_entries, ALL_ACTIVITIES_LIMIT),
+            'longest_run': format_record('longest_Run'),
+            'longest_ride': format_record('longest_Ride'),
+            'longest_hike': format_record('longest_Hike'),
+            'most_vert_run': format_record('most_vert_Run'),
+            'most_vert_ride': format_record('most_vert_Ride'),
+            'most_vert_hike': format_record('most_vert_Hike'),
+            'recent_runs': format_entries(latest['Run'], RECENT_ACTIVITY_LIMIT),
+            'recent_bikes': format_entries(latest['Ride'], RECENT_ACTIVITY_LIMIT),
+            'recent_hikes': format_entries(latest['Hike'], RECENT_ACTIVITY_LIMIT),
+            'stats': stats,
         }
 
 def main() -> None:
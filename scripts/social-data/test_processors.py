@@ -2,42 +2,23 @@
 
 from __future__ import annotations
 
+import json
+import os
+from datetime import datetime, timedelta, timezone
+
 import pytest
 
+import orchestrate
+from orchestrate import date_buckets, process_sources
+from output_format import decode_columnar, dump_json, encode_columnar
 from goodreads_processor import calculate_stats as calculate_book_stats
-from goodreads_processor import clean_review_html, convert_book_to_review, dedupe_reviews
+from goodreads_processor import convert_book_to_review, dedupe_reviews, summarize_books
 from letterboxd_processor import convert_film_to_review, calculate_stats
-from strava_processor import StravaProcessor, METERS_TO_MILES, METERS_TO_FEET, MIN_COMMUTE_DISTANCE_MILES
+from strava_processor import ActivityAggregates, ActivityColumns, StravaProcessor, METERS_TO_MILES, METERS_TO_FEET, MIN_COMMUTE_DISTANCE_MILES
 
 
 # === Goodreads processor tests ===
 
-class TestCleanReviewHtml:
-    def test_strips_leading_br(self):
-        assert clean_review_html("<br/>Great book") == "Great book"
-
-    def test_strips_trailing_br(self):
-        assert clean_review_html("Great book<br/>") == "Great book"
-
-    def test_strips_both(self):
-        assert clean_review_html("<br/>Great book<br/>") == "Great book"
-
-    def test_strips_multiple_br(self):
-        assert clean_review_html("<br/><br/>Great book<br/><br/>") == "Great book"
-
-    def test_strips_br_with_space(self):
-        assert clean_review_html("<br />Hello<br />") == "Hello"
-
-    def test_empty_br_only(self):
-        assert clean_review_html("<br/><br/>") == ""
-
-    def test_preserves_interior_br(self):
-        assert clean_review_html("Good<br/>Very good") == "Good<br/>Very good"
-
-    def test_empty_string(self):
-        assert clean_review_html("") == ""
-
-
 class TestConvertBookToReview:
     def test_basic_conversion(self):
         book = {
@@ -47,7 +28,7 @@ class TestConvertBookToReview:
             'user_read_at': 'Mon, 01 Jan 2024 00:00:00 -0000',
             'book_image_url': 'https://example.com/dune.jpg',
             'guid': 'https://goodreads.com/review/123',
-            'user_review': '<br/>Amazing<br/>',
+            'user_review': 'Amazing',
         }
         review = convert_book_to_review(book)
         assert review['title'] == 'Dune'
@@ -124,6 +105,30 @@ class TestCalculateBookStats:
         assert stats['books_this_year'] == 1
 
 
+class TestSummarizeBooks:
+    def book(self, title, rating, read_at, review=''):
+        return {'title': title, 'author_name': 'A', 'user_rating': rating, 'user_read_at': read_at, 'user_review': review}
+
+    def test_reviews_and_stats_in_one_pass(self):
+        books = [
+            self.book('Old', 3, 'Mon, 01 Jan 2024 00:00:00 +0000'),
+            self.book('New', 4, 'Wed, 01 Jan 2025 00:00:00 +0000'),
+            # Better copy of New, whose rating wins
+            self.book('New', 2, 'Wed, 01 Jan 2025 00:00:00 +0000', review='Second thoughts'),
+            # Rated without a read date: counted, but not listed
+            self.book('Undated', 5, None),
+            # Reviewed without a rating: only counted as a review
+            self.book('Unrated', 0, 'Mon, 01 Jan 2024 00:00:00 +0000', review='Notes'),
+        ]
+
+        reviews, stats = summarize_books(books)
+
+        assert [(r['title'], r['rating']) for r in reviews] == [('New', 2), ('Old', 3)]
+        assert stats['total_ratings'] == 3
+        assert stats['average_rating'] == round((3 + 2 + 5) / 3, 2)
+        assert stats['total_reviews'] == 2
+
+
 # === Letterboxd processor tests ===
 
 class TestConvertFilmToReview:
@@ -237,3 +242,265 @@ class TestShouldIncludeActivity:
     def test_includes_long_commute(self):
         activity = {'commute': True, 'distance': (MIN_COMMUTE_DISTANCE_MILES + 0.1) / METERS_TO_MILES}
         assert self.processor.should_include_activity(activity)
+
+
+class TestActivityAggregates:
+    def setup_method(self):
+        self.now = datetime.now(timezone.utc)
+        self.recent_start = (self.now - timedelta(days=28)).timestamp()
+
+        def started(days_ago):
+            return (self.now - timedelta(days=days_ago)).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+        self.activities = [
+            {'id': 1, 'type': 'Run', 'distance': 5000, 'moving_time': 1500, 'elapsed_time': 1600,
+             'total_elevation_gain': 40, 'start_date': started(3)},
+            {'id': 2, 'type': 'Run', 'sport_type': 'TrailRun', 'distance': 12000, 'moving_time': 4000,
+             'elapsed_time': 4500, 'total_elevation_gain': 600, 'start_date': started(400)},
+            {'id': 3, 'type': 'Ride', 'distance': 3000, 'moving_time': 600, 'elapsed_time': 700,
+             'total_elevation_gain': 10, 'start_date': started(1), 'commute': True},
+            {'id': 4, 'type': 'Ride', 'distance': 80000, 'moving_time': 10000, 'elapsed_time': 11000,
+             'total_elevation_gain': 900, 'start_date': started(60)},
+            {'id': 5, 'type': 'Walk', 'distance': 2000, 'moving_time': 1200, 'elapsed_time': 1200,
+             'total_elevation_gain': 1500, 'start_date': started(2)},
+        ]
+        self.processor = StravaProcessor()
+        self.columns = ActivityColumns.from_activities(self.activities)
+        self.aggregates = ActivityAggregates.from_columns(self.columns, self.recent_start)
+
+    def test_totals_match_per_list_calculation(self):
+        recent = self.processor.filter_activities_by_date_range(self.activities, 28)
+        rides = [a for a in recent if a['type'] == 'Ride']
+        recent_totals = self.aggregates.recent_totals(self.columns)
+
+        assert self.processor.format_totals(recent_totals['Ride']) == self.processor.calculate_activity_totals(rides)
+        assert self.aggregates.all_time['Ride'][0] == 1  # the short commute is excluded
+        assert self.aggregates.all_time['Run'][:2] == [2, 17000]
+        assert self.aggregates.all_time['Swim'] == [0, 0, 0, 0, 0]
+
+    def test_records_and_latest(self):
+        records = self.aggregates.records
+        assert records['longest_Run'] == [2, 12000]
+        assert records['most_vert_Ride'] == [4, 900]
+        assert records['longest_Hike'] is None
+        assert records['biggest_climb'] == [5, 1500]  # records consider every sport
+        assert [activity_id for _, activity_id in self.aggregates.latest['Run']] == [1, 2]
+        assert [activity_id for _, activity_id in self.aggregates.latest['Ride']] == [4]
+
+    def test_remove_refuses_record_holders(self):
+        assert not self.aggregates.remove(self.columns, self.columns.index[2])
+        assert self.aggregates.remove(self.columns, self.columns.index[3])
+        assert self.aggregates.recent_totals(self.columns)['Ride'][0] == 0
+
+
+class TestStravaCheckpoint:
+    def setup_method(self):
+        now = datetime.now(timezone.utc)
+        self.activities = [
+            {'id': i, 'name': f'Run {i}', 'type': 'Run', 'distance': 1000 * i, 'moving_time': 600,
+             'elapsed_time': 700, 'total_elevation_gain': 10 * i,
+             'start_date': (now - timedelta(days=i)).strftime('%Y-%m-%dT%H:%M:%SZ')}
+            for i in range(1, 6)
+        ]
+
+    def process(self, checkpoint_file, activities):
+        processor = StravaProcessor()
+        processor.checkpoint_file = str(checkpoint_file)
+        processor.activities_data = activities
+        return processor.get_recent_activities_data()
+
+    def test_incremental_run_matches_full_recompute(self, tmp_path):
+        checkpoint_file = tmp_path / 'checkpoint.json'
+        self.process(checkpoint_file, self.activities)
+        assert checkpoint_file.exists()
+
+        edited = [dict(a) for a in self.activities[1:]]  # drop a non-record activity
+        edited[0]['moving_time'] = 900  # change another one
+        edited[1]['name'] = 'Renamed'  # cosmetic edits are read from the live activity
+        edited.append({**self.activities[0], 'id': 10})  # a new upload
+
+        incremental = self.process(checkpoint_file, edited)
+        full = self.process(tmp_path / 'fresh.json', edited)
+        assert incremental == full
+        assert incremental['stats']['running']['all_time']['count'] == 5
+        assert [run['name'] for run in incremental['recent_runs']][:3] == ['Run 1', 'Run 2', 'Renamed']
+
+    def test_deleting_record_holder_recomputes(self, tmp_path):
+        checkpoint_file = tmp_path / 'checkpoint.json'
+        self.process(checkpoint_file, self.activities)
+
+        data = self.process(checkpoint_file, self.activities[:-1])
+        assert data['longest_run']['id'] == 4
+        assert data == self.process(tmp_path / 'fresh.json', self.activities[:-1])
+
+
+def good_source() -> dict:
+    return {'pid': os.getpid()}
+
+
+def failing_source() -> dict:
+    raise ValueError('bad data store')
+
+
+def crashing_source() -> dict:
+    os._exit(1)
+
+
+class TestProcessSources:
+    def test_runs_each_source_in_its_own_process(self):
+        results, timings = process_sources({'a': good_source, 'b': good_source})
+        assert results['a']['pid'] != os.getpid()
+        assert results['a']['pid'] != results['b']['pid']
+        assert set(timings) == {'a', 'b'}
+        assert all(seconds >= 0 for seconds in timings.values())
+
+    def test_failures_leave_only_their_own_key_empty(self):
+        results, timings = process_sources({'ok': good_source, 'error': failing_source, 'crash': crashing_source})
+        assert results['ok']['pid'] != os.getpid()
+        assert 'error' not in results
+        assert 'crash' not in results
+        assert timings['error'] >= 0
+        assert timings['crash'] is None
+
+
+class TestIncrementalOrchestration:
+    @pytest.fixture(autouse=True)
+    def setup(self, tmp_path, monkeypatch):
+        self.stores = {name: tmp_path / f'{name}.jsonl' for name in ('a', 'b')}
+        code = tmp_path / 'processor.py'
+        for path in [*self.stores.values(), code]:
+            path.write_text('1\n')
+        self.output = tmp_path / 'social'
+        self.calls = []
+        self.values = {'a': 1, 'b': 1}
+        monkeypatch.setattr(orchestrate, 'OUTPUT_DIR', self.output)
+        monkeypatch.setattr(orchestrate, 'MANIFEST_FILE', self.output / 'manifest.json')
+        monkeypatch.setattr(orchestrate, 'SHARDS', {
+            'first': {'a': ['value']},
+            'both': {'a': ['value'], 'b': ['value', 'extra']},
+        })
+        monkeypatch.setattr(orchestrate, 'SOURCES', {'a': good_source, 'b': good_source})
+        monkeypatch.setattr(orchestrate, 'SOURCE_FILES', {name: (path, code) for name, path in self.stores.items()})
+        monkeypatch.setattr(orchestrate, 'process_sources', self.fake_process_sources)
+
+    def fake_process_sources(self, sources):
+        self.calls.append(sorted(sources))
+        results = {name: {'value': self.values[name]} for name in sources if self.values[name] is not None}
+        return results, {name: 0.0 for name in sources}
+
+    def run(self, *argv):
+        orchestrate.main(list(argv))
+        return {path.stem: json.loads(path.read_text()) for path in self.output.glob('*.json')}
+
+    def test_writes_manifest_and_shards(self):
+        output = self.run()
+        assert output['first'] == {'a': {'value': 1}}
+        assert output['both'] == {'a': {'value': 1}, 'b': {'value': 1}}
+        assert set(output['manifest']['shards']) == {'first', 'both'}
+        assert output['manifest']['shards']['first']['file'] == 'first.json'
+
+    def test_skips_when_no_input_changed(self):
+        first = self.run()
+        assert self.calls == [['a', 'b']]
+        assert set(first['manifest']['metadata']['input_hashes']) == {'a', 'b'}
+
+        assert self.run() == first
+        assert self.calls == [['a', 'b']]
+
+    def test_reprocesses_only_changed_sources(self):
+        self.run()
+        before = (self.output / 'first.json').stat().st_mtime_ns
+        self.stores['b'].write_text('2\n')
+        self.values['b'] = 2
+        output = self.run()
+        assert self.calls[-1] == ['b']
+        assert output['both'] == {'a': {'value': 1}, 'b': {'value': 2}}
+        # Shards without the changed source are not rewritten
+        assert (self.output / 'first.json').stat().st_mtime_ns == before
+
+    def test_unchanged_results_are_not_rewritten(self):
+        before = self.run()
+        self.stores['a'].write_text('2\n')
+        assert self.run() == before
+        assert self.calls[-1] == ['a']
+
+    def test_missing_shard_forces_reprocessing(self):
+        self.run()
+        (self.output / 'first.json').unlink()
+        output = self.run()
+        assert self.calls[-1] == ['a']
+        assert output['first'] == {'a': {'value': 1}}
+
+    def test_failed_source_is_retried(self):
+        self.values['b'] = None
+        output = self.run()
+        assert output['both']['b'] == {}
+        assert output['manifest']['metadata']['input_hashes']['b'] is None
+
+        self.values['b'] = 1
+        output = self.run()
+        assert self.calls[-1] == ['b']
+        assert output['both']['b'] == {'value': 1}
+
+    def test_force_reprocesses_everything(self):
+        self.run()
+        self.run('--force')
+        assert self.calls[-1] == ['a', 'b']
+
+    def test_columnar_shards_are_reused(self):
+        self.run('--format', 'columnar')
+        raw = json.loads((self.output / 'both.json').read_text())
+        assert decode_columnar(raw) == {'a': {'value': 1}, 'b': {'value': 1}}
+
+        self.stores['b'].write_text('2\n')
+        self.values['b'] = 2
+        output = self.run('--format', 'columnar')
+        assert self.calls[-1] == ['b']
+        assert decode_columnar(output['both']) == {'a': {'value': 1}, 'b': {'value': 2}}
+
+    def test_format_change_reserializes_unchanged_inputs(self):
+        self.run()
+        output = self.run('--format', 'columnar')
+        assert self.calls == [['a', 'b']]
+        assert output['manifest']['format'] == 'columnar'
+        assert decode_columnar(output['both']) == {'a': {'value': 1}, 'b': {'value': 1}}
+
+        # Same inputs and output settings again: nothing to do
+        before = (self.output / 'both.json').stat().st_mtime_ns
+        self.run('--format', 'columnar')
+        assert (self.output / 'both.json').stat().st_mtime_ns == before
+
+
+class TestDateBuckets:
+    def test_strava_bucket_moves_daily_and_others_yearly(self):
+        day = date_buckets(datetime(2024, 3, 1, 12, tzinfo=timezone.utc))
+        next_day = date_buckets(datetime(2024, 3, 2, 12, tzinfo=timezone.utc))
+        assert day['strava'] != next_day['strava']
+        assert day['letterboxd'] == next_day['letterboxd'] == '2024'
+        assert day['goodreads'] == next_day['goodreads']
+
+
+class TestOutputFormat:
+    data = {
+        'letterboxd': {
+            'username': 'someone',
+            'all_reviews': [
+                {'title': 'A', 'rating': 4.5, 'tags': [{'name': 'x'}, {'name': 'y'}]},
+                {'title': 'B', 'rating': None, 'tags': []},
+            ],
+        },
+        'strava': {'mixed': [{'id': 1}, {'id': 2, 'name': 'extra'}], 'numbers': [1, 2]},
+    }
+
+    def test_columnar_stores_keys_once_per_list(self):
+        encoded = encode_columnar(self.data)
+        reviews = encoded['letterboxd']['all_reviews']
+        assert reviews['$columns'] == ['title', 'rating', 'tags']
+        assert reviews['$rows'][0][2] == {'$columns': ['name'], '$rows': [['x'], ['y']]}
+        # Lists whose records differ in keys are left as is
+        assert encoded['strava']['mixed'] == self.data['strava']['mixed']
+
+    @pytest.mark.parametrize('output_format', ['pretty', 'minified', 'columnar'])
+    def test_every_format_round_trips(self, output_format):
+        text = dump_json(self.data, output_format)
+        assert decode_columnar(json.loads(text)) == self.data
@@ -1,15 +1,29 @@
 from __future__ import annotations
 
 import os
-import json
-import requests
+import sys
+import argparse
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
+import requests
 from dotenv import load_dotenv
 
 # Get the directory where this script is located
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 
+sys.path.insert(0, os.path.join(SCRIPT_DIR, '..', 'shared'))
+from dates import add_date_fields, iso_to_epoch
+from http_scheduler import RateLimitExceeded, RequestScheduler
+from instrument import add_trace_arguments, configure_from_args, finish, span, traced
+from jsonl_store import JsonlStore
+
+DATA_FILE = os.path.join(SCRIPT_DIR, 'data', 'activities.jsonl')
+LEGACY_DATA_FILE = os.path.join(SCRIPT_DIR, 'data', 'activities.json')
+
+STRAVA_API_URL = 'https://www.strava.com/api/v3'
+STRAVA_TOKEN_URL = 'https://www.strava.com/oauth/token'
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -23,12 +37,21 @@ logger = logging.getLogger(__name__)
 # Load environment variables
 load_dotenv()
 
+
+def add_activity_dates(activity: dict) -> dict:
+    """Add the epoch of an activity's start date."""
+    return add_date_fields(activity, ('start_date',), iso_to_epoch)
+
+
 class StravaDataCollector:
-    def __init__(self):
+    def __init__(self, api_url: str = STRAVA_API_URL, scheduler: RequestScheduler | None = None):
         self.client_id = os.getenv('STRAVA_CLIENT_ID')
         self.client_secret = os.getenv('STRAVA_CLIENT_SECRET')
         self.refresh_token = os.getenv('STRAVA_REFRESH_TOKEN')
+        self.api_url = api_url
+        self.scheduler = scheduler or RequestScheduler()
         self.access_token = None
+        self.store = JsonlStore(DATA_FILE, 'id', legacy_path=LEGACY_DATA_FILE)
         self.activities = []
         self.existing_activities = []
         
@@ -40,8 +63,8 @@ class StravaDataCollector:
     def get_access_token(self) -> bool:
         """Get a new access token using the refresh token."""
         logger.info("Attempting to get new access token...")
-        response = requests.post(
-            'https://www.strava.com/oauth/token',
+        response = self.scheduler.post(
+            STRAVA_TOKEN_URL,
             data={
                 'client_id': self.client_id,
                 'client_secret': self.client_secret,
@@ -58,29 +81,69 @@ class StravaDataCollector:
         return False
 
     def load_existing_activities(self, filename: str | None = None) -> None:
-        """Load existing activities from file if it exists."""
-        if filename is None:
-            filename = os.path.join(SCRIPT_DIR, 'data', 'activities.json')
-        
+        """Load existing activities from the store if it exists."""
+        if filename is not None:
+            self.store = JsonlStore(filename, 'id')
+
         try:
-            if os.path.exists(filename):
-                with open(filename, 'r') as f:
-                    self.existing_activities = json.load(f)
-                logger.info(f"Loaded {len(self.existing_activities)} existing activities from {filename}")
+            with span('fetch_activities.load_existing') as load:
+                self.existing_activities = self.store.load()
+                load.add(len(self.existing_activities))
+            if self.existing_activities:
+                logger.info(f"Loaded {len(self.existing_activities)} existing activities from {self.store.path}")
             else:
-                logger.info(f"No existing activities file found at {filename}")
-                self.existing_activities = []
+                logger.info(f"No existing activities file found at {self.store.path}")
         except Exception as e:
             logger.error(f"Error loading existing activities: {str(e)}")
             self.existing_activities = []
 
-    def fetch_activities(self, per_page: int = 100, max_pages: int = 10, fetch_all: bool = False) -> None:
+    @traced('fetch_activities.fetch_page', count=len)
+    def fetch_page(self, page: int, per_page: int, after_timestamp: int | None) -> list[dict]:
+        """Fetch one page of activities.
+
+        Throttled and transient failures are retried by the scheduler; any
+        error left after that raises rather than truncating the fetch.
+        """
+        params = {
+            'per_page': per_page,
+            'page': page
+        }
+
+        # Only add 'after' parameter if we have a timestamp
+        if after_timestamp is not None:
+            params['after'] = after_timestamp
+
+        logger.info(f"Fetching page {page} of activities...")
+        response = self.scheduler.get(
+            f'{self.api_url}/athlete/activities',
+            headers={'Authorization': f'Bearer {self.access_token}'},
+            params=params,
+            timeout=30
+        )
+
+        if response.status_code != 200:
+            logger.error(f"Error fetching page {page}. Status code: {response.status_code}")
+            response.raise_for_status()
+        return [add_activity_dates(activity) for activity in response.json()]
+
+    @traced('fetch_activities.fetch')
+    def fetch_activities(
+        self,
+        per_page: int = 100,
+        max_pages: int = 10,
+        fetch_all: bool = False,
+        workers: int = 1,
+    ) -> None:
         """Fetch activities from Strava API
-        
+
         Args:
             per_page: Number of activities per page
             max_pages: Maximum number of pages to fetch (ignored if fetch_all=True)
             fetch_all: If True, fetch all activities with no page limit. If False, fetch only past month.
+            workers: Number of pages to request at once. Pages are fetched in windows
+                of this size and merged in page order, stopping at the first empty page,
+                when the daily rate limit is spent, or at a page that still fails after
+                the scheduler's retries. Pages fetched before the stop are kept.
         """
         if fetch_all or len(self.existing_activities) == 0:
             logger.info("Starting to fetch ALL activities (no time limit, no page limit)")
@@ -92,87 +155,70 @@ class StravaDataCollector:
             one_month_ago = datetime.now() - timedelta(days=30)
             after_timestamp = int(one_month_ago.timestamp())
             effective_max_pages = max_pages
-        
+
         if not self.access_token and not self.get_access_token():
             raise Exception("Failed to get access token")
-        
-        headers = {'Authorization': f'Bearer {self.access_token}'}
+
         page = 1
         total_activities = 0
-        
-        while page <= effective_max_pages:
-            logger.info(f"Fetching page {page} of activities...")
-            
-            params = {
-                'per_page': per_page, 
-                'page': page
-            }
-            
-            # Only add 'after' parameter if we have a timestamp
-            if after_timestamp is not None:
-                params['after'] = after_timestamp
-            
-            response = requests.get(
-                'https://www.strava.com/api/v3/athlete/activities',
-                headers=headers,
-                params=params,
-                timeout=30
-            )
-            
-            if response.status_code != 200:
-                logger.error(f"Error fetching page {page}. Status code: {response.status_code}")
-                break
-                
-            activities = response.json()
-            if not activities:
-                logger.info("No more activities to fetch")
-                break
-                
-            self.activities.extend(activities)
-            total_activities += len(activities)
-            logger.info(f"Successfully fetched {len(activities)} activities from page {page}")
-            page += 1
+
+        with ThreadPoolExecutor(max_workers=max(workers, 1)) as executor:
+            while page <= effective_max_pages:
+                window = range(page, int(min(page + max(workers, 1), effective_max_pages + 1)))
+                results = executor.map(lambda p: self.fetch_page(p, per_page, after_timestamp), window)
+
+                done = False
+                failed_page = page
+                try:
+                    for window_page, activities in zip(window, results):
+                        if not activities:
+                            logger.info("No more activities to fetch")
+                            done = True
+                            break
+
+                        self.activities.extend(activities)
+                        total_activities += len(activities)
+                        logger.info(f"Successfully fetched {len(activities)} activities from page {window_page}")
+                        failed_page = window_page + 1
+                except (RateLimitExceeded, requests.RequestException) as e:
+                    logger.error(f"Stopping at page {failed_page}: {e}")
+                    done = True
+
+                if done:
+                    break
+                page = window.stop
 
         logger.info(f"Completed fetching activities. Total activities collected: {total_activities}")
 
+    @traced('fetch_activities.save')
     def update_and_save_activities(self, filename: str | None = None) -> None:
-        """Update existing activities and append new ones, then save to file."""
-        if filename is None:
-            filename = os.path.join(SCRIPT_DIR, 'data', 'activities.json')
-            
+        """Append new and changed activities to the store."""
+        if filename is not None and filename != self.store.path:
+            self.store = JsonlStore(filename, 'id')
+            self.store.load()
+
         logger.info(f"Processing activities for updates and new additions")
-        
-        # Create a dictionary of existing activities by ID for quick lookup
-        existing_dict = {activity['id']: activity for activity in self.existing_activities}
-        updated_count = 0
-        new_count = 0
-        
-        # Process new activities - update existing ones or add new ones
-        for activity in self.activities:
-            if activity['id'] in existing_dict:
-                # Update existing activity
-                existing_dict[activity['id']] = activity
-                updated_count += 1
-            else:
-                # Add new activity
-                existing_dict[activity['id']] = activity
-                new_count += 1
-        
-        # Convert back to list
-        updated_activities = list(existing_dict.values())
-        
-        # Save to file
+
         try:
-            os.makedirs(os.path.dirname(filename), exist_ok=True)
-            with open(filename, 'w') as f:
-                json.dump(updated_activities, f, indent=2)
-            logger.info(f"Successfully saved {len(updated_activities)} activities to {filename}")
+            new_count, updated_count = self.store.upsert(self.activities)
+            logger.info(f"Successfully saved {len(self.store.index)} activities to {self.store.path}")
             logger.info(f"Updated {updated_count} existing activities and added {new_count} new activities")
         except Exception as e:
             logger.error(f"Error saving activities to file: {str(e)}")
             raise
 
 def main() -> None:
+    parser = argparse.ArgumentParser(description="Fetch Strava activity data.")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=4,
+        help="Number of activity pages to request at once.",
+    )
+    add_trace_arguments(parser)
+    args = parser.parse_args()
+    configure_from_args(args)
+
     try:
         logger.info("Starting Strava data collection process")
         collector = StravaDataCollector()
@@ -182,15 +228,17 @@ def main() -> None:
         fetch_all = len(collector.existing_activities) == 0
         if fetch_all:
             logger.info("No existing activities found - fetching ALL activities from Strava (no page limit)")
-            collector.fetch_activities(fetch_all=True)
+            collector.fetch_activities(fetch_all=True, workers=args.workers)
         else:
-            collector.fetch_activities()
+            collector.fetch_activities(workers=args.workers)
         
         collector.update_and_save_activities()
         logger.info("Data collection process completed successfully")
     except Exception as e:
         logger.error(f"An error occurred during data collection: {str(e)}")
         raise
+    finally:
+        finish()
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -0,0 +1,110 @@
+"""Tests for the Strava fetcher against a local stub of the activities API."""
+
+from __future__ import annotations
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from fetch_activities import StravaDataCollector
+from http_scheduler import HostPolicy, RequestScheduler
+
+
+class StubStrava(BaseHTTPRequestHandler):
+    pages: dict[int, list[dict]] = {}
+    requested: list[int] = []
+    headers_to_send: dict[str, str] = {}
+    # Page number -> error status to answer with
+    failures: dict[int, int] = {}
+
+    def do_GET(self):
+        query = parse_qs(urlparse(self.path).query)
+        page = int(query['page'][0])
+        self.requested.append(page)
+        if page in self.failures:
+            self.send_response(self.failures[page])
+            self.end_headers()
+            return
+        body = json.dumps(self.pages.get(page, [])).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        for name, value in self.headers_to_send.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def stub_server():
+    StubStrava.pages = {page: [{'id': page * 10 + i} for i in range(3)] for page in range(1, 8)}
+    StubStrava.requested = []
+    StubStrava.headers_to_send = {}
+    StubStrava.failures = {}
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubStrava)
+    thread = threading.Thread(target=server.serve_forever, kwargs={'poll_interval': 0.05}, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{server.server_address[1]}'
+    server.shutdown()
+
+
+@pytest.fixture
+def collector_env(monkeypatch):
+    for name in ('STRAVA_CLIENT_ID', 'STRAVA_CLIENT_SECRET', 'STRAVA_REFRESH_TOKEN'):
+        monkeypatch.setenv(name, 'test')
+
+
+def make_collector(api_url: str, max_wait: float = 60, max_retries: int = 4) -> StravaDataCollector:
+    # Strava-shaped budgets (15 minutes, daily) for the stub host
+    policy = HostPolicy(limits=[(100, 15 * 60), (1000, 24 * 60 * 60)])
+    scheduler = RequestScheduler(policies={'127.0.0.1': policy}, max_wait=max_wait, max_retries=max_retries)
+    collector = StravaDataCollector(api_url=api_url, scheduler=scheduler)
+    collector.access_token = 'token'
+    return collector
+
+
+class TestFetchActivities:
+    @pytest.mark.parametrize('workers', [1, 3, 8])
+    def test_merges_pages_in_order_and_stops_at_empty_page(self, stub_server, collector_env, workers):
+        collector = make_collector(stub_server)
+        collector.fetch_activities(fetch_all=True, workers=workers)
+
+        assert [a['id'] for a in collector.activities] == [
+            page * 10 + i for page in range(1, 8) for i in range(3)
+        ]
+        # At most one window of requests past the first empty page
+        assert max(StubStrava.requested) < 8 + workers
+
+    def test_respects_page_limit(self, stub_server, collector_env):
+        collector = make_collector(stub_server)
+        collector.existing_activities = [{'id': 1}]
+        collector.fetch_activities(max_pages=2, workers=4)
+
+        assert sorted(StubStrava.requested) == [1, 2]
+        assert len(collector.activities) == 6
+
+    def test_stops_when_daily_limit_spent(self, stub_server, collector_env):
+        StubStrava.headers_to_send = {
+            'X-ReadRateLimit-Limit': '100,1000',
+            'X-ReadRateLimit-Usage': '5,1000',
+        }
+        collector = make_collector(stub_server, max_wait=10)
+        collector.fetch_activities(fetch_all=True, workers=1)
+
+        assert StubStrava.requested == [1]
+        assert len(collector.activities) == 3
+
+    @pytest.mark.parametrize('workers', [1, 3])
+    def test_stops_at_failing_page_and_keeps_earlier_pages(self, stub_server, collector_env, tmp_path, workers):
+        StubStrava.failures = {5: 500}
+        collector = make_collector(stub_server, max_retries=0)
+        collector.fetch_activities(fetch_all=True, workers=workers)
+
+        assert [a['id'] for a in collector.activities] == [page * 10 + i for page in range(1, 5) for i in range(3)]
+        collector.update_and_save_activities(str(tmp_path / 'activities.jsonl'))
+        assert len(collector.store.index) == 12
@@ -0,0 +1,26 @@
+// Decoding shim for the shards scripts/social-data/orchestrate.py writes to
+// src/data/social/. In the columnar format, a list of records sharing the same
+// keys is stored as { $columns: [keys...], $rows: [[values...], ...] }.
+// decodeSocialData turns those back into records and passes everything else
+// through, so pages read pretty, minified and columnar shards alike.
+
+type Columnar = { $columns: string[]; $rows: unknown[][] };
+
+const isColumnar = (value: object): value is Columnar => {
+	const keys = Object.keys(value);
+	return keys.length === 2 && '$columns' in value && '$rows' in value;
+};
+
+const decode = (value: unknown): unknown => {
+	if (Array.isArray(value)) return value.map(decode);
+	if (value === null || typeof value !== 'object') return value;
+	if (isColumnar(value)) {
+		const columns = value.$columns;
+		return value.$rows.map((row) =>
+			Object.fromEntries(columns.map((key, i) => [key, decode(row[i])])),
+		);
+	}
+	return Object.fromEntries(Object.entries(value).map(([key, item]) => [key, decode(item)]));
+};
+
+export const decodeSocialData = <T>(shard: unknown): T => decode(shard) as T;